@@ -0,0 +1,177 @@
+# in-process caches for upstream data
+import threading
+from collections import OrderedDict
+import time
+import logging
+# Get an instance of a logger
+logger = logging.getLogger(__name__)
+
+
+class StaleWhileRevalidateCache:
+    """
+    Caches the single value returned by `loader`.
+
+    The value is fresh for `ttl` seconds. After that reads keep returning the
+    stale value straight away while one background thread reloads it, so callers
+    never wait on the upstream once the cache is warm. Only values accepted by
+    `should_cache` are stored; a failed reload leaves the stale value in place.
+    """
+
+    def __init__(self, loader, ttl, should_cache=None, name="cache"):
+        self.loader = loader
+        self.ttl = ttl
+        self.should_cache = should_cache or (lambda value: value is not None)
+        self.name = name
+
+        self._lock = threading.Lock()
+        self._value = None
+        self._loaded_at = None
+        self._refreshing = False
+        self._stats = {"hits": 0, "staleHits": 0, "misses": 0, "refreshes": 0, "refreshFailures": 0}
+
+    def get(self):
+        """
+        Return the cached value, loading it in the calling thread if nothing is cached yet.
+        """
+        value = self.peek()
+        if value is not None:
+            return value
+
+        return self.refresh()
+
+    def peek(self):
+        """
+        Return the cached value without ever loading in the calling thread.
+        Returns None on a cold cache and schedules a background reload when stale.
+        """
+        with self._lock:
+            if self._loaded_at is None:
+                self._stats["misses"] += 1
+                return None
+
+            if time.monotonic() - self._loaded_at < self.ttl:
+                self._stats["hits"] += 1
+                return self._value
+
+            self._stats["staleHits"] += 1
+            value = self._value
+
+        self.refresh_in_background()
+        return value
+
+    def set(self, value):
+        if not self.should_cache(value):
+            return False
+
+        with self._lock:
+            self._value = value
+            self._loaded_at = time.monotonic()
+        return True
+
+    def refresh(self):
+        """
+        Load a new value in the calling thread and return it, cached or not.
+        """
+        try:
+            value = self.loader()
+        except Exception as e:
+            logger.error(f"{self.name}@refresh@Error")
+            logger.error(e)
+            value = None
+
+        with self._lock:
+            self._stats["refreshes"] += 1
+
+        if not self.set(value):
+            with self._lock:
+                self._stats["refreshFailures"] += 1
+
+        return value
+
+    def refresh_in_background(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                self.refresh()
+            finally:
+                with self._lock:
+                    self._refreshing = False
+
+        threading.Thread(target=run, name=f"{self.name}-refresh", daemon=True).start()
+
+    def warm(self):
+        """
+        Load the value in the background, used at process start.
+        """
+        self.refresh_in_background()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["ageSeconds"] = None if self._loaded_at is None else round(time.monotonic() - self._loaded_at, 3)
+        return stats
+
+
+class LRUCache:
+    """
+    Bounded, thread-safe mapping whose entries expire after a TTL.
+
+    The least recently used entry is evicted once `maxsize` is reached. Entries
+    can carry their own TTL, which is how negative results get a shorter life.
+    """
+
+    def __init__(self, maxsize, ttl, name="cache"):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.name = name
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._stats = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0}
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return default
+
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self._stats["expired"] += 1
+                self._stats["misses"] += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hitRatio"] = round(stats["hits"] / lookups, 4) if lookups else None
+        return stats
@@ -0,0 +1,55 @@
+"""
+JSON codec shared by the API responses, request body parsing and the upstream payloads.
+
+orjson is used when it is installed and JSON_CODEC doesn't ask for "json", the
+standard library otherwise. Both backends encode the types DjangoJSONEncoder
+does (datetime, date, Decimal, UUID, ...) and format them the same way, so the
+backend changes the speed of a response, not its values. dumps returns UTF-8
+bytes, ready to be sent.
+"""
+import json
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# compact separators, like orjson
+_encoder = DjangoJSONEncoder(separators=(",", ":"), ensure_ascii=False)
+
+
+def _json_dumps(data):
+    return _encoder.encode(data).encode()
+
+
+def _json_loads(data):
+    return json.loads(data)
+
+
+if orjson is not None:
+    # datetimes go through DjangoJSONEncoder too, orjson would format them differently
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+    def _orjson_dumps(data):
+        try:
+            return orjson.dumps(data, default=_encoder.default, option=_ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            # integers wider than 64 bits and other values orjson refuses
+            return _json_dumps(data)
+
+    _orjson_loads = orjson.loads
+
+
+def selectBackend(name):
+    """
+    Return (name, dumps, loads) of the backend asked for, the standard library
+    when it is "json" or orjson isn't installed.
+    """
+    if name != "json" and orjson is not None:
+        return "orjson", _orjson_dumps, _orjson_loads
+    return "json", _json_dumps, _json_loads
+
+
+BACKEND, dumps, loads = selectBackend(settings.JSON_CODEC)
@@ -0,0 +1,236 @@
+# helpers for running independent upstream calls at the same time
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from django.conf import settings
+from django.db import close_old_connections
+
+# Get an instance of a logger
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """
+    Return the process-wide thread pool used by fan_out.
+    """
+    global _executor
+
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=settings.FANOUT_MAX_WORKERS, thread_name_prefix="fanout")
+
+    return _executor
+
+
+def run_with_connections(fn, *args):
+    """
+    Call fn on a pool thread the way Django runs a request: database connections
+    that are broken or past CONN_MAX_AGE are closed before and after the call, so
+    pool threads don't keep their own connections open forever.
+    """
+    close_old_connections()
+    try:
+        return fn(*args)
+    finally:
+        close_old_connections()
+
+
+def fan_out(*calls, stop_when=None):
+    """
+    Run independent calls at the same time and return their results in call order.
+
+    Each call is a zero-argument callable, use functools.partial to bind arguments.
+    As soon as a result satisfies `stop_when(result)` the calls that have not
+    started are cancelled and the function returns without waiting for the ones
+    still running; their slots in the returned list are None. If a call raises,
+    the pending calls are cancelled the same way and the exception is re-raised.
+    """
+    futures = [get_executor().submit(run_with_connections, call) for call in calls]
+    positions = {future: index for index, future in enumerate(futures)}
+    results = [None] * len(futures)
+
+    pending = set(futures)
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            try:
+                result = future.result()
+            except Exception:
+                for other in pending:
+                    other.cancel()
+                raise
+
+            results[positions[future]] = result
+            if stop_when is not None and stop_when(result):
+                for other in pending:
+                    other.cancel()
+                return results
+
+    return results
+
+
+async def async_fan_out(*awaitables, stop_when=None):
+    """
+    asyncio version of fan_out: await independent awaitables at the same time.
+
+    Results come back in call order. Tasks still pending when `stop_when` is met,
+    or when one of them raises, are cancelled and their slots are None.
+    """
+    tasks = [asyncio.ensure_future(awaitable) for awaitable in awaitables]
+    positions = {task: index for index, task in enumerate(tasks)}
+    results = [None] * len(tasks)
+
+    pending = set(tasks)
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                result = task.result()
+                results[positions[task]] = result
+                if stop_when is not None and stop_when(result):
+                    return results
+    finally:
+        for task in pending:
+            task.cancel()
+
+    return results
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into a single execution.
+
+    The first caller for a key runs `fn`; callers arriving while it is still
+    running wait for it and get the same result, or the same exception. Nothing
+    is remembered once the call finishes, so this is not a cache.
+    """
+
+    def __init__(self, name="singleflight"):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._stats = {"calls": 0, "shared": 0}
+
+    def do(self, key, fn):
+        with self._lock:
+            self._stats["calls"] += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = Future()
+            else:
+                self._stats["shared"] += 1
+
+        if not leader:
+            return call.result()
+
+        try:
+            call.set_result(fn())
+        except Exception as e:
+            call.set_exception(e)
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+        return call.result()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["inFlight"] = len(self._calls)
+        return stats
+
+
+class AsyncSingleFlight(SingleFlight):
+    """
+    SingleFlight for coroutines. Calls are only shared within one event loop.
+
+    The shared call runs in its own task, so a caller being cancelled doesn't
+    cancel the upstream call the other callers are waiting on.
+    """
+
+    async def do(self, key, fn):
+        loop = asyncio.get_running_loop()
+        key = (loop, key)
+
+        with self._lock:
+            self._stats["calls"] += 1
+            task = self._calls.get(key)
+            if task is not None:
+                self._stats["shared"] += 1
+            else:
+                task = self._calls[key] = loop.create_task(fn())
+                task.add_done_callback(lambda finished: self._finish(key, finished))
+
+        return await asyncio.shield(task)
+
+    def _finish(self, key, task):
+        with self._lock:
+            self._calls.pop(key, None)
+
+        # every waiter may have been cancelled, don't leave the exception unretrieved
+        if not task.cancelled():
+            task.exception()
+
+
+def bounded_map(fn, items, limit):
+    """
+    Call fn(item) for every item on the fan_out thread pool, with at most `limit`
+    calls running at once, and yield (item, result) pairs as the calls finish.
+
+    `items` is consumed lazily, so it can be a generator over a large input. If
+    a call raises, the calls not started yet are cancelled and the exception is
+    re-raised. `fn` must not use fan_out itself: with the pool full it would
+    wait on threads that are all busy waiting for it.
+    """
+    items = iter(items)
+    executor = get_executor()
+    pending = {}
+
+    def submit_next():
+        for item in items:
+            pending[executor.submit(run_with_connections, fn, item)] = item
+            return True
+        return False
+
+    try:
+        while len(pending) < limit and submit_next():
+            pass
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                item = pending.pop(future)
+                result = future.result()
+                submit_next()
+                yield item, result
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+async def async_bounded_map(fn, items, limit):
+    """
+    asyncio version of bounded_map: await fn(item) for every item, with at most
+    `limit` running at once, and return the (item, result) pairs in item order.
+
+    If a call raises, the calls still running are cancelled and the exception
+    is re-raised.
+    """
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run(item):
+        async with semaphore:
+            return item, await fn(item)
+
+    tasks = [asyncio.ensure_future(run(item)) for item in items]
+    try:
+        return await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
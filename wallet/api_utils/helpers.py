@@ -1,5 +1,6 @@
 # helper functions
 import requests
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
 import logging
 # Get an instance of a logger
 logger = logging.getLogger(__name__)
@@ -47,11 +48,28 @@ class MultipleProxyMiddleware:
         'HTTP_X_FORWARDED_HOST',
         'HTTP_X_FORWARDED_SERVER',
     ]
+    # runs natively in both modes so async views don't get pushed onto a thread
+    sync_capable = True
+    async_capable = True
 
     def __init__(self, get_response):
         self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            # mark the instance as a coroutine function for Django's handler
+            markcoroutinefunction(self)
 
     def __call__(self, request):
+        if iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+
+        self.process_request(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        self.process_request(request)
+        return await self.get_response(request)
+
+    def process_request(self, request):
         """
         Rewrites the proxy headers so that only the client IP address is used.
         """
@@ -60,4 +78,3 @@ class MultipleProxyMiddleware:
                 if ',' in request.META[field]:
                     parts = request.META[field].split(',')
                     request.META[field] = parts[0].strip()
-        return self.get_response(request)
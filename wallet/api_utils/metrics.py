@@ -0,0 +1,58 @@
+# registry of in-process counters exposed by the metrics endpoint
+import threading
+
+_sources = {}
+_lock = threading.Lock()
+
+
+def register(name, stats):
+    """
+    Register a zero-argument callable returning a dict of counters under `name`.
+    """
+    with _lock:
+        _sources[name] = stats
+
+
+def snapshot():
+    with _lock:
+        sources = dict(_sources)
+    return {name: stats() for name, stats in sources.items()}
+
+
+class LatencyStats:
+    """
+    Thread-safe count, total, max and bucketed histogram of durations in seconds.
+    """
+
+    BUCKETS = (0.001, 0.01, 0.1, 1.0, 10.0)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._count = 0
+        self._total = 0.0
+        self._max = 0.0
+        self._buckets = [0] * (len(self.BUCKETS) + 1)
+
+    def record(self, seconds):
+        position = 0
+        while position < len(self.BUCKETS) and seconds > self.BUCKETS[position]:
+            position += 1
+
+        with self._lock:
+            self._count += 1
+            self._total += seconds
+            self._max = max(self._max, seconds)
+            self._buckets[position] += 1
+
+    def stats(self):
+        with self._lock:
+            count, total, longest, buckets = self._count, self._total, self._max, list(self._buckets)
+
+        labels = [f"le{int(bound * 1000)}ms" for bound in self.BUCKETS] + ["inf"]
+        return {
+            "count": count,
+            "totalMs": round(total * 1000, 3),
+            "meanMs": round(total * 1000 / count, 3) if count else None,
+            "maxMs": round(longest * 1000, 3),
+            "buckets": dict(zip(labels, buckets)),
+        }
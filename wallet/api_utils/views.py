@@ -1,6 +1,7 @@
-from django.http import JsonResponse
+from django.http import HttpResponse
 from http import HTTPStatus
 from datetime import datetime
+from . import codec
 
 import logging
 # Get an instance of a logger
@@ -32,7 +33,7 @@ def internalServerErrorResponse(data):
 
 
 def errorResponse(httpStatusCode, data):
-    return JsonResponse(data, status=httpStatusCode, safe=False)
+    return jsonResponse(data, httpStatusCode)
 
 
 # success responses
@@ -40,6 +41,10 @@ def createdResponse(message="", body={}):
     return successResponse(HTTPStatus.CREATED, message=message, body=body)
 
 
+def acceptedResponse(message="", body={}):
+    return successResponse(HTTPStatus.ACCEPTED, message=message, body=body)
+
+
 def paginatedResponse(httpStatusCode=HTTPStatus.OK, message="", body={}, pagination={}, **kwargs):
     return successResponse(httpStatusCode, message, body, pagination, kwargs)
 
@@ -53,6 +58,11 @@ def successResponse(httpStatusCode=HTTPStatus.OK, message="", body={}, paginatio
     if pagination:
         responseData['pagination'] = pagination
 
-    response = JsonResponse(responseData, status=httpStatusCode, safe=False)
+    response = jsonResponse(responseData, httpStatusCode)
         
     return response
+
+
+def jsonResponse(data, httpStatusCode):
+    # serialized with the api_utils codec, any JSON value is allowed
+    return HttpResponse(codec.dumps(data), status=httpStatusCode, content_type="application/json")
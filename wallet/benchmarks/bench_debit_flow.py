@@ -0,0 +1,103 @@
+"""
+Benchmark the debit flow (get_wallet_balance + debit_wallet) against a local
+stand-in server, with and without the pooled keep-alive session.
+
+Run from the `wallet` directory:
+
+    python -m benchmarks.bench_debit_flow --iterations 2000 --threads 8
+"""
+import argparse
+import statistics
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+import requests
+from django.conf import settings
+
+from .standin import start_standin_server, base_url
+
+
+def configure(url, pool_maxsize):
+    settings.configure(
+        WALLETS_BASE_URL=url,
+        WALLETS_SANDBOX_URL=url,
+        WALLETS_SECRET_KEY="bench-secret",
+        WALLETS_PUBLIC_KEY="bench-public",
+        WALLETS_HTTP_POOL_CONNECTIONS=4,
+        WALLETS_HTTP_POOL_MAXSIZE=pool_maxsize,
+        WALLETS_HTTP_POOL_BLOCK=True,
+        WALLETS_HTTP_CONNECT_TIMEOUT=3.05,
+        WALLETS_HTTP_READ_TIMEOUT=30,
+        BANKS_CACHE_TTL=3600,
+        ENQUIRY_CACHE_SIZE=1000,
+        ENQUIRY_CACHE_TTL=3600,
+        ENQUIRY_NEGATIVE_CACHE_TTL=60,
+        BALANCE_CACHE_SIZE=1000,
+        BALANCE_CACHE_TTL=30,
+        JSON_CODEC="orjson",
+    )
+    django.setup()
+
+
+def debit_flow(api):
+    start = time.perf_counter()
+    balance, msg = api.get_wallet_balance("08000000000")
+    assert msg is True, msg
+    debit, msg = api.debit_wallet(10, "08000000000", str(uuid.uuid4())[:12])
+    assert msg is True, msg
+    return time.perf_counter() - start
+
+
+def run(api, iterations, threads):
+    # warm up so the pooled run measures steady state
+    for _ in range(min(20, iterations)):
+        debit_flow(api)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        samples = list(executor.map(lambda _: debit_flow(api), range(iterations)))
+    elapsed = time.perf_counter() - started
+
+    samples.sort()
+    return {
+        "p50": statistics.median(samples) * 1000,
+        "p99": samples[min(len(samples) - 1, int(len(samples) * 0.99))] * 1000,
+        "throughput": iterations / elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=1000)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.0, help="stand-in server latency in seconds")
+    args = parser.parse_args()
+
+    server = start_standin_server(latency=args.latency)
+    configure(base_url(server), pool_maxsize=args.threads)
+
+    from wallet_manager.wallets_africa import WalletsAfricaAPI
+
+    class UnpooledWalletsAfricaAPI(WalletsAfricaAPI):
+        # the previous behaviour: a fresh connection for every upstream call
+        @property
+        def session(self):
+            return requests
+
+    results = [
+        ("requests.request (before)", run(UnpooledWalletsAfricaAPI(), args.iterations, args.threads)),
+        ("pooled session (after)", run(WalletsAfricaAPI(), args.iterations, args.threads)),
+    ]
+
+    print(f"debit flow, {args.iterations} iterations, {args.threads} threads, latency {args.latency * 1000:.1f}ms")
+    print(f"{'client':<28}{'p50 ms':>10}{'p99 ms':>10}{'flows/s':>12}")
+    for name, result in results:
+        print(f"{name:<28}{result['p50']:>10.2f}{result['p99']:>10.2f}{result['throughput']:>12.1f}")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Benchmark encoding a large transaction-list response: Django's JsonResponse
+(before) against the api_utils codec with the standard library and with orjson.
+
+Rows look like the upstream transactions the transactions view pages out. With
+--typed the amounts are Decimals and the dates datetimes, to include the
+encoder hooks in the measurement.
+
+Run from the `wallet` directory:
+
+    python -m benchmarks.bench_transaction_list --rows 5000 --iterations 200
+"""
+import argparse
+import statistics
+import time
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import django
+from django.conf import settings
+
+
+def configure():
+    settings.configure(DEFAULT_CHARSET="utf-8", JSON_CODEC="orjson")
+    django.setup()
+
+
+def transactionRows(count, typed):
+    started = datetime(2021, 6, 1, 10, 0, tzinfo=timezone.utc)
+    rows = []
+    for index in range(count):
+        amount = Decimal(index % 5000) + Decimal("0.25")
+        transacted = started + timedelta(minutes=index)
+        rows.append({
+            "Type": "Credit" if index % 3 else "Debit",
+            "Amount": amount if typed else float(amount),
+            "Reference": f"ref-{index:08d}",
+            "DateTransacted": transacted if typed else transacted.isoformat(),
+            "Narration": f"Transfer to wallet {index % 97}",
+            "Balance": Decimal(100000) - amount if typed else float(Decimal(100000) - amount),
+            "Currency": "NGN",
+        })
+    return rows
+
+
+def measure(respond, iterations):
+    # warm up so the samples measure steady state
+    for _ in range(min(5, iterations)):
+        respond()
+
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        response = respond()
+        samples.append(time.perf_counter() - start)
+
+    samples.sort()
+    return {
+        "p50": statistics.median(samples) * 1000,
+        "p99": samples[min(len(samples) - 1, int(len(samples) * 0.99))] * 1000,
+        "bytes": len(response.content),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--typed", action="store_true", help="Decimal amounts and datetime dates")
+    args = parser.parse_args()
+
+    configure()
+    from django.http import JsonResponse
+    from api_utils import codec, views
+
+    rows = transactionRows(args.rows, args.typed)
+    pagination = {"totalPages": 1, "limit": args.rows, "count": args.rows, "currentPage": 1, "hasNextPage": False}
+    body = {"data": rows, "metaData": None, "message": "Wallet transactions", "pagination": pagination}
+
+    def respond():
+        return views.paginatedResponse(message="Wallet transactions", body=rows, pagination=pagination)
+
+    results = [("JsonResponse (before)", measure(lambda: JsonResponse(body, safe=False), args.iterations))]
+    backends = ["json", "orjson"] if codec.orjson is not None else ["json"]
+    if codec.orjson is None:
+        print("orjson is not installed, only the standard library codec is measured")
+    for backend in backends:
+        codec.BACKEND, codec.dumps, codec.loads = codec.selectBackend(backend)
+        results.append((f"codec, {backend}", measure(respond, args.iterations)))
+
+    print(f"transaction list response, {args.rows} rows, {args.iterations} iterations, {'typed' if args.typed else 'plain'} rows")
+    print(f"{'encoder':<24}{'p50 ms':>10}{'p99 ms':>10}{'KiB':>10}")
+    for name, result in results:
+        print(f"{name:<24}{result['p50']:>10.2f}{result['p99']:>10.2f}{result['bytes'] / 1024:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
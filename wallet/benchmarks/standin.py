@@ -0,0 +1,66 @@
+"""
+A local stand-in for the Wallets Africa API used by the benchmarks.
+
+It speaks HTTP/1.1 with keep-alive so pooled clients can reuse connections,
+and answers the handful of endpoints the wallet flows touch with canned data.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+CANNED_RESPONSES = {
+    "wallet/balance": {"WalletBalance": 1000000.0, "WalletCurrency": "NGN"},
+    "wallet/debit": {"Message": "Debit successful"},
+    "wallet/credit": {"Message": "Credit successful"},
+    "wallet/getuser": {"data": {"phoneNumber": "08000000000", "email": "user@example.com"}},
+    "transfer/banks/all": [{"BankCode": "044", "BankName": "Access Bank"}],
+}
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # reply headers and body go out in separate writes; without this Nagle and
+    # delayed ACKs add ~40ms to every keep-alive round trip
+    disable_nagle_algorithm = True
+    latency = 0.0
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+
+        if self.latency:
+            time.sleep(self.latency)
+
+        endpoint = self.path.lstrip("/")
+        data = CANNED_RESPONSES.get(endpoint, {})
+        body = json.dumps({"Response": {"ResponseCode": "200"}, "Data": data}).encode()
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_standin_server(latency=0.0, host="127.0.0.1", port=0):
+    """
+    Start the stand-in server on a background thread and return it.
+    `latency` is added to every response, in seconds.
+    """
+    handler = type("ConfiguredStandInHandler", (StandInHandler,), {"latency": latency})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def base_url(server):
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}"
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from errors.models import Error
+from errors.views import ERROR_CATALOG
+
+
+class Command(BaseCommand):
+    help = "Write the error catalog to the Error table, one row per error code, run it on deploy"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prune', action='store_true', help="also delete the rows of messages that aren't in the catalog")
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        rows = {}
+        for pk, code, description in Error.objects.values_list('pk', 'code', 'description'):
+            rows.setdefault(code, []).append((pk, description))
+
+        keep = set()
+        created = []
+        updated = []
+        for code, description in ERROR_CATALOG.items():
+            codeRows = rows.get(str(int(code)), [])
+            current = [pk for pk, stored in codeRows if stored == description]
+            if current:
+                keep.add(current[0])
+            elif codeRows:
+                # reuse a row of the code for the new description
+                error = Error(pk=codeRows[0][0], code=str(int(code)), description=description)
+                updated.append(error)
+                keep.add(error.pk)
+            else:
+                created.append(Error(code=str(int(code)), description=description))
+
+        pruned = 0
+        if options['prune']:
+            pruned, _ = Error.objects.exclude(pk__in=keep).delete()
+
+        Error.objects.bulk_create(created)
+        Error.objects.bulk_update(updated, ['description'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Error catalog synced, {len(created)} created, {len(updated)} updated, {pruned} pruned"
+        ))
@@ -1,6 +1,4 @@
 from enum import IntEnum
-from .models import Error
-from django.db import IntegrityError
 
 class ErrorCodes(IntEnum):
     GENERIC_ERROR = 0
@@ -10,14 +8,26 @@ class ErrorCodes(IntEnum):
     MISSING_FIELDS = 4
 
 
-# base error
-def getError(code, defaultMessage):
-    try:
-        _, _ = Error.objects.get_or_create(
-            code=code, description=defaultMessage)
+# the error catalog, synced to the Error table by the sync_error_catalog command
+ERROR_CATALOG = {
+    ErrorCodes.GENERIC_ERROR: "The request could not be completed",
+    ErrorCodes.UNAUTHENTICATED_REQUEST: "The request is not authenticated",
+    ErrorCodes.UNAUTHORIZED_REQUEST: "The request is not allowed for the specified credentials",
+    ErrorCodes.INVALID_CREDENTIALS: "Invalid credentials specified",
+    ErrorCodes.MISSING_FIELDS: "Required fields are missing in the request payload",
+}
+
+# payloads of the catalog descriptions, built once and shared, copy before changing one
+ERROR_PAYLOADS = {
+    code: {'errorCode': code, 'message': description}
+    for code, description in ERROR_CATALOG.items()
+}
 
-        return {'errorCode': code, 'message': defaultMessage}
 
-    except IntegrityError:
-        return {'errorCode': code, 'message': defaultMessage}
+# base error
+def getError(code, defaultMessage=None):
+    # error responses never touch the database
+    if defaultMessage == None or defaultMessage == ERROR_CATALOG.get(code):
+        return ERROR_PAYLOADS[code]
 
+    return {'errorCode': code, 'message': defaultMessage}
@@ -136,13 +136,15 @@ CORS_EXPOSE_HEADERS = [
     'Access-Control-Allow-Methods',
     'Access-Control-Allow-Origin',
     'Access-Control-Allow-Headers',
-    'Access-Control-Max-Age'
+    'Access-Control-Max-Age',
+    'Idempotent-Replayed',
 ]
 
 CORS_ALLOW_HEADERS = list(default_headers) + [
     'Access-Token',
     'Secret',
     'Domain',
+    'Idempotency-Key',
 ]
 
 # Static files (CSS, JavaScript, Images)
@@ -161,3 +163,92 @@ WALLETS_BASE_URL = os.getenv('WALLETS_BASE_URL')
 WALLETS_SANDBOX_URL = os.getenv('WALLETS_SANDBOX_URL')
 WALLETS_SECRET_KEY = os.getenv('WALLETS_SECRET_KEY')
 WALLETS_PUBLIC_KEY = os.getenv('WALLETS_PUBLIC_KEY')
+
+# WALLETS AFRICA HTTP CLIENT
+# number of per-host pools kept by the shared session
+WALLETS_HTTP_POOL_CONNECTIONS = int(os.getenv('WALLETS_HTTP_POOL_CONNECTIONS', 4))
+# keep-alive connections kept open per upstream host
+WALLETS_HTTP_POOL_MAXSIZE = int(os.getenv('WALLETS_HTTP_POOL_MAXSIZE', 20))
+# wait for a free connection instead of opening more than POOL_MAXSIZE per host
+WALLETS_HTTP_POOL_BLOCK = os.getenv('WALLETS_HTTP_POOL_BLOCK', 'True') == 'True'
+WALLETS_HTTP_CONNECT_TIMEOUT = float(os.getenv('WALLETS_HTTP_CONNECT_TIMEOUT', 3.05))
+WALLETS_HTTP_READ_TIMEOUT = float(os.getenv('WALLETS_HTTP_READ_TIMEOUT', 30))
+# limits for the asyncio client used by the async views
+WALLETS_ASYNC_HTTP_MAX_CONNECTIONS = int(os.getenv('WALLETS_ASYNC_HTTP_MAX_CONNECTIONS', 200))
+WALLETS_ASYNC_HTTP_MAX_KEEPALIVE = int(os.getenv('WALLETS_ASYNC_HTTP_MAX_KEEPALIVE', 50))
+
+# threads available to api_utils.concurrency.fan_out for parallel upstream calls
+FANOUT_MAX_WORKERS = int(os.getenv('FANOUT_MAX_WORKERS', 32))
+
+# rows fetched per upstream call when mirroring wallet transactions
+TRANSACTIONS_SYNC_BATCH = int(os.getenv('TRANSACTIONS_SYNC_BATCH', 500))
+
+# most transactions served in one page, larger pageBy values are capped to it
+TRANSACTIONS_MAX_PAGE_SIZE = int(os.getenv('TRANSACTIONS_MAX_PAGE_SIZE', 100))
+
+# threads backfilling the history of wallets synced for the first time
+TRANSACTIONS_BACKFILL_WORKERS = int(os.getenv('TRANSACTIONS_BACKFILL_WORKERS', 2))
+
+# seconds the bank list is served before it is refreshed in the background
+BANKS_CACHE_TTL = int(os.getenv('BANKS_CACHE_TTL', 6 * 60 * 60))
+BANKS_CACHE_WARM_ON_START = os.getenv('BANKS_CACHE_WARM_ON_START', 'True') == 'True'
+
+# bank account enquiry results, "not found" answers are kept for the shorter negative TTL
+ENQUIRY_CACHE_SIZE = int(os.getenv('ENQUIRY_CACHE_SIZE', 10000))
+ENQUIRY_CACHE_TTL = int(os.getenv('ENQUIRY_CACHE_TTL', 24 * 60 * 60))
+ENQUIRY_NEGATIVE_CACHE_TTL = int(os.getenv('ENQUIRY_NEGATIVE_CACHE_TTL', 60))
+
+# last known wallet balances, balance reads use them for BALANCE_CACHE_TTL seconds;
+# the funds ledger is only ever synced from a fresh upstream read
+BALANCE_CACHE_SIZE = int(os.getenv('BALANCE_CACHE_SIZE', 10000))
+BALANCE_CACHE_TTL = float(os.getenv('BALANCE_CACHE_TTL', 30))
+
+# wallet_key -> (id, phone number, email) lookups used to authenticate wallet requests.
+# Set WALLET_KEY_CACHE_BACKEND to a CACHES alias (e.g. a shared Redis cache) to keep
+# several workers consistent; it then replaces the in-process LRU
+WALLET_KEY_CACHE_SIZE = int(os.getenv('WALLET_KEY_CACHE_SIZE', 100000))
+WALLET_KEY_CACHE_TTL = int(os.getenv('WALLET_KEY_CACHE_TTL', 5 * 60))
+WALLET_KEY_CACHE_BACKEND = os.getenv('WALLET_KEY_CACHE_BACKEND', '')
+
+# open funds holds older than this (seconds) are closed by reconcile_wallet_funds
+FUNDS_HOLD_TIMEOUT = int(os.getenv('FUNDS_HOLD_TIMEOUT', 15 * 60))
+
+# how long (seconds) a stored Idempotency-Key response is replayed, purge_idempotency_keys removes expired ones
+IDEMPOTENCY_KEY_TTL = int(os.getenv('IDEMPOTENCY_KEY_TTL', 24 * 60 * 60))
+# how long (seconds) a request holds its key before answering; it must outlast the slowest
+# request, after it a retry takes the key over and runs the view again
+IDEMPOTENCY_CLAIM_LEASE = int(os.getenv('IDEMPOTENCY_CLAIM_LEASE', 5 * 60))
+# how long (seconds) a retry waits for the response of the request still running, and how often it looks
+IDEMPOTENCY_WAIT = float(os.getenv('IDEMPOTENCY_WAIT', 10))
+IDEMPOTENCY_POLL_INTERVAL = float(os.getenv('IDEMPOTENCY_POLL_INTERVAL', 0.2))
+
+# run_transfer_jobs worker threads, and how long (seconds) a running job may take
+# before a restarted worker marks it failed
+TRANSFER_JOB_WORKERS = int(os.getenv('TRANSFER_JOB_WORKERS', 4))
+TRANSFER_JOB_TIMEOUT = int(os.getenv('TRANSFER_JOB_TIMEOUT', 15 * 60))
+
+# bulk jobs run by run_batch_jobs: default and maximum items in flight per job, the most
+# entries one request may carry, and how long (seconds) without progress before a
+# running job is considered abandoned and picked up again
+BATCH_CONCURRENCY = int(os.getenv('BATCH_CONCURRENCY', 8))
+BATCH_MAX_CONCURRENCY = int(os.getenv('BATCH_MAX_CONCURRENCY', 32))
+BATCH_MAX_ITEMS = int(os.getenv('BATCH_MAX_ITEMS', 10000))
+BATCH_JOB_STALE_AFTER = int(os.getenv('BATCH_JOB_STALE_AFTER', 5 * 60))
+
+# most wallets one create/bulk request may provision, it runs on the bulk job concurrency settings
+WALLET_PROVISION_MAX_ITEMS = int(os.getenv('WALLET_PROVISION_MAX_ITEMS', 5000))
+
+# most wallets one balance/batch request may ask for
+BALANCE_BATCH_MAX_ITEMS = int(os.getenv('BALANCE_BATCH_MAX_ITEMS', 500))
+
+# most transfers one transfer/wallet request may carry
+WALLET_TRANSFER_MAX_ITEMS = int(os.getenv('WALLET_TRANSFER_MAX_ITEMS', 100))
+
+# most rows of a payout CSV upload
+PAYOUT_BATCH_MAX_ROWS = int(os.getenv('PAYOUT_BATCH_MAX_ROWS', 100000))
+
+# JSON library of the API responses and upstream payloads, "orjson" when installed or "json"
+JSON_CODEC = os.getenv('JSON_CODEC', 'orjson')
+
+# serve the wallet endpoints from the async views (wallet_manager/async_views.py)
+WALLETS_ASYNC_VIEWS = os.getenv('WALLETS_ASYNC_VIEWS', 'False') == 'True'
@@ -14,3 +14,7 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'wallet_config.settings')
 
 application = get_wsgi_application()
+
+# load slow-changing upstream data before the first request needs it
+from wallet_manager.wallets_africa import warm_caches  # noqa: E402
+warm_caches()
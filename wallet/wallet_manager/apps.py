@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class WalletManagerConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'wallet_manager'
+
+    def ready(self):
+        # keeps the wallet key cache in step with saves and deletes
+        from . import signals  # noqa: F401
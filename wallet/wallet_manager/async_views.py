@@ -0,0 +1,344 @@
+from api_utils.views import (
+    badRequestResponse, resourceConflictResponse, internalServerErrorResponse, unAuthenticatedResponse,
+    successResponse, resourceNotFoundResponse, paginatedResponse
+)
+from errors.views import getError, ErrorCodes
+from django.conf import settings
+from api_utils import metrics
+from api_utils.concurrency import async_fan_out, async_bounded_map
+from asgiref.sync import sync_to_async
+from .wallets_africa import AsyncWalletsAfricaAPI
+from .utils import createUserWalletData
+from .banks import bankDirectory, nubanIsValid
+from .wallet_keys import loadWalletFields
+from .locks import asyncWalletLock
+from .endpoints import endpoint, Field, number, money, WALLET_AND_EMAIL, WALLET_KEY, ROOT_CREDENTIALS
+from .idempotency import idempotent
+from .payments import debitWalletAsync, creditWalletAsync, transferToBankAsync, transferBetweenWalletsAsync
+from .transactions import transactionSyncWindow, afetchWalletTransactions, backfillWalletTransactions
+from . import views
+from .views import (
+    serializeTransactions, paginateUpstreamTransactions, upstreamFailed, walletLookupSettled, balanceOutcome,
+    balancesResponse, walletInfoResponse, walletTransferResponse, transactionsQuery
+)
+from datetime import date
+
+# instantiate
+async_wallets_api = AsyncWalletsAfricaAPI()
+
+# ORM access is sync-only, run it on the thread pool
+loadWalletFieldsAsync = sync_to_async(loadWalletFields)
+createUserWalletDataAsync = sync_to_async(createUserWalletData)
+queueWalletProvisioningAsync = sync_to_async(views.queueWalletProvisioning)
+balanceRequestsAsync = sync_to_async(views.balanceRequests)
+walletTotalsAsync = sync_to_async(views.walletTotals)
+mirroredTransactionsPageAsync = sync_to_async(views.mirroredTransactionsPage)
+queueBankTransferAsync = sync_to_async(views.queueBankTransfer)
+transferDestinationsAsync = sync_to_async(views.transferDestinations)
+
+
+@endpoint(root=ROOT_CREDENTIALS, fields=['first_name', 'last_name', 'email', 'birthday', 'phone_number'])
+async def createSubWalletForUser(request, first_name, last_name, email, birthday, phone_number):
+    # check if sub wallet exists for phone number or email passed, both lookups run at once
+    lookups = await async_fan_out(
+        async_wallets_api.get_wallet_by_phone(phone_number),
+        async_wallets_api.get_wallet_by_email(email),
+        stop_when=walletLookupSettled
+    )
+    conflictMessages = [
+        "Wallets Already Exist for the Phone number specified",
+        "Wallets Already Exist for the Email Address specified"
+    ]
+    for lookup, conflictMessage in zip(lookups, conflictMessages):
+        if lookup == None:
+            # cancelled, the other lookup already settled the request
+            continue
+
+        existingWallet, msg = lookup
+        if existingWallet == None:
+            return internalServerErrorResponse(getError(ErrorCodes.GENERIC_ERROR, msg))
+        elif msg:
+            return resourceConflictResponse(getError(ErrorCodes.GENERIC_ERROR, conflictMessage))
+
+    # generate sub-wallet
+    createdWalletData, outcome = await async_wallets_api.generate_wallet(first_name, last_name, email, birthday, phone_number)
+    if createdWalletData == None:
+        return internalServerErrorResponse(getError(ErrorCodes.GENERIC_ERROR, outcome))
+    if not outcome:
+        # the request failed
+        return createdWalletData
+
+    # create reference on our model
+    user_wallet = await createUserWalletDataAsync(createdWalletData)
+    wallet_key = user_wallet.wallet_key
+
+    return successResponse(message="Wallet created", body={"wallet_key": wallet_key})
+
+
+@idempotent
+@endpoint(root=ROOT_CREDENTIALS, fields=[
+    Field('wallets', arg='rows'), Field('concurrency', int, required=False, message="Concurrency should be a number"),
+])
+async def bulkCreateSubWallets(request, rows, concurrency):
+    if not isinstance(rows, list) or not rows or len(rows) > settings.WALLET_PROVISION_MAX_ITEMS:
+        return badRequestResponse(getError(ErrorCodes.GENERIC_ERROR, f"wallets should be a list of 1 to {settings.WALLET_PROVISION_MAX_ITEMS} entries"))
+
+    return await queueWalletProvisioningAsync(rows, concurrency)
+
+
+@endpoint(fields=['pin'], wallet=WALLET_AND_EMAIL)
+async def setWalletPin(request, wallet, pin):
+    phone_number = wallet.phone_number
+
+    # requests for the same wallet run one at a time from here
+    async with asyncWalletLock(wallet):
+        # change wallet pin
+        pinChange, msg = await async_wallets_api.set_wallet_pin(pin, phone_number)
+
+        if pinChange == None:
+            return internalServerErrorResponse(getError(ErrorCodes.GENERIC_ERROR, msg))
+        if not msg:
+            # the request failed
+            return pinChange
+
+    return successResponse(message="Wallet pin changed successfully", body={})
+
+
+@endpoint(wallet=WALLET_AND_EMAIL)
+async def getSubWalletBalance(request, wallet):
+    phone_number = wallet.phone_number
+    # get wallet balance, served from the balance cache while it is fresh
+    balance, msg = async_wallets_api.cached_wallet_balance(phone_number) or await async_wallets_api.get_wallet_balance(phone_number)
+    if balance == None:
+        return internalServerErrorResponse(getError(ErrorCodes.GENERIC_ERROR, msg))
+    if not msg:
+        # the request failed
+        return balance
+
+    return successResponse(message="Wallet balance", body=balance)
+
+
+@endpoint(root=True, fields=[
+    Field('wallet_keys', arg='walletKeys'),
+    Field('max_age', number, required=False, arg='maxAge', message="max_age should be a number of seconds"),
+])
+async def getSubWalletBalances(request, walletKeys, maxAge):
+    balanceRequest, errorResponse = await balanceRequestsAsync(walletKeys, maxAge)
+    if balanceRequest == None:
+        return errorResponse
+    walletKeys, outcomes, stale = balanceRequest
+
+    async def fetchBalance(wallet):
+        return await async_wallets_api.get_wallet_balance(wallet.phone_number)
+
+    for wallet, result in await async_bounded_map(fetchBalance, stale, settings.BATCH_CONCURRENCY):
+        outcomes[wallet.wallet_key] = balanceOutcome(wallet.wallet_key, result)
+
+    return balancesResponse(walletKeys, outcomes)
+
+
+@idempotent
+@endpoint(fields=[Field('amount', money)], wallet=WALLET_AND_EMAIL)
+async def debitSubWallet(request, wallet, amount):
+    data, errorResponse = await debitWalletAsync(wallet, amount)
+    if data == None:
+        return errorResponse
+
+    return successResponse(message="Wallet Debit to Main Wallet Transfer", body=data)
+
+
+@idempotent
+@endpoint(root=True, fields=[Field('amount', money)], wallet=WALLET_KEY)
+async def creditSubWallet(request, wallet, amount):
+    data, errorResponse = await creditWalletAsync(wallet, amount)
+    if data == None:
+        return errorResponse
+
+    return successResponse(message="Main Wallet Credit to Sub Wallet", body=data)
+
+
+@endpoint(fields=['pin'], wallet=WALLET_AND_EMAIL)
+async def getWalletInfo(request, wallet, pin):
+    phone_number = wallet.phone_number
+    await loadWalletFieldsAsync(wallet, 'created_at', 'signed_up_at', 'transactions_synced_to')
+
+    synced = wallet.transactions_synced_to != None
+
+    # get user data and, for a mirrored wallet, its new transactions at the same time
+    sync_from, sync_to = transactionSyncWindow(wallet)
+    calls = [async_wallets_api.get_wallet_by_email(wallet.email_address)]
+    if synced:
+        calls.append(afetchWalletTransactions(async_wallets_api, pin, phone_number, sync_from, sync_to))
+    else:
+        # the PIN only goes to the background backfill otherwise, have the upstream check it first
+        calls.append(async_wallets_api.get_wallet_transactions(pin, phone_number, sync_to, sync_to, take=1))
+    results = await async_fan_out(*calls, stop_when=upstreamFailed)
+    for result in results:
+        if result == None:
+            # cancelled, the other call already failed
+            continue
+
+        data, msg = result
+        if data == None:
+            return internalServerErrorResponse(getError(ErrorCodes.GENERIC_ERROR, msg))
+        if not msg:
+            # the request failed
+            return data
+
+    walletByEmail, _ = results[0]
+    aggregate = await walletTotalsAsync(wallet, pin, results[1][0] if synced else None, sync_to)
+
+    return walletInfoResponse(walletByEmail, aggregate)
+
+
+@endpoint(fields=['pin'], wallet=WALLET_AND_EMAIL)
+async def retrieveSubWalletTransactions(request, wallet, pin):
+    phone_number = wallet.phone_number
+    await loadWalletFieldsAsync(wallet, 'created_at', 'signed_up_at', 'transactions_synced_to')
+
+    query, errorResponse = transactionsQuery(request, wallet)
+    if query == None:
+        return errorResponse
+    date_from, transaction_type, pageNum, pageBy = query
+
+    if wallet.transactions_synced_to == None:
+        # never mirrored, serve the page from the upstream while the history is backfilled
+        skip = (pageNum - 1) * pageBy
+        transactions, msg = await async_wallets_api.get_wallet_transactions(pin, phone_number, date_from, str(date.today()), transaction_type, take=pageBy + 1, skip=skip)
+        if transactions == None:
+            return internalServerErrorResponse(getError(ErrorCodes.GENERIC_ERROR, msg))
+        if not msg:
+            # the request failed
+            return transactions
+
+        backfillWalletTransactions(views.wallets_api, wallet, pin)
+        paginated_transactions, paginationDetails = paginateUpstreamTransactions(transactions['data'], pageNum, pageBy)
+        return paginatedResponse(message="Wallet transactions", body=serializeTransactions(paginated_transactions), pagination=paginationDetails)
+
+    # bring the local mirror up to date, only the delta since the last sync goes upstream
+    sync_from, sync_to = transactionSyncWindow(wallet)
+    delta, msg = await afetchWalletTransactions(async_wallets_api, pin, phone_number, sync_from, sync_to)
+    if delta == None:
+        return internalServerErrorResponse(getError(ErrorCodes.GENERIC_ERROR, msg))
+    if not msg:
+        # the request failed
+        return delta
+
+    return await mirroredTransactionsPageAsync(wallet, delta, sync_to, date_from, transaction_type, pageNum, pageBy)
+
+
+@idempotent
+@endpoint(fields=[
+    'bank_code', 'account_number', Field('amount', money), 'account_name', 'description',
+    Field('async', required=False, arg='runAsync'),
+], wallet=WALLET_AND_EMAIL)
+async def subWalletTransferToBankAcct(request, wallet, bank_code, account_number, amount, account_name, description, runAsync):
+    if runAsync:
+        return await queueBankTransferAsync(wallet, bank_code, account_number, amount, account_name, description)
+
+    transfer, errorResponse = await transferToBankAsync(wallet, amount, bank_code, account_number, account_name, description)
+    if transfer == None:
+        return errorResponse
+
+    return successResponse(message="Wallet to Bank Account Transfer", body=transfer)
+
+
+async def getTransferJob(request):
+    return await sync_to_async(views.getTransferJob)(request)
+
+
+async def getTransferJobs(request):
+    return await sync_to_async(views.getTransferJobs)(request)
+
+
+async def bulkCreditSubWallets(request):
+    return await sync_to_async(views.bulkCreditSubWallets)(request)
+
+
+async def uploadPayoutBatch(request):
+    return await sync_to_async(views.uploadPayoutBatch)(request)
+
+
+async def getBatchJob(request):
+    return await sync_to_async(views.getBatchJob)(request)
+
+
+async def downloadBatchResults(request):
+    return await sync_to_async(views.downloadBatchResults)(request)
+
+
+@idempotent
+@endpoint(fields=[
+    Field('transfers', required=False), Field('wallet_key', required=False, arg='walletKey'), Field('amount', money, required=False),
+], wallet=WALLET_AND_EMAIL)
+async def subWalletTransferToSubWallet(request, wallet, transfers, walletKey, amount):
+    transferRequest, errorResponse = await transferDestinationsAsync(wallet, transfers, walletKey, amount)
+    if transferRequest == None:
+        return errorResponse
+    destinations, batch = transferRequest
+
+    data, errorResponse = await transferBetweenWalletsAsync(wallet, destinations)
+    if data == None:
+        return errorResponse
+
+    return walletTransferResponse(data, batch)
+
+
+# operational data about the service, only for callers holding the root Secret
+@endpoint("GET", root=True)
+async def getMetrics(request):
+
+    return successResponse(message="Metrics", body=metrics.snapshot())
+
+
+@endpoint("GET")
+async def getAllBanks(request):
+
+    all_banks, msg = await async_wallets_api.get_all_banks()
+    if all_banks == None:
+        return internalServerErrorResponse(getError(ErrorCodes.GENERIC_ERROR, msg))
+    if not msg:
+        # the request failed
+        return all_banks
+
+    return successResponse(message="All Banks", body=all_banks)
+
+
+@endpoint("GET")
+async def searchBanks(request):
+
+    query = request.GET.get('q', '')
+    try:
+        limit = min(int(request.GET.get('limit') or 10), 50)
+    except ValueError:
+        return badRequestResponse(getError(ErrorCodes.GENERIC_ERROR, "Limit param should be a number"))
+
+    all_banks, msg = await async_wallets_api.get_all_banks()
+    if all_banks == None:
+        return internalServerErrorResponse(getError(ErrorCodes.GENERIC_ERROR, msg))
+    if not msg:
+        # the request failed
+        return all_banks
+
+    banks = bankDirectory(all_banks).search(query, limit)
+    return successResponse(message="Bank Search", body=banks)
+
+
+@endpoint(fields=['bank_code', 'account_number'])
+async def bankAccountEnquiry(request, bank_code, account_number):
+    # reject malformed account numbers locally before spending an upstream call
+    all_banks, msg = await async_wallets_api.get_all_banks()
+    if all_banks != None and msg is True:
+        if not bankDirectory(all_banks).is_valid_account(bank_code, account_number):
+            return badRequestResponse(getError(ErrorCodes.GENERIC_ERROR, "The account number is not valid for the bank specified"))
+    elif not nubanIsValid(bank_code, account_number):
+        return badRequestResponse(getError(ErrorCodes.GENERIC_ERROR, "The account number is not valid for the bank specified"))
+
+    bank_account, msg = await async_wallets_api.bank_account_enquiry(bank_code, account_number)
+    if bank_account == None:
+        return internalServerErrorResponse(getError(ErrorCodes.GENERIC_ERROR, msg))
+    if not msg:
+        # the request failed
+        return bank_account
+
+    return successResponse(message="Bank Account Enquiry", body=bank_account)
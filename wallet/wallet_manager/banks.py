@@ -0,0 +1,152 @@
+from bisect import bisect_left
+from difflib import get_close_matches
+import logging
+import re
+import threading
+# Get an instance of a logger
+logger = logging.getLogger(__name__)
+
+# CBN NUBAN check-digit weights for a 6 digit institution code plus a 9 digit serial
+NUBAN_WEIGHTS = [3, 7, 3, 3, 7, 3, 3, 7, 3, 3, 7, 3, 3, 7, 3]
+
+
+def normalizeBankName(name):
+    return re.sub(r'[^a-z0-9]+', ' ', str(name).lower()).strip()
+
+
+def nubanInstitutionCode(bankCode):
+    """
+    Return the 6 digit code the NUBAN check digit is computed with, or None
+    when the code can't be checked locally.
+
+    3 digit codes are deposit money banks and are zero padded; 5 digit codes
+    are other financial institutions and get the CBN "9" prefix. 6 digit codes
+    are ambiguous (NIP codes look the same) so those are left to the upstream.
+    """
+    code = str(bankCode).strip()
+    if not code.isdigit():
+        return None
+    if len(code) == 3:
+        return "000" + code
+    if len(code) == 5:
+        return "9" + code
+    return None
+
+
+def nubanIsValid(bankCode, accountNumber):
+    """
+    Check a NUBAN account number against its bank code.
+    Returns False only when the number is certainly invalid.
+    """
+    accountNumber = str(accountNumber).strip()
+    if len(accountNumber) != 10 or not accountNumber.isdigit():
+        return False
+
+    institutionCode = nubanInstitutionCode(bankCode)
+    if institutionCode == None:
+        return True
+
+    digits = institutionCode + accountNumber[:9]
+    checkDigit = (10 - sum(int(digit) * weight for digit, weight in zip(digits, NUBAN_WEIGHTS)) % 10) % 10
+    return checkDigit == int(accountNumber[9])
+
+
+def bankList(banks):
+    # the payload is a list of banks, or one wrapped in a "data" object
+    if isinstance(banks, dict):
+        banks = banks.get('data', banks.get('Data'))
+    return banks if isinstance(banks, list) else []
+
+
+class BankDirectory:
+    """
+    Indexed view of the transfer/banks/all payload: lookup by bank code and
+    prefix search on any word of the bank name, with a fuzzy fallback.
+    """
+
+    def __init__(self, banks):
+        self.source = banks
+        self.by_code = {}
+        self.names = {}
+        prefixIndex = []
+
+        for bank in bankList(banks):
+            if not isinstance(bank, dict):
+                continue
+
+            code = bank.get('BankCode') or bank.get('bankCode') or bank.get('Code')
+            name = bank.get('BankName') or bank.get('bankName') or bank.get('Name')
+            if code == None or not name:
+                continue
+
+            code = str(code)
+            normalized = normalizeBankName(name)
+            self.by_code[code] = bank
+            self.names.setdefault(normalized, code)
+
+            # index every word boundary so "bank" finds "Access Bank" and "First City Monument Bank"
+            words = normalized.split()
+            for position in range(len(words)):
+                prefixIndex.append((" ".join(words[position:]), code))
+
+        prefixIndex.sort()
+        self.prefix_keys = [key for key, _ in prefixIndex]
+        self.prefix_codes = [code for _, code in prefixIndex]
+
+    def get(self, bankCode):
+        return self.by_code.get(str(bankCode).strip())
+
+    def search(self, query, limit=10):
+        query = normalizeBankName(query)
+        if not query:
+            return []
+
+        codes = []
+        position = bisect_left(self.prefix_keys, query)
+        while position < len(self.prefix_keys) and self.prefix_keys[position].startswith(query):
+            code = self.prefix_codes[position]
+            if code not in codes:
+                codes.append(code)
+                if len(codes) >= limit:
+                    break
+            position += 1
+
+        if len(codes) < limit:
+            for name in get_close_matches(query, self.names, n=limit, cutoff=0.6):
+                code = self.names[name]
+                if code not in codes:
+                    codes.append(code)
+                    if len(codes) >= limit:
+                        break
+
+        return [self.by_code[code] for code in codes]
+
+    def is_valid_account(self, bankCode, accountNumber):
+        """
+        False only when the account number is certainly invalid for the bank. A
+        bank code the directory doesn't know (or an empty directory) is left to
+        the upstream enquiry, the directory may lag behind the upstream's banks.
+        """
+        if self.get(bankCode) == None:
+            logger.warning(f"is_valid_account: bank code {bankCode} is not in the bank directory ({len(self.by_code)} banks), left to the upstream")
+        return nubanIsValid(bankCode, accountNumber)
+
+
+_directory = None
+_directory_lock = threading.Lock()
+
+
+def bankDirectory(allBanks):
+    """
+    Return the BankDirectory for a get_all_banks payload, rebuilt only when the cached payload changes.
+    """
+    global _directory
+
+    directory = _directory
+    if directory is not None and directory.source is allBanks:
+        return directory
+
+    with _directory_lock:
+        if _directory is None or _directory.source is not allBanks:
+            _directory = BankDirectory(allBanks)
+        return _directory
@@ -0,0 +1,471 @@
+"""
+Bulk operations run by run_batch_jobs.
+
+A BatchJob is stored with one BatchItem per input entry. Workers run the
+pending items through a bounded pool and write each outcome as it lands, so
+a job stopped half way resumes from the items still pending. A worker holds
+the job under a lease (BatchJob.attempt): once another worker reclaims the job
+its writes are refused and it stops. Item runners are looked up by job kind in
+ITEM_RUNNERS; each takes the item and returns (result, None) or (None, error).
+"""
+
+from .models import BatchJob, BatchItem, UserWalletData
+from .payments import wallets_api, creditWallet, debitWallet, payBankAccount, elapsedMs, responseError
+from .ledger import MAX_AMOUNT
+from .banks import nubanIsValid
+from .provisioning import PROVISION_FIELDS, screenRows, provisionRow
+from api_utils import metrics
+from api_utils.concurrency import bounded_map
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Avg, Count, DateTimeField, F, Max, Q, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from datetime import timedelta
+from decimal import Decimal, InvalidOperation
+from functools import partial
+from itertools import islice
+import csv
+import io
+import json
+import time
+import uuid
+import logging
+# Get an instance of a logger
+logger = logging.getLogger(__name__)
+
+# columns of a payout CSV, narration is optional
+PAYOUT_COLUMNS = ['wallet_key', 'bank_code', 'account_number', 'amount', 'narration']
+
+
+
+class BatchTooLarge(Exception):
+    pass
+
+
+class BatchLeaseLost(Exception):
+    pass
+
+
+item_latency = metrics.LatencyStats()
+metrics.register("batchItemLatency", item_latency.stats)
+
+
+def parseAmount(value):
+    """
+    Positive amount with at most 2 decimal places as a float, or None.
+    """
+    try:
+        amount = Decimal(str(value).strip())
+    except (InvalidOperation, ValueError):
+        return None
+
+    if not amount.is_finite() or amount <= 0 or amount > MAX_AMOUNT or amount != amount.quantize(Decimal("0.01")):
+        return None
+    return float(amount)
+
+
+def failedItem(position, data, message):
+    return BatchItem(position=position, data=data, status=BatchItem.FAILED, error={"message": message})
+
+
+def creditBatchItems(jobId, credits):
+    """
+    BatchItems for a bulk credit request, wallets resolved in one query.
+    Entries that can't be credited are failed up front.
+    """
+    walletKeys = {entry.get('wallet_key') for entry in credits if isinstance(entry, dict)}
+    wallets = {wallet.wallet_key: wallet for wallet in UserWalletData.objects.filter(wallet_key__in=walletKeys)}
+
+    items = []
+    for position, entry in enumerate(credits):
+        if not isinstance(entry, dict):
+            items.append(failedItem(position, entry, "Each credit should be an object with wallet_key and amount"))
+            continue
+
+        wallet = wallets.get(entry.get('wallet_key'))
+        amount = parseAmount(entry.get('amount'))
+        if wallet == None:
+            items.append(failedItem(position, entry, "No wallet exists for the specified wallet_key"))
+        elif amount == None:
+            items.append(failedItem(position, entry, "Amount should be a positive number with at most 2 decimal places"))
+        else:
+            # a fixed reference per item, so a resumed job can tell the credits it already made
+            reference = str(entry.get('reference') or f"{jobId.hex[:8]}-{position}")
+            items.append(BatchItem(position=position, wallet=wallet, data={
+                "wallet_key": wallet.wallet_key, "amount": amount, "reference": reference
+            }))
+
+    return items
+
+
+def provisionBatchItems(rows):
+    """
+    BatchItems for a bulk wallet creation request. Rows screenRows settles
+    without an upstream call are failed up front with their outcome.
+    """
+    outcomes = [None] * len(rows)
+    remaining = dict(screenRows(rows, outcomes))
+
+    items = []
+    for position, row in enumerate(rows):
+        if position in remaining:
+            items.append(BatchItem(position=position, data={field: remaining[position][field] for field in PROVISION_FIELDS}))
+            continue
+
+        outcome = outcomes[position]
+        error = {"outcome": outcome['status'], "message": outcome.get('message')}
+        items.append(BatchItem(position=position, data=row, status=BatchItem.FAILED, error=error))
+
+    return items
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def createBatchJob(kind, items, concurrency=None, jobId=None, **fields):
+    """
+    Store a job and its items. `items` can be a generator, it is written a
+    chunk at a time. Items already failed count as processed.
+    """
+    concurrency = concurrency or settings.BATCH_CONCURRENCY
+
+    with transaction.atomic():
+        job = BatchJob.objects.create(
+            id=jobId or uuid.uuid4(),
+            kind=kind,
+            concurrency=max(1, min(concurrency, settings.BATCH_MAX_CONCURRENCY)),
+            **fields
+        )
+
+        for chunk in chunked(items, 1000):
+            for item in chunk:
+                item.job = job
+            BatchItem.objects.bulk_create(chunk)
+
+            job.total_items += len(chunk)
+            job.failed_items += sum(1 for item in chunk if item.status == BatchItem.FAILED)
+
+        job.processed_items = job.failed_items
+        job.save(update_fields=['total_items', 'processed_items', 'failed_items'])
+
+    return job
+
+
+def limitRows(rows, maxRows):
+    """
+    Pass rows through, raising BatchTooLarge past maxRows.
+    """
+    for count, row in enumerate(rows, start=1):
+        if count > maxRows:
+            raise BatchTooLarge(f"A batch can't have more than {maxRows} rows")
+        yield row
+
+
+def payoutBatchItems(jobId, rows):
+    """
+    BatchItems for the rows of a payout CSV, read and resolved 1000 rows at a time.
+    Rows that can't be paid out are failed up front.
+    """
+    position = 0
+    for chunk in chunked(rows, 1000):
+        walletKeys = {row.get('wallet_key') for row in chunk}
+        wallets = {wallet.wallet_key: wallet for wallet in UserWalletData.objects.filter(wallet_key__in=walletKeys)}
+
+        for row in chunk:
+            data = {column: (row.get(column) or "").strip() for column in PAYOUT_COLUMNS}
+            wallet = wallets.get(data['wallet_key'])
+            amount = parseAmount(data['amount'])
+
+            if wallet == None:
+                yield failedItem(position, data, "No wallet exists for the specified wallet_key")
+            elif amount == None:
+                yield failedItem(position, data, "Amount should be a positive number with at most 2 decimal places")
+            elif not nubanIsValid(data['bank_code'], data['account_number']):
+                # only certainly invalid numbers, bank codes the directory doesn't know are left to the upstream
+                yield failedItem(position, data, "The account number is not valid for the bank specified")
+            else:
+                # fixed references per item, so a resumed job can tell which steps already ran
+                data.update(
+                    amount=amount,
+                    debit_reference=f"{jobId.hex[:8]}-{position}d",
+                    transfer_reference=f"{jobId.hex[:8]}-{position}t"
+                )
+                yield BatchItem(position=position, wallet=wallet, data=data)
+
+            position += 1
+
+
+def checkpointBatchItem(item, step):
+    """
+    Note on the item that one of its money movements went through, so a resumed
+    job doesn't run it again.
+    """
+    item.data[step] = True
+    if not BatchItem.objects.filter(pk=item.pk, job__attempt=item.job.attempt).update(data=item.data):
+        raise BatchLeaseLost(f"batch job {item.job_id} was reclaimed by another worker")
+
+
+def runCreditItem(item):
+    reference = item.data['reference']
+    if item.data.get('credited'):
+        return {"amount": item.data['amount'], "reference": reference, "alreadyCredited": True}, None
+
+    data, errorResponse = creditWallet(item.wallet, item.data['amount'], reference=reference)
+    if data == None:
+        return None, responseError(errorResponse)
+
+    checkpointBatchItem(item, 'credited')
+    return data, None
+
+
+def runPayoutItem(item):
+    data = item.data
+    timings = {}
+
+    started = time.monotonic()
+    account, msg = wallets_api.bank_account_enquiry(data['bank_code'], data['account_number'])
+    timings['enquiry'] = elapsedMs(started)
+    if account == None:
+        return None, {"message": msg, "timings": timings}
+    if not msg:
+        # the request failed
+        return None, dict(responseError(account), timings=timings)
+    accountName = account.get('AccountName') or account.get('accountName') if isinstance(account, dict) else None
+
+    # the debit is the checkpoint: once it went through a resumed job only retries the transfer
+    if not data.get('debited'):
+        debit, errorResponse = debitWallet(item.wallet, data['amount'], reference=data['debit_reference'], timings=timings)
+        if debit == None:
+            return None, dict(responseError(errorResponse), timings=timings)
+        checkpointBatchItem(item, 'debited')
+
+    transfer, errorResponse = payBankAccount(
+        data['amount'], data['bank_code'], data['account_number'], accountName, data['narration'],
+        reference=data['transfer_reference'], timings=timings
+    )
+    if transfer == None:
+        return None, dict(responseError(errorResponse), timings=timings)
+
+    return {"accountName": accountName, "transfer": transfer, "timings": timings}, None
+
+
+def runProvisionItem(item):
+    return provisionRow(item.data)
+
+
+ITEM_RUNNERS = {
+    BatchJob.CREDIT: runCreditItem,
+    BatchJob.PAYOUT: runPayoutItem,
+    BatchJob.PROVISION: runProvisionItem,
+}
+
+# input columns copied to the result file, per job kind
+RESULT_COLUMNS = {
+    BatchJob.CREDIT: ['wallet_key', 'amount', 'reference'],
+    BatchJob.PAYOUT: PAYOUT_COLUMNS + ['debit_reference', 'transfer_reference'],
+    BatchJob.PROVISION: ['email', 'phone_number'],
+}
+
+
+def renewBatchLease(job, **fields):
+    """
+    Send the job's heartbeat, with any other updates, while the worker still holds its lease.
+    """
+    if not BatchJob.objects.filter(pk=job.pk, attempt=job.attempt).update(heartbeat_at=timezone.now(), **fields):
+        raise BatchLeaseLost(f"batch job {job.pk} was reclaimed by another worker")
+
+
+def processBatchItem(runner, job, item):
+    # a reclaimed job is the new worker's, this one must not run any more items
+    renewBatchLease(job)
+    item.job = job
+
+    started = time.monotonic()
+    try:
+        result, error = runner(item)
+    except BatchLeaseLost:
+        raise
+    except Exception as e:
+        logger.error("processBatchItem@Error")
+        logger.error(e)
+        result, error = None, {"message": str(e)}
+
+    latency = elapsedMs(started)
+    item_latency.record(latency / 1000)
+
+    status = BatchItem.SUCCEEDED if error == None else BatchItem.FAILED
+    counter = 'succeeded_items' if error == None else 'failed_items'
+    written = BatchItem.objects.filter(pk=item.pk, status=BatchItem.PENDING, job__attempt=job.attempt).update(
+        status=status, result=result, error=error, latency_ms=latency
+    )
+    if not written:
+        raise BatchLeaseLost(f"batch job {job.pk} was reclaimed by another worker")
+    renewBatchLease(job, processed_items=F('processed_items') + 1, **{counter: F(counter) + 1})
+    return status
+
+
+def pendingBatchItems(job, chunkSize=500):
+    """
+    The job's pending items in position order, read a chunk at a time.
+    """
+    position = -1
+    while True:
+        chunk = list(
+            BatchItem.objects.select_related('wallet').filter(job=job, status=BatchItem.PENDING, position__gt=position)
+            .order_by('position')[:chunkSize]
+        )
+        yield from chunk
+        if len(chunk) < chunkSize:
+            return
+        position = chunk[-1].position
+
+
+def claimNextBatchJob(worker):
+    """
+    Claim the oldest queued job, or a running one whose worker stopped sending heartbeats.
+    The claim takes a new lease, so the previous worker's writes are refused from now on.
+    """
+    now = timezone.now()
+    staleBefore = now - timedelta(seconds=settings.BATCH_JOB_STALE_AFTER)
+
+    with transaction.atomic():
+        job = BatchJob.objects.select_for_update(skip_locked=True).filter(
+            Q(status=BatchJob.QUEUED) | Q(status=BatchJob.RUNNING, heartbeat_at__lt=staleBefore)
+        ).order_by('created_at').first()
+        if job == None:
+            return None
+
+        claimed = BatchJob.objects.filter(pk=job.pk, status=job.status, heartbeat_at=job.heartbeat_at).update(
+            status=BatchJob.RUNNING,
+            worker=worker,
+            attempt=F('attempt') + 1,
+            heartbeat_at=now,
+            started_at=Coalesce('started_at', Value(now, output_field=DateTimeField()))
+        )
+        if not claimed:
+            return None
+
+    job.refresh_from_db()
+    return job
+
+
+def runBatchJob(job, progress=None):
+    """
+    Run the job's pending items, calling progress(job) every few hundred items.
+    Returns the completed job, or None when another worker reclaimed it.
+    """
+    runner = ITEM_RUNNERS[job.kind]
+
+    done = 0
+    try:
+        for _ in bounded_map(partial(processBatchItem, runner, job), pendingBatchItems(job), job.concurrency):
+            done += 1
+            if progress != None and done % 500 == 0:
+                job.refresh_from_db(fields=['processed_items', 'succeeded_items', 'failed_items'])
+                progress(job)
+
+        job.refresh_from_db(fields=['processed_items', 'succeeded_items', 'failed_items'])
+        job.finished_at = timezone.now()
+        job.stats = batchJobStats(job)
+        job.results = batchResults(job)
+        job.status = BatchJob.COMPLETED
+        renewBatchLease(job, status=job.status, finished_at=job.finished_at, stats=job.stats, results=job.results)
+
+    except BatchLeaseLost as e:
+        logger.error("runBatchJob@Error")
+        logger.error(e)
+        return None
+
+    return job
+
+
+def batchResults(job):
+    """
+    The outcome of every item as CSV, stored on the job for batch/job/results.
+    """
+    columns = RESULT_COLUMNS.get(job.kind, [])
+
+    with io.StringIO(newline='') as resultFile:
+        writer = csv.writer(resultFile)
+        writer.writerow(['position', 'status'] + columns + ['error', 'result', 'latency_ms'])
+
+        position = -1
+        while True:
+            chunk = list(BatchItem.objects.filter(job=job, position__gt=position).order_by('position')[:1000])
+            for item in chunk:
+                data = item.data if isinstance(item.data, dict) else {}
+                writer.writerow(
+                    [item.position, item.status]
+                    + [data.get(column, "") for column in columns]
+                    + [
+                        (item.error or {}).get('message') or (json.dumps(item.error) if item.error else ""),
+                        json.dumps(item.result) if item.result != None else "",
+                        item.latency_ms if item.latency_ms != None else "",
+                    ]
+                )
+            if len(chunk) < 1000:
+                break
+            position = chunk[-1].position
+
+        return resultFile.getvalue().encode()
+
+
+def batchJobStats(job):
+    items = BatchItem.objects.filter(job=job, latency_ms__isnull=False)
+    summary = items.aggregate(count=Count('id'), mean=Avg('latency_ms'), longest=Max('latency_ms'))
+    latencies = items.order_by('latency_ms').values_list('latency_ms', flat=True)
+
+    def percentile(fraction):
+        if not summary['count']:
+            return None
+        return latencies[int((summary['count'] - 1) * fraction)]
+
+    elapsed = ((job.finished_at or timezone.now()) - (job.started_at or job.created_at)).total_seconds()
+    return {
+        "elapsedSeconds": round(elapsed, 3),
+        "itemsPerSecond": round(summary['count'] / elapsed, 3) if elapsed > 0 else None,
+        "latencyMs": {
+            "mean": round(summary['mean'], 3) if summary['mean'] != None else None,
+            "p50": percentile(0.5),
+            "p95": percentile(0.95),
+            "p99": percentile(0.99),
+            "max": summary['longest'],
+        },
+    }
+
+
+def serializeBatchJob(job):
+    return {
+        "jobId": str(job.id),
+        "kind": job.kind,
+        "status": job.status,
+        "concurrency": job.concurrency,
+        "totalItems": job.total_items,
+        "processedItems": job.processed_items,
+        "succeededItems": job.succeeded_items,
+        "failedItems": job.failed_items,
+        "stats": job.stats if job.status == BatchJob.COMPLETED else batchJobStats(job),
+        "sourceName": job.source_name,
+        "hasResultFile": job.status == BatchJob.COMPLETED,
+        "createdAt": job.created_at.isoformat() if job.created_at else None,
+        "startedAt": job.started_at.isoformat() if job.started_at else None,
+        "finishedAt": job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+def serializeBatchItem(item):
+    return {
+        "position": item.position,
+        "data": item.data,
+        "status": item.status,
+        "result": item.result,
+        "error": item.error,
+        "latencyMs": item.latency_ms,
+    }
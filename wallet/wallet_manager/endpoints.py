@@ -0,0 +1,191 @@
+"""
+Declarative request handling for the wallet views.
+
+@endpoint states what a view takes: its HTTP method, whether it needs the root
+Secret header, the JSON fields of its body and how the wallet is authenticated.
+The checks every view used to spell out run in one pass over a spec compiled
+when the view is defined, in the order the views always ran them and with the
+same error responses. The view is then called with the wallet and the parsed
+fields as keyword arguments. Async views are supported, the wallet lookup
+then runs through sync_to_async.
+"""
+
+from .wallet_keys import getWalletUsingKey
+from .batches import parseAmount
+from api_utils import codec
+from api_utils.views import badRequestResponse, unAuthorizedResponse
+from errors.views import getError, ErrorCodes
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from asgiref.sync import sync_to_async
+from functools import wraps
+import asyncio
+
+# how a view authenticates its wallet
+WALLET_AND_EMAIL = "email"  # secret_key plus the email_address the wallet belongs to
+WALLET_KEY = "key"          # secret_key alone
+
+# root=ROOT_CREDENTIALS answers a wrong Secret header the way wallet creation
+# always has, 400 INVALID_CREDENTIALS; root=True answers 401 Permission Denied
+ROOT_CREDENTIALS = "credentials"
+
+
+def number(value):
+    if isinstance(value, bool):
+        raise TypeError(value)
+    return float(value)
+
+
+def money(value):
+    """
+    An amount of money: positive, finite and with at most 2 decimal places, see batches.parseAmount.
+    """
+    if isinstance(value, bool):
+        raise TypeError(value)
+    amount = parseAmount(value)
+    if amount == None:
+        raise ValueError(value)
+    return amount
+
+
+# what the default error message says a field parsed with each converter should be
+PARSE_DESCRIPTIONS = {
+    number: "a number",
+    money: "a positive number with at most 2 decimal places",
+}
+
+
+class Field:
+    """
+    A body field. `parse` converts the raw JSON value and raises TypeError or
+    ValueError when it doesn't fit; `arg` is the keyword the view receives it as.
+    """
+
+    def __init__(self, name, parse=None, required=True, arg=None, message=None):
+        self.name = name
+        self.parse = parse
+        self.required = required
+        self.arg = arg or name
+        self.message = message or f"{name} should be {PARSE_DESCRIPTIONS.get(parse, 'a valid value')}"
+
+
+class EndpointSpec:
+
+    def __init__(self, method, fields, wallet, root):
+        if method != "POST" and (fields or wallet):
+            # the fields and the wallet credentials are read from a JSON body
+            raise ImproperlyConfigured(f"A {method} endpoint has no body, it can't declare fields or a wallet")
+
+        self.method = method
+        self.wallet = wallet
+        self.root = root
+
+        fields = [field if isinstance(field, Field) else Field(field) for field in fields]
+        if wallet:
+            authFields = [Field('secret_key', arg=None)]
+            if wallet == WALLET_AND_EMAIL:
+                authFields.append(Field('email_address', arg=None))
+            fields = authFields + fields
+
+        self.required = [field.name for field in fields if field.required]
+        # only the fields the view receives, with their converters
+        self.arguments = [
+            (field.name, field.arg, field.parse, field.message)
+            for field in fields if field.name not in ('secret_key', 'email_address') or not wallet
+        ]
+        self.method_error = (badRequestResponse, ErrorCodes.GENERIC_ERROR, f"HTTP method should be {method}")
+        if root == ROOT_CREDENTIALS:
+            self.root_error = (badRequestResponse, ErrorCodes.INVALID_CREDENTIALS, "Invalid Secret specified in the request headers")
+        else:
+            self.root_error = (unAuthorizedResponse, ErrorCodes.GENERIC_ERROR, "Permission Denied")
+
+    def check(self, request):
+        """
+        Everything short of the wallet lookup. Returns (body, arguments, None)
+        or (None, None, error) where error is (response, code, message).
+        """
+        if request.method != self.method:
+            return None, None, self.method_error
+
+        if self.root and request.headers.get('Secret') != settings.ROOT_SECRET:
+            return None, None, self.root_error
+
+        if self.method != "POST":
+            return None, {}, None
+
+        try:
+            body = codec.loads(request.body)
+        except ValueError:
+            return None, None, (badRequestResponse, ErrorCodes.GENERIC_ERROR, "The request body should be a JSON object")
+        if not isinstance(body, dict):
+            return None, None, (badRequestResponse, ErrorCodes.GENERIC_ERROR, "The request body should be a JSON object")
+
+        missingKeys = [key for key in self.required if key not in body]
+        if missingKeys:
+            return None, None, (badRequestResponse, ErrorCodes.MISSING_FIELDS, f"The following key(s) are missing in the request payload: {missingKeys}")
+
+        arguments = {}
+        for name, arg, parse, message in self.arguments:
+            value = body.get(name)
+            if parse is not None and value is not None:
+                try:
+                    value = parse(value)
+                except (TypeError, ValueError):
+                    return None, None, (badRequestResponse, ErrorCodes.GENERIC_ERROR, message)
+            arguments[arg] = value
+
+        return body, arguments, None
+
+    def authenticate(self, body, wallet):
+        """
+        Error for a wallet that doesn't authenticate the request, or None.
+        """
+        if not wallet:
+            return (badRequestResponse, ErrorCodes.UNAUTHORIZED_REQUEST, "No wallet exists for the specified secret key")
+        if self.wallet == WALLET_AND_EMAIL and wallet.email_address != body['email_address']:
+            return (unAuthorizedResponse, ErrorCodes.UNAUTHORIZED_REQUEST, "The email specified isn't associated with the wallet for secret key")
+        return None
+
+
+def endpoint(method="POST", fields=(), wallet=None, root=False):
+    """
+    Declare a view's method, body fields and authentication, see the module docstring.
+    The view is called as view(request, [wallet,] **fields).
+    """
+    def decorator(view):
+        spec = EndpointSpec(method, fields, wallet, root)
+
+        if asyncio.iscoroutinefunction(view):
+            @wraps(view)
+            async def asyncWrapper(request):
+                body, arguments, error = spec.check(request)
+                if error is None and spec.wallet:
+                    existingWallet = await sync_to_async(getWalletUsingKey)(body['secret_key'])
+                    error = spec.authenticate(body, existingWallet)
+                    arguments['wallet'] = existingWallet
+                if error is not None:
+                    response, code, message = error
+                    return response(getError(code, message))
+
+                return await view(request, **arguments)
+
+            asyncWrapper.spec = spec
+            return asyncWrapper
+
+        @wraps(view)
+        def wrapper(request):
+            body, arguments, error = spec.check(request)
+            if error is None and spec.wallet:
+                existingWallet = getWalletUsingKey(body['secret_key'])
+                error = spec.authenticate(body, existingWallet)
+                arguments['wallet'] = existingWallet
+            if error is not None:
+                response, code, message = error
+                return response(getError(code, message))
+
+            return view(request, **arguments)
+
+        wrapper.spec = spec
+        return wrapper
+
+    return decorator
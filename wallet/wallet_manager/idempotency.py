@@ -0,0 +1,191 @@
+from .models import IdempotencyKey
+from api_utils.views import badRequestResponse, resourceConflictResponse, internalServerErrorResponse
+from errors.views import getError, ErrorCodes
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse
+from django.utils import timezone
+from asgiref.sync import sync_to_async
+from datetime import timedelta
+from functools import wraps
+import asyncio
+import hashlib
+import time
+import logging
+# Get an instance of a logger
+logger = logging.getLogger(__name__)
+
+
+def requestFingerprint(request):
+    return hashlib.sha256(request.method.encode() + b" " + request.body).hexdigest()
+
+
+def replayResponse(record):
+    response = HttpResponse(bytes(record.body), status=record.status_code, content_type=record.content_type)
+    response['Idempotent-Replayed'] = "true"
+    return response
+
+
+def claimKey(endpoint, key, fingerprint):
+    """
+    Claim the key for this request in a short transaction of its own, for
+    IDEMPOTENCY_CLAIM_LEASE seconds. Returns (record, claimed); when not
+    claimed the record belongs to an earlier request.
+    """
+    now = timezone.now()
+    expiresAt = now + timedelta(seconds=settings.IDEMPOTENCY_CLAIM_LEASE)
+
+    try:
+        with transaction.atomic():
+            # an expired key is free to be used again, as is the lapsed claim of a request that never answered
+            IdempotencyKey.objects.filter(endpoint=endpoint, key=key, expires_at__lte=now).delete()
+            return IdempotencyKey.objects.create(endpoint=endpoint, key=key, fingerprint=fingerprint, expires_at=expiresAt), True
+
+    except IntegrityError:
+        # another request holds the key
+        return IdempotencyKey.objects.filter(endpoint=endpoint, key=key).first(), False
+
+
+def storeResponse(record, response):
+    stored = IdempotencyKey.objects.filter(pk=record.pk, status_code__isnull=True).update(
+        status_code=response.status_code,
+        content_type=response.get('Content-Type', "application/json"),
+        body=response.content,
+        expires_at=timezone.now() + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL)
+    )
+    if not stored:
+        logger.error(f"idempotent@Error: the claim of Idempotency-Key {record.key} lapsed before {record.endpoint} answered")
+
+
+def requestKey(request):
+    """
+    The request's (Idempotency-Key, fingerprint). Returns (idempotencyKey, None),
+    (None, None) for a request without the header, or (None, response) for a
+    header that can't be used.
+    """
+    key = request.headers.get('Idempotency-Key')
+    if not key:
+        return None, None
+    if len(key) > 255:
+        return None, badRequestResponse(getError(ErrorCodes.GENERIC_ERROR, "Idempotency-Key should be at most 255 characters"))
+
+    return (key, requestFingerprint(request)), None
+
+
+def claimOrReplay(endpoint, key, fingerprint):
+    """
+    Returns (record, None) when the view should run and its response be stored
+    on the record, (None, response) when the request is answered here, or
+    (None, None) while an earlier request with the key is still running.
+    """
+    record, claimed = claimKey(endpoint, key, fingerprint)
+    if claimed:
+        return record, None
+
+    if record != None and record.fingerprint != fingerprint:
+        return None, resourceConflictResponse(getError(ErrorCodes.GENERIC_ERROR, "The Idempotency-Key was already used for a different request"))
+    if record == None or record.status_code == None:
+        # the first request is still running, or its claim was just taken over
+        return None, None
+    return None, replayResponse(record)
+
+
+def inProgressResponse():
+    return resourceConflictResponse(getError(ErrorCodes.GENERIC_ERROR, "The request for this Idempotency-Key is still in progress"))
+
+
+def claimRequest(request):
+    """
+    Claim the request's Idempotency-Key, see claimOrReplay. A retry of a request
+    still running waits up to IDEMPOTENCY_WAIT seconds for its response and is
+    answered 409 if it doesn't come. Returns (None, None) for a request without the header.
+    """
+    idempotencyKey, response = requestKey(request)
+    if idempotencyKey == None:
+        return None, response
+
+    deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT
+    while True:
+        record, response = claimOrReplay(request.path, *idempotencyKey)
+        if record != None or response != None:
+            return record, response
+        if time.monotonic() >= deadline:
+            return None, inProgressResponse()
+        time.sleep(settings.IDEMPOTENCY_POLL_INTERVAL)
+
+
+async def claimRequestAsync(request):
+    """
+    claimRequest for async views, waiting on the event loop.
+    """
+    idempotencyKey, response = requestKey(request)
+    if idempotencyKey == None:
+        return None, response
+
+    deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT
+    while True:
+        record, response = await sync_to_async(claimOrReplay)(request.path, *idempotencyKey)
+        if record != None or response != None:
+            return record, response
+        if time.monotonic() >= deadline:
+            return None, inProgressResponse()
+        await asyncio.sleep(settings.IDEMPOTENCY_POLL_INTERVAL)
+
+
+def failedResponse(e):
+    logger.error("idempotent@Error")
+    logger.error(e)
+    return internalServerErrorResponse(getError(ErrorCodes.GENERIC_ERROR))
+
+
+def idempotent(view):
+    """
+    Make a mutating view safe to retry with an `Idempotency-Key` header.
+
+    The first request with a key claims it with a pending record, runs the view
+    outside of any transaction and stores its response for IDEMPOTENCY_KEY_TTL
+    seconds; retries get the stored response back without running the view
+    again. A retry that arrives while the first request is still running waits
+    for its response. The claim lapses after IDEMPOTENCY_CLAIM_LEASE seconds,
+    so the key of a request whose worker died is taken over by the next retry.
+    Requests without the header run as usual. Async views are supported, the
+    key is then claimed and stored through sync_to_async.
+    """
+    # the response is stored whatever the outcome: a failed debit may still have reached
+    # the upstream, so a retry must not run it again; the client sends a new key to try again
+    if asyncio.iscoroutinefunction(view):
+        @wraps(view)
+        async def asyncWrapper(request, *args, **kwargs):
+            record, response = await claimRequestAsync(request)
+            if response != None:
+                return response
+            if record == None:
+                return await view(request, *args, **kwargs)
+
+            try:
+                response = await view(request, *args, **kwargs)
+            except Exception as e:
+                response = failedResponse(e)
+
+            await sync_to_async(storeResponse)(record, response)
+            return response
+
+        return asyncWrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        record, response = claimRequest(request)
+        if response != None:
+            return response
+        if record == None:
+            return view(request, *args, **kwargs)
+
+        try:
+            response = view(request, *args, **kwargs)
+        except Exception as e:
+            response = failedResponse(e)
+
+        storeResponse(record, response)
+        return response
+
+    return wrapper
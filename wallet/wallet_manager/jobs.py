@@ -0,0 +1,85 @@
+from .models import TransferJob
+from .payments import transferToBank, responseError
+from django.db import transaction
+from django.utils import timezone
+import logging
+# Get an instance of a logger
+logger = logging.getLogger(__name__)
+
+
+def serializeTransferJob(job):
+    return {
+        "jobId": str(job.id),
+        "status": job.status,
+        "amount": float(job.amount),
+        "bankCode": job.bank_code,
+        "accountNumber": job.account_number,
+        "accountName": job.account_name,
+        "timings": job.timings,
+        "result": job.result,
+        "error": job.error,
+        "createdAt": job.created_at.isoformat() if job.created_at else None,
+        "startedAt": job.started_at.isoformat() if job.started_at else None,
+        "finishedAt": job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+def claimNextTransferJob(worker):
+    """
+    Mark the oldest queued job as running for `worker` and return it, or None when the queue is empty.
+    """
+    with transaction.atomic():
+        # skip_locked lets workers pick different jobs instead of queueing on the same row
+        job = TransferJob.objects.select_for_update(skip_locked=True).filter(status=TransferJob.QUEUED).order_by('created_at').first()
+        if job == None:
+            return None
+
+        # the conditional update is what makes the claim safe on databases without row locks
+        claimed = TransferJob.objects.filter(pk=job.pk, status=TransferJob.QUEUED).update(
+            status=TransferJob.RUNNING, worker=worker, started_at=timezone.now()
+        )
+        if not claimed:
+            return None
+
+    job.refresh_from_db()
+    return job
+
+
+def runTransferJob(job):
+    timings = {}
+    try:
+        transfer, errorResponse = transferToBank(
+            job.wallet, float(job.amount), job.bank_code, job.account_number, job.account_name, job.description, timings=timings
+        )
+    except Exception as e:
+        logger.error("runTransferJob@Error")
+        logger.error(e)
+        transfer, errorResponse = None, None
+        job.error = {"message": str(e)}
+
+    if transfer != None:
+        job.status = TransferJob.SUCCEEDED
+        job.result = transfer
+    else:
+        job.status = TransferJob.FAILED
+        if errorResponse != None:
+            job.error = responseError(errorResponse)
+
+    job.timings = timings
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'result', 'error', 'timings', 'finished_at'])
+    return job
+
+
+def failInterruptedTransferJobs(olderThan):
+    """
+    Fail jobs left running by a worker that stopped before `olderThan`.
+
+    They are not retried: the debit may already have gone through, the funds
+    ledger and the wallet's transactions show what happened.
+    """
+    return TransferJob.objects.filter(status=TransferJob.RUNNING, started_at__lt=olderThan).update(
+        status=TransferJob.FAILED,
+        error={"message": "The worker stopped before the transfer finished, check the wallet's transactions"},
+        finished_at=timezone.now()
+    )
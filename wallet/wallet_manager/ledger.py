@@ -0,0 +1,138 @@
+"""
+Local funds ledger for sub wallets.
+
+available_amount is what the wallet can still spend and held_amount is what is
+set aside for debits the upstream hasn't answered yet. A debit reserves its
+amount with one conditional UPDATE, so concurrent debits on the same wallet
+can't both pass the funds check, then settles the hold when the upstream
+accepts the debit or releases it when the upstream refuses it. Holds whose
+outcome is unknown (timeouts) stay open until reconcile_wallet_funds brings
+the ledger back in line with the upstream balance.
+"""
+
+from .models import UserWalletData, FundsHold
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+from decimal import Decimal, InvalidOperation
+import logging
+# Get an instance of a logger
+logger = logging.getLogger(__name__)
+
+
+# largest amount the ledger's max_digits=18, decimal_places=2 columns hold
+MAX_AMOUNT = Decimal("9999999999999999.99")
+
+
+def toAmount(value):
+    return Decimal(str(value)).quantize(Decimal("0.01"))
+
+
+def reservableAmount(value):
+    """
+    `value` as an amount a debit can set aside, finite and above zero, or None.
+    """
+    try:
+        amount = toAmount(value)
+    except (InvalidOperation, ValueError):
+        return None
+
+    if not amount.is_finite() or amount <= 0 or amount > MAX_AMOUNT:
+        return None
+    return amount
+
+
+def reserveFunds(wallet, amount, reference):
+    """
+    Move `amount` from available to held and return the FundsHold,
+    or None when the ledger doesn't cover it (or hasn't been synced yet).
+    Raises ValueError for an amount reservableAmount refuses, callers check it first.
+    """
+    value, amount = amount, reservableAmount(amount)
+    if amount == None:
+        raise ValueError(f"{value!r} can't be reserved")
+
+    with transaction.atomic():
+        reserved = UserWalletData.objects.filter(pk=wallet.pk, available_amount__gte=amount).update(
+            available_amount=F('available_amount') - amount,
+            held_amount=F('held_amount') + amount
+        )
+        if not reserved:
+            return None
+
+        return FundsHold.objects.create(wallet=wallet, reference=reference, amount=amount)
+
+
+def closeHold(hold, status):
+    with transaction.atomic():
+        closed = FundsHold.objects.filter(pk=hold.pk, status=FundsHold.HELD).update(status=status, updated_at=timezone.now())
+        if not closed:
+            # already closed by the reconcile job
+            return False
+
+        changes = {"held_amount": F('held_amount') - hold.amount}
+        if status == FundsHold.RELEASED:
+            changes["available_amount"] = F('available_amount') + hold.amount
+        UserWalletData.objects.filter(pk=hold.wallet_id).update(**changes)
+
+    hold.status = status
+    return True
+
+
+def settleFunds(hold):
+    """
+    The upstream took the debit, the held funds are gone.
+    """
+    return closeHold(hold, FundsHold.SETTLED)
+
+
+def releaseFunds(hold):
+    """
+    The upstream refused the debit, give the held funds back.
+    """
+    return closeHold(hold, FundsHold.RELEASED)
+
+
+def creditFunds(wallet, amount):
+    UserWalletData.objects.filter(pk=wallet.pk, available_amount__isnull=False).update(
+        available_amount=F('available_amount') + toAmount(amount)
+    )
+
+
+def syncAvailableFunds(wallet, upstreamBalance):
+    """
+    Set the spendable amount from a balance just read upstream, minus what is still held.
+    """
+    UserWalletData.objects.filter(pk=wallet.pk).update(
+        available_amount=toAmount(upstreamBalance) - F('held_amount'),
+        funds_reconciled_at=timezone.now()
+    )
+
+
+def reconcileFunds(wallet, upstreamBalance, holdTimeout):
+    """
+    Bring a wallet's ledger in line with its upstream balance.
+
+    Must run under walletLock, with a balance read after the lock was taken, so
+    no debit can settle between the read and the write. Holds older than
+    `holdTimeout` are closed first: whatever became of their debit, the
+    upstream balance already reflects it. Returns the number of holds closed.
+    """
+    cutoff = timezone.now() - holdTimeout
+
+    with transaction.atomic():
+        expired = FundsHold.objects.filter(wallet=wallet, status=FundsHold.HELD, created_at__lt=cutoff).update(
+            status=FundsHold.RELEASED, updated_at=timezone.now()
+        )
+        held = FundsHold.objects.filter(wallet=wallet, status=FundsHold.HELD).aggregate(total=Sum('amount'))['total'] or 0
+
+        UserWalletData.objects.filter(pk=wallet.pk).update(
+            available_amount=toAmount(upstreamBalance) - held,
+            held_amount=held,
+            funds_reconciled_at=timezone.now()
+        )
+
+    if expired:
+        logger.warning(f"reconcileFunds: closed {expired} expired hold(s) on wallet {wallet.pk}")
+
+    return expired
@@ -0,0 +1,95 @@
+from api_utils import metrics
+from asgiref.sync import ThreadSensitiveContext, sync_to_async
+from contextlib import asynccontextmanager, contextmanager
+from django.db import connection
+import threading
+import time
+
+# first key of the two-key advisory locks, keeps the wallet locks apart from other advisory locks
+WALLET_LOCK_NAMESPACE = 7301
+
+lock_wait = metrics.LatencyStats()
+metrics.register("walletLockWait", lock_wait.stats)
+
+
+# stand-in for advisory locks on databases that don't have them
+_local_locks = [threading.RLock() for _ in range(64)]
+
+
+def _pgAdvisoryLock(namespace, key):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_lock(%s, %s)", [namespace, key])
+
+
+def _pgAdvisoryUnlock(namespace, key):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_unlock(%s, %s)", [namespace, key])
+
+
+def acquireWalletLock(wallet):
+    """
+    Block until this thread holds the wallet's lock, see walletLock.
+    """
+    started = time.monotonic()
+
+    if connection.vendor == 'postgresql':
+        _pgAdvisoryLock(WALLET_LOCK_NAMESPACE, wallet.pk)
+    else:
+        _local_locks[wallet.pk % len(_local_locks)].acquire()
+
+    lock_wait.record(time.monotonic() - started)
+
+
+def releaseWalletLock(wallet):
+    if connection.vendor == 'postgresql':
+        _pgAdvisoryUnlock(WALLET_LOCK_NAMESPACE, wallet.pk)
+    else:
+        _local_locks[wallet.pk % len(_local_locks)].release()
+
+
+def _releaseWalletLockAndClose(wallet):
+    try:
+        releaseWalletLock(wallet)
+    finally:
+        # the thread goes away with its ThreadSensitiveContext, its connection would stay open
+        if not connection.in_atomic_block:
+            connection.close()
+
+
+@contextmanager
+def walletLock(wallet):
+    """
+    Hold a lock on the wallet for the length of the block.
+
+    On Postgres this is a session-level pg_advisory_lock keyed by the wallet id:
+    requests for the same wallet queue up in arrival order and requests for
+    different wallets don't touch each other. No transaction is opened, so each
+    write in the block commits on its own; a funds hold is committed before the
+    upstream debit it covers and survives whatever happens after it. The lock is
+    released when the block exits, or with the session if the process dies.
+    Other databases get a process-local lock instead, which is enough for development.
+    """
+    acquireWalletLock(wallet)
+    try:
+        yield
+    finally:
+        releaseWalletLock(wallet)
+
+
+@asynccontextmanager
+async def asyncWalletLock(wallet):
+    """
+    walletLock for async views.
+
+    The lock belongs to a thread and its database connection, so the block runs
+    in a ThreadSensitiveContext of its own: the lock and every thread-sensitive
+    sync_to_async call made in the block run on one thread of their own, and
+    requests for other wallets don't queue behind them on the shared sync thread.
+    That thread's connection is closed when the block exits.
+    """
+    async with ThreadSensitiveContext():
+        await sync_to_async(acquireWalletLock)(wallet)
+        try:
+            yield
+        finally:
+            await sync_to_async(_releaseWalletLockAndClose)(wallet)
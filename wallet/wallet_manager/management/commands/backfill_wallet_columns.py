@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+import time
+from wallet_manager.models import UserWalletData
+from wallet_manager.utils import parseDateTime
+
+
+class Command(BaseCommand):
+    help = "Fill signed_up_at from the created_at text column, a batch of wallets at a time"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="wallets updated per database transaction")
+        parser.add_argument('--pause', type=float, default=0.0, help="seconds to sleep between batches, to leave room for live traffic")
+
+    def handle(self, *args, **options):
+        batchSize = options['batch_size']
+        pending = UserWalletData.objects.filter(signed_up_at__isnull=True, created_at__isnull=False)
+
+        # walk the primary key so every batch is a short index range scan, and a
+        # stopped run picks up where it left off
+        lastId = 0
+        updated = 0
+        while True:
+            batch = list(pending.filter(pk__gt=lastId).order_by('pk').values_list('pk', flat=True)[:batchSize])
+            if not batch:
+                break
+
+            updated += self.backfillBatch(batch)
+            lastId = batch[-1]
+            self.stdout.write(f"backfilled {updated} wallets, up to id {lastId}")
+
+            if options['pause']:
+                time.sleep(options['pause'])
+
+        self.stdout.write(self.style.SUCCESS(f"Wallet columns backfilled, {updated} wallets updated"))
+
+    @transaction.atomic
+    def backfillBatch(self, walletIds):
+        wallets = list(UserWalletData.objects.filter(pk__in=walletIds).only('created_at', 'signed_up_at'))
+
+        for wallet in wallets:
+            wallet.signed_up_at = parseDateTime(wallet.created_at)
+
+        # unparseable text stays null and is simply selected again by the next run
+        UserWalletData.objects.bulk_update(wallets, ['signed_up_at'])
+        return len(wallets)
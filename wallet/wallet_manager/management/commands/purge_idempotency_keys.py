@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from wallet_manager.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    help = "Delete expired idempotency keys in batches, run it periodically"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help="keys deleted per statement")
+
+    def handle(self, *args, **options):
+        batchSize = options['batch_size']
+        now = timezone.now()
+        deleted = 0
+
+        while True:
+            expiredIds = list(IdempotencyKey.objects.filter(expires_at__lte=now).values_list('pk', flat=True)[:batchSize])
+            if not expiredIds:
+                break
+
+            count, _ = IdempotencyKey.objects.filter(pk__in=expiredIds).delete()
+            deleted += count
+
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} expired idempotency key(s)"))
@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Max, Q, Sum
+from django.utils import timezone
+from wallet_manager.models import UserWalletData, WalletAggregate, WalletTransaction
+
+
+class Command(BaseCommand):
+    help = "Rebuild every wallet's WalletAggregate row from its mirrored transactions"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="wallets rebuilt per database transaction")
+
+    def handle(self, *args, **options):
+        batchSize = options['batch_size']
+        walletIds = list(UserWalletData.objects.order_by('pk').values_list('pk', flat=True))
+
+        for start in range(0, len(walletIds), batchSize):
+            batch = walletIds[start:start + batchSize]
+            self.rebuildBatch(batch)
+            self.stdout.write(f"rebuilt {min(start + batchSize, len(walletIds))}/{len(walletIds)} wallets")
+
+        self.stdout.write(self.style.SUCCESS("Wallet aggregates rebuilt"))
+
+    @transaction.atomic
+    def rebuildBatch(self, walletIds):
+        # lock the rows first so live debits and syncs wait for the rebuilt totals
+        aggregates = {
+            aggregate.wallet_id: aggregate
+            for aggregate in WalletAggregate.objects.select_for_update().filter(wallet_id__in=walletIds)
+        }
+        totals = {
+            row['wallet_id']: row
+            for row in WalletTransaction.objects.filter(wallet_id__in=walletIds).values('wallet_id').annotate(
+                received=Sum('amount', filter=Q(transaction_type="Credit")),
+                spent=Sum('amount', filter=Q(transaction_type="Debit")),
+                count=Count('id'),
+                last=Max('transaction_date'),
+            )
+        }
+
+        now = timezone.now()
+        toCreate = []
+        for walletId in walletIds:
+            row = totals.get(walletId, {})
+            aggregate = aggregates.get(walletId)
+            if aggregate is None:
+                aggregate = WalletAggregate(wallet_id=walletId)
+                toCreate.append(aggregate)
+
+            aggregate.total_received = row.get('received') or 0
+            aggregate.total_spent = row.get('spent') or 0
+            aggregate.transaction_count = row.get('count') or 0
+            aggregate.last_transaction_at = row.get('last')
+            # bulk_update skips auto_now
+            aggregate.updated_at = now
+
+        WalletAggregate.objects.bulk_update(
+            list(aggregates.values()), ['total_received', 'total_spent', 'transaction_count', 'last_transaction_at', 'updated_at']
+        )
+        WalletAggregate.objects.bulk_create(toCreate, ignore_conflicts=True)
@@ -0,0 +1,59 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from api_utils.concurrency import bounded_map
+from wallet_manager.ledger import reconcileFunds
+from wallet_manager.locks import walletLock
+from wallet_manager.models import UserWalletData
+from wallet_manager.wallets_africa import WalletsAfricaAPI
+from datetime import timedelta
+
+
+def reconcileWallet(api, wallet, holdTimeout):
+    """
+    Read the wallet's balance and write it to the ledger under the wallet lock, so a
+    debit in flight settles either before the read or after the write.
+    Returns the number of holds closed, or None when the balance couldn't be read.
+    """
+    with walletLock(wallet):
+        balance, msg = api.get_wallet_balance(wallet.phone_number, fresh=True)
+        if balance == None or msg is not True:
+            return None
+
+        return reconcileFunds(wallet, balance['WalletBalance'], holdTimeout)
+
+
+class Command(BaseCommand):
+    help = "Reconcile every wallet's local funds ledger with its upstream balance, run it periodically"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help="wallets reconciled at the same time")
+        parser.add_argument(
+            '--hold-timeout', type=int, default=settings.FUNDS_HOLD_TIMEOUT, help="seconds after which an open hold is closed"
+        )
+
+    def handle(self, *args, **options):
+        batchSize = options['batch_size']
+        holdTimeout = timedelta(seconds=options['hold_timeout'])
+        api = WalletsAfricaAPI()
+
+        walletIds = list(UserWalletData.objects.exclude(phone_number=None).order_by('pk').values_list('pk', flat=True))
+        failed = 0
+        closedHolds = 0
+
+        def reconcile(wallet):
+            return reconcileWallet(api, wallet, holdTimeout)
+
+        for start in range(0, len(walletIds), batchSize):
+            wallets = list(UserWalletData.objects.filter(pk__in=walletIds[start:start + batchSize]).only('pk', 'phone_number'))
+
+            for wallet, closed in bounded_map(reconcile, wallets, batchSize):
+                if closed == None:
+                    failed += 1
+                    self.stderr.write(f"could not fetch the balance of wallet {wallet.pk}")
+                    continue
+
+                closedHolds += closed
+
+            self.stdout.write(f"reconciled {min(start + batchSize, len(walletIds))}/{len(walletIds)} wallets")
+
+        self.stdout.write(self.style.SUCCESS(f"Wallet funds reconciled, {closedHolds} expired hold(s) closed, {failed} wallet(s) failed"))
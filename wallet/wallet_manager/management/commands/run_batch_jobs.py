@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from wallet_manager.batches import claimNextBatchJob, runBatchJob
+import logging
+import os
+import socket
+import time
+# Get an instance of a logger
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Run queued bulk jobs one at a time, each with the concurrency it was created with"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--poll-interval', type=float, default=1.0, help="seconds to wait when the queue is empty")
+        parser.add_argument('--once', action='store_true', help="exit once the queue is empty")
+
+    def handle(self, *args, **options):
+        worker = f"{socket.gethostname()}:{os.getpid()}"
+
+        while True:
+            close_old_connections()
+            try:
+                job = claimNextBatchJob(worker)
+            except Exception as e:
+                # a database hiccup shouldn't take the worker down, try again after a pause
+                logger.error("run_batch_jobs@Error")
+                logger.error(e)
+                job = None
+
+            if job == None:
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+                continue
+
+            self.stdout.write(f"job {job.id} ({job.kind}) started, {job.total_items - job.processed_items} item(s) pending")
+            if runBatchJob(job, progress=self.progress) == None:
+                # the job went stale and another worker holds it now
+                self.stderr.write(f"job {job.id} was reclaimed by another worker")
+                continue
+            self.stdout.write(f"job {job.id} completed: {job.succeeded_items} succeeded, {job.failed_items} failed, {job.stats}")
+
+        self.stdout.write(self.style.SUCCESS("Batch worker stopped"))
+
+    def progress(self, job):
+        self.stdout.write(f"job {job.id}: {job.processed_items}/{job.total_items} processed")
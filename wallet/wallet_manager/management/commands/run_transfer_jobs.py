@@ -0,0 +1,68 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+from wallet_manager.jobs import claimNextTransferJob, runTransferJob, failInterruptedTransferJobs
+from datetime import timedelta
+import logging
+import os
+import socket
+import threading
+import time
+# Get an instance of a logger
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Run queued bank transfer jobs on a pool of worker threads"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=settings.TRANSFER_JOB_WORKERS, help="jobs run at the same time")
+        parser.add_argument('--poll-interval', type=float, default=1.0, help="seconds to wait when the queue is empty")
+        parser.add_argument('--once', action='store_true', help="exit once the queue is empty")
+
+    def handle(self, *args, **options):
+        interrupted = failInterruptedTransferJobs(timezone.now() - timedelta(seconds=settings.TRANSFER_JOB_TIMEOUT))
+        if interrupted:
+            self.stderr.write(f"failed {interrupted} job(s) left running by a stopped worker")
+
+        stop = threading.Event()
+        name = f"{socket.gethostname()}:{os.getpid()}"
+        threads = [
+            threading.Thread(target=self.work, args=(f"{name}:{index}", stop, options), daemon=True)
+            for index in range(options['workers'])
+        ]
+        for thread in threads:
+            thread.start()
+
+        try:
+            while any(thread.is_alive() for thread in threads):
+                time.sleep(0.5)
+        except KeyboardInterrupt:
+            self.stdout.write("stopping, waiting for running jobs to finish")
+            stop.set()
+            for thread in threads:
+                thread.join()
+
+        self.stdout.write(self.style.SUCCESS("Transfer workers stopped"))
+
+    def work(self, worker, stop, options):
+        while not stop.is_set():
+            close_old_connections()
+            try:
+                job = claimNextTransferJob(worker)
+            except Exception as e:
+                # a database hiccup shouldn't take the worker down, try again after a pause
+                logger.error("run_transfer_jobs@Error")
+                logger.error(e)
+                stop.wait(options['poll_interval'])
+                continue
+
+            if job == None:
+                if options['once']:
+                    return
+                stop.wait(options['poll_interval'])
+                continue
+
+            job = runTransferJob(job)
+            self.stdout.write(f"job {job.id} {job.status} {job.timings}")
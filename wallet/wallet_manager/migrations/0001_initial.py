@@ -0,0 +1,33 @@
+# Generated by Django 3.2.4 on 2026-10-18 11:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserWalletData',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('first_name', models.TextField(null=True)),
+                ('last_name', models.TextField(null=True)),
+                ('email_address', models.EmailField(max_length=254, null=True)),
+                ('phone_number', models.TextField(null=True)),
+                ('bvn', models.TextField(null=True)),
+                ('birthday', models.TextField(null=True)),
+                ('created_at', models.TextField(null=True)),
+                ('password', models.TextField(null=True)),
+                ('account_no', models.TextField(null=True)),
+                ('bank_name', models.TextField(null=True)),
+                ('account_name', models.TextField(null=True)),
+                ('available_balance', models.TextField(null=True)),
+                ('wallet_key', models.TextField(null=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 3.2.4 on 2026-10-18 12:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet_manager', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userwalletdata',
+            name='transactions_synced_to',
+            field=models.DateField(null=True),
+        ),
+        migrations.CreateModel(
+            name='WalletTransaction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reference', models.TextField()),
+                ('transaction_type', models.TextField()),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=18)),
+                ('transaction_date', models.DateTimeField()),
+                ('data', models.JSONField()),
+                ('synced_at', models.DateTimeField(auto_now_add=True)),
+                ('wallet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transactions', to='wallet_manager.userwalletdata')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='wallettransaction',
+            index=models.Index(fields=['wallet', '-transaction_date'], name='wallet_mana_wallet__c543ef_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='wallettransaction',
+            index=models.Index(fields=['wallet', 'transaction_type', '-transaction_date'], name='wallet_mana_wallet__687ba4_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='wallettransaction',
+            index=models.Index(fields=['reference'], name='wallet_mana_referen_e3ccd0_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='wallettransaction',
+            constraint=models.UniqueConstraint(fields=('wallet', 'reference'), name='unique_wallet_transaction_reference'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 3.2.4 on 2026-10-18 12:41
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet_manager', '0002_wallettransaction'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WalletAggregate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_received', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('total_spent', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('transaction_count', models.IntegerField(default=0)),
+                ('last_transaction_at', models.DateTimeField(null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('wallet', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='aggregate', to='wallet_manager.userwalletdata')),
+            ],
+        ),
+    ]
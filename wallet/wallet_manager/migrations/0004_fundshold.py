@@ -0,0 +1,49 @@
+# Generated by Django 3.2.4 on 2026-10-18 12:42
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet_manager', '0003_walletaggregate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userwalletdata',
+            name='available_amount',
+            field=models.DecimalField(decimal_places=2, max_digits=18, null=True),
+        ),
+        migrations.AddField(
+            model_name='userwalletdata',
+            name='held_amount',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=18),
+        ),
+        migrations.AddField(
+            model_name='userwalletdata',
+            name='funds_reconciled_at',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.CreateModel(
+            name='FundsHold',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reference', models.TextField()),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=18)),
+                ('status', models.TextField(default='held')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('wallet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='holds', to='wallet_manager.userwalletdata')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='fundshold',
+            index=models.Index(fields=['wallet', 'status'], name='wallet_mana_wallet__62b8f5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fundshold',
+            index=models.Index(fields=['status', 'created_at'], name='wallet_mana_status_3f3447_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 3.2.4 on 2026-10-18 12:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet_manager', '0004_fundshold'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdempotencyKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('endpoint', models.TextField()),
+                ('key', models.TextField()),
+                ('fingerprint', models.TextField()),
+                ('status_code', models.IntegerField()),
+                ('content_type', models.TextField()),
+                ('body', models.BinaryField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('expires_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='idempotencykey',
+            index=models.Index(fields=['expires_at'], name='wallet_mana_expires_5926dd_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='idempotencykey',
+            constraint=models.UniqueConstraint(fields=('endpoint', 'key'), name='unique_idempotency_key'),
+        ),
+    ]
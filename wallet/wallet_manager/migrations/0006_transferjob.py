@@ -0,0 +1,43 @@
+# Generated by Django 3.2.4 on 2026-10-18 12:44
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet_manager', '0005_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TransferJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('status', models.TextField(default='queued')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=18)),
+                ('bank_code', models.TextField()),
+                ('account_number', models.TextField()),
+                ('account_name', models.TextField()),
+                ('description', models.TextField()),
+                ('timings', models.JSONField(default=dict)),
+                ('result', models.JSONField(null=True)),
+                ('error', models.JSONField(null=True)),
+                ('worker', models.TextField(null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(null=True)),
+                ('finished_at', models.DateTimeField(null=True)),
+                ('wallet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transfer_jobs', to='wallet_manager.userwalletdata')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='transferjob',
+            index=models.Index(fields=['status', 'created_at'], name='wallet_mana_status_a58843_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transferjob',
+            index=models.Index(fields=['wallet', '-created_at'], name='wallet_mana_wallet__357ae9_idx'),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 3.2.4 on 2026-10-18 12:45
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet_manager', '0006_transferjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BatchJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('kind', models.TextField()),
+                ('status', models.TextField(default='queued')),
+                ('concurrency', models.IntegerField()),
+                ('total_items', models.IntegerField(default=0)),
+                ('processed_items', models.IntegerField(default=0)),
+                ('succeeded_items', models.IntegerField(default=0)),
+                ('failed_items', models.IntegerField(default=0)),
+                ('stats', models.JSONField(default=dict)),
+                ('worker', models.TextField(null=True)),
+                ('heartbeat_at', models.DateTimeField(null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(null=True)),
+                ('finished_at', models.DateTimeField(null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='BatchItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.IntegerField()),
+                ('data', models.JSONField()),
+                ('status', models.TextField(default='pending')),
+                ('result', models.JSONField(null=True)),
+                ('error', models.JSONField(null=True)),
+                ('latency_ms', models.FloatField(null=True)),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='wallet_manager.batchjob')),
+                ('wallet', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='wallet_manager.userwalletdata')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='batchjob',
+            index=models.Index(fields=['status', 'created_at'], name='wallet_mana_status_f6ab30_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='batchitem',
+            index=models.Index(fields=['job', 'status', 'position'], name='wallet_mana_job_id_0304a0_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='batchitem',
+            constraint=models.UniqueConstraint(fields=('job', 'position'), name='unique_batch_item_position'),
+        ),
+    ]
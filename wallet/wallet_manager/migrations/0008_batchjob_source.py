@@ -0,0 +1,28 @@
+# Generated by Django 3.2.4 on 2026-10-18 12:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet_manager', '0007_batchjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='batchjob',
+            name='source_name',
+            field=models.TextField(null=True),
+        ),
+        migrations.AddField(
+            model_name='batchjob',
+            name='source_digest',
+            field=models.TextField(db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='batchjob',
+            name='result_file',
+            field=models.TextField(null=True),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 3.2.4 on 2026-10-18 11:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet_manager', '0008_batchjob_source'),
+    ]
+
+    # a nullable column without a default, added without rewriting the table;
+    # existing rows are filled by the backfill_wallet_columns command
+    operations = [
+        migrations.AddField(
+            model_name='userwalletdata',
+            name='signed_up_at',
+            field=models.DateTimeField(null=True),
+        ),
+    ]
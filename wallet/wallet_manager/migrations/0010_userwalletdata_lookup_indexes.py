@@ -0,0 +1,62 @@
+# Generated by Django 3.2.4 on 2026-10-18 11:45
+
+from django.db import migrations, models
+
+# the names Django gives these indexes, so later migrations of the fields find them
+EMAIL_INDEX = 'wallet_manager_userwalletdata_email_address_45f64282'
+PHONE_INDEX = 'wallet_manager_userwalletdata_phone_number_b796203c'
+WALLET_KEY_UNIQUE = 'wallet_manager_userwalletdata_wallet_key_1a1a564c_uniq'
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('wallet_manager', '0009_userwalletdata_typed_columns'),
+    ]
+
+    # the indexes are built with CREATE INDEX CONCURRENTLY so the wallet table keeps
+    # taking writes while they build; the lookups are exact, so the *_like pattern
+    # indexes Django would add for LIKE queries are left out
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='userwalletdata',
+                    name='email_address',
+                    field=models.EmailField(db_index=True, max_length=254, null=True),
+                ),
+                migrations.AlterField(
+                    model_name='userwalletdata',
+                    name='phone_number',
+                    field=models.TextField(db_index=True, null=True),
+                ),
+                migrations.AlterField(
+                    model_name='userwalletdata',
+                    name='wallet_key',
+                    field=models.TextField(null=True, unique=True),
+                ),
+            ],
+            database_operations=[
+                migrations.RunSQL(
+                    f'CREATE INDEX CONCURRENTLY IF NOT EXISTS "{EMAIL_INDEX}" ON "wallet_manager_userwalletdata" ("email_address")',
+                    reverse_sql=f'DROP INDEX CONCURRENTLY IF EXISTS "{EMAIL_INDEX}"',
+                ),
+                migrations.RunSQL(
+                    f'CREATE INDEX CONCURRENTLY IF NOT EXISTS "{PHONE_INDEX}" ON "wallet_manager_userwalletdata" ("phone_number")',
+                    reverse_sql=f'DROP INDEX CONCURRENTLY IF EXISTS "{PHONE_INDEX}"',
+                ),
+                migrations.RunSQL(
+                    f'CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS "{WALLET_KEY_UNIQUE}" ON "wallet_manager_userwalletdata" ("wallet_key")',
+                    reverse_sql=f'DROP INDEX CONCURRENTLY IF EXISTS "{WALLET_KEY_UNIQUE}"',
+                ),
+                # turns the built index into the unique constraint Django expects, without scanning the table again
+                migrations.RunSQL(
+                    f'ALTER TABLE "wallet_manager_userwalletdata" ADD CONSTRAINT "{WALLET_KEY_UNIQUE}" UNIQUE USING INDEX "{WALLET_KEY_UNIQUE}"',
+                    reverse_sql=f'ALTER TABLE "wallet_manager_userwalletdata" DROP CONSTRAINT IF EXISTS "{WALLET_KEY_UNIQUE}"',
+                ),
+            ],
+        ),
+    ]
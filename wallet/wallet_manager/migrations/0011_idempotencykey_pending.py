@@ -0,0 +1,28 @@
+# Generated by Django 3.2.4 on 2026-10-18 12:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet_manager', '0010_userwalletdata_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='idempotencykey',
+            name='body',
+            field=models.BinaryField(null=True),
+        ),
+        migrations.AlterField(
+            model_name='idempotencykey',
+            name='content_type',
+            field=models.TextField(null=True),
+        ),
+        migrations.AlterField(
+            model_name='idempotencykey',
+            name='status_code',
+            field=models.IntegerField(null=True),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 3.2.4 on 2026-10-18 12:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet_manager', '0011_idempotencykey_pending'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='batchjob',
+            name='result_file',
+        ),
+        migrations.AddField(
+            model_name='batchjob',
+            name='attempt',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='batchjob',
+            name='results',
+            field=models.BinaryField(null=True),
+        ),
+    ]
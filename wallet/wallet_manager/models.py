@@ -5,8 +5,8 @@ import uuid
 class UserWalletData(models.Model):
     first_name = models.TextField(null=True)
     last_name = models.TextField(null=True)
-    email_address = models.EmailField(null=True)
-    phone_number = models.TextField(null=True)
+    email_address = models.EmailField(null=True, db_index=True)
+    phone_number = models.TextField(null=True, db_index=True)
     bvn = models.TextField(null=True)
     birthday = models.TextField(null=True)
     created_at = models.TextField(null=True)
@@ -17,4 +17,209 @@ class UserWalletData(models.Model):
     account_name = models.TextField(null=True)
     available_balance = models.TextField(null=True)
 
-    wallet_key = models.TextField(null=True)
+    wallet_key = models.TextField(null=True, unique=True)
+
+    # typed copy of created_at, filled for older rows by backfill_wallet_columns
+    signed_up_at = models.DateTimeField(null=True)
+
+    # transactions up to this date are mirrored in WalletTransaction
+    transactions_synced_to = models.DateField(null=True)
+
+    # local funds ledger, see ledger.py; available_amount is null until first synced with upstream
+    available_amount = models.DecimalField(max_digits=18, decimal_places=2, null=True)
+    held_amount = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    funds_reconciled_at = models.DateTimeField(null=True)
+
+
+class WalletTransaction(models.Model):
+    """
+    Local mirror of a wallet's Wallets Africa transaction history.
+    `data` holds the upstream row exactly as it was returned.
+    """
+    wallet = models.ForeignKey(UserWalletData, on_delete=models.CASCADE, related_name='transactions')
+    reference = models.TextField()
+    transaction_type = models.TextField()
+    amount = models.DecimalField(max_digits=18, decimal_places=2)
+    transaction_date = models.DateTimeField()
+    data = models.JSONField()
+
+    synced_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['wallet', 'reference'], name='unique_wallet_transaction_reference'),
+        ]
+        indexes = [
+            models.Index(fields=['wallet', '-transaction_date']),
+            models.Index(fields=['wallet', 'transaction_type', '-transaction_date']),
+            models.Index(fields=['reference']),
+        ]
+
+
+class WalletAggregate(models.Model):
+    """
+    Running totals for a wallet, updated whenever transactions are added to its mirror.
+    """
+    wallet = models.OneToOneField(UserWalletData, on_delete=models.CASCADE, related_name='aggregate')
+    total_received = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    total_spent = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    transaction_count = models.IntegerField(default=0)
+    last_transaction_at = models.DateTimeField(null=True)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+
+class FundsHold(models.Model):
+    """
+    Funds set aside on a wallet's ledger while a debit is with the upstream.
+    """
+    HELD = "held"
+    SETTLED = "settled"
+    RELEASED = "released"
+
+    wallet = models.ForeignKey(UserWalletData, on_delete=models.CASCADE, related_name='holds')
+    reference = models.TextField()
+    amount = models.DecimalField(max_digits=18, decimal_places=2)
+    status = models.TextField(default=HELD)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['wallet', 'status']),
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+
+class IdempotencyKey(models.Model):
+    """
+    Response stored for a client's Idempotency-Key, replayed when the request is retried.
+    """
+    endpoint = models.TextField()
+    key = models.TextField()
+    # hash of the request that first used the key, a different request can't reuse it
+    fingerprint = models.TextField()
+
+    # null while the first request is still running
+    status_code = models.IntegerField(null=True)
+    content_type = models.TextField(null=True)
+    body = models.BinaryField(null=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['endpoint', 'key'], name='unique_idempotency_key'),
+        ]
+        indexes = [
+            models.Index(fields=['expires_at']),
+        ]
+
+
+class TransferJob(models.Model):
+    """
+    A bank transfer accepted by the API and carried out by run_transfer_jobs.
+    """
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    wallet = models.ForeignKey(UserWalletData, on_delete=models.CASCADE, related_name='transfer_jobs')
+    status = models.TextField(default=QUEUED)
+
+    amount = models.DecimalField(max_digits=18, decimal_places=2)
+    bank_code = models.TextField()
+    account_number = models.TextField()
+    account_name = models.TextField()
+    description = models.TextField()
+
+    # milliseconds taken by each step, e.g. {"reserve": 3.1, "debit": 410.2, "transfer": 780.9}
+    timings = models.JSONField(default=dict)
+    result = models.JSONField(null=True)
+    error = models.JSONField(null=True)
+    worker = models.TextField(null=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True)
+    finished_at = models.DateTimeField(null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+            models.Index(fields=['wallet', '-created_at']),
+        ]
+
+
+class BatchJob(models.Model):
+    """
+    A bulk operation accepted by the API and carried out item by item by run_batch_jobs.
+    """
+    CREDIT = "credit"
+    PAYOUT = "payout"
+    PROVISION = "provision"
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    kind = models.TextField()
+    status = models.TextField(default=QUEUED)
+    concurrency = models.IntegerField()
+
+    total_items = models.IntegerField(default=0)
+    processed_items = models.IntegerField(default=0)
+    succeeded_items = models.IntegerField(default=0)
+    failed_items = models.IntegerField(default=0)
+    # throughput and per-item latency, filled in when the job completes
+    stats = models.JSONField(default=dict)
+
+    # uploaded file the items came from, and the CSV of outcomes written on completion
+    source_name = models.TextField(null=True)
+    source_digest = models.TextField(null=True, db_index=True)
+    results = models.BinaryField(null=True)
+
+    # lease of the worker running the job: bumped on every claim, a worker whose
+    # attempt is no longer the job's lost it and must not write another outcome
+    worker = models.TextField(null=True)
+    attempt = models.IntegerField(default=0)
+    heartbeat_at = models.DateTimeField(null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True)
+    finished_at = models.DateTimeField(null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+
+class BatchItem(models.Model):
+    """
+    One entry of a BatchJob: its input row and, once processed, its outcome.
+    """
+    PENDING = "pending"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+    job = models.ForeignKey(BatchJob, on_delete=models.CASCADE, related_name='items')
+    position = models.IntegerField()
+    wallet = models.ForeignKey(UserWalletData, on_delete=models.SET_NULL, null=True, related_name='+')
+    data = models.JSONField()
+
+    status = models.TextField(default=PENDING)
+    result = models.JSONField(null=True)
+    error = models.JSONField(null=True)
+    latency_ms = models.FloatField(null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['job', 'position'], name='unique_batch_item_position'),
+        ]
+        indexes = [
+            models.Index(fields=['job', 'status', 'position']),
+        ]
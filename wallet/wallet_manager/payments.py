@@ -0,0 +1,450 @@
+"""
+Money movements shared by the views and the background workers. Each one
+returns (data, None) on success or (None, error response) on failure, and
+adds the milliseconds its upstream steps took to `timings` when given. The
+functions ending in Async are the same movements for the async views.
+"""
+
+from .wallets_africa import WalletsAfricaAPI, AsyncWalletsAfricaAPI
+from .ledger import reservableAmount, reserveFunds, settleFunds, releaseFunds, creditFunds, syncAvailableFunds
+from .locks import walletLock, asyncWalletLock
+from api_utils import codec
+from api_utils.views import badRequestResponse, internalServerErrorResponse
+from api_utils.concurrency import bounded_map, async_bounded_map
+from errors.views import getError, ErrorCodes
+from django.conf import settings
+from asgiref.sync import sync_to_async
+from decimal import Decimal
+import time
+import uuid
+import logging
+# Get an instance of a logger
+logger = logging.getLogger(__name__)
+
+# instantiate
+wallets_api = WalletsAfricaAPI()
+async_wallets_api = AsyncWalletsAfricaAPI()
+
+
+def newReference():
+    return str(uuid.uuid4())[:12]
+
+
+def elapsedMs(started):
+    return round((time.monotonic() - started) * 1000, 3)
+
+
+# upstream answers after which the request surely had no effect; a timeout, a
+# conflict or a gateway error may hide a debit or credit that went through
+DEFINITE_REJECTIONS = (400, 401, 403, 404, 422)
+
+
+def outcomeUnknown(errorResponse):
+    """
+    True unless the error response carries an upstream status that rejected the request.
+    """
+    return getattr(errorResponse, 'upstream_status_code', None) not in DEFINITE_REJECTIONS
+
+
+def responseError(response):
+    """
+    JSON-ready copy of an error response returned by the helpers below.
+    """
+    try:
+        body = codec.loads(response.content)
+    except ValueError:
+        body = response.content.decode(errors='replace')
+
+    error = {"statusCode": response.status_code, "body": body}
+    if getattr(response, 'upstream_status_code', None) != None:
+        error["upstreamStatusCode"] = response.upstream_status_code
+    return error
+
+
+def invalidAmountResponse():
+    return badRequestResponse(getError(ErrorCodes.GENERIC_ERROR, "The amount should be a positive number"))
+
+
+def holdWalletFunds(wallet, amount, reference):
+    """
+    Reserve funds for a debit on the wallet's ledger. When the ledger is short or
+    hasn't been synced yet it is refreshed from the upstream balance once first.
+    Must run under walletLock, so no debit or credit of the wallet lands between
+    the balance read and the sync. Returns (hold, None) or (None, error response).
+    """
+    if reservableAmount(amount) == None:
+        return None, invalidAmountResponse()
+
+    hold = reserveFunds(wallet, amount, reference)
+    if hold != None:
+        return hold, None
+
+    # the ledger is shared by every worker, only a balance read now may raise it;
+    # a cached or coalesced one can predate the wallet's last debit
+    balance, msg = wallets_api.get_wallet_balance(wallet.phone_number, fresh=True)
+    if balance == None:
+        return None, internalServerErrorResponse(getError(ErrorCodes.GENERIC_ERROR, msg))
+    if not msg:
+        # the request failed
+        return None, balance
+
+    syncAvailableFunds(wallet, balance['WalletBalance'])
+    hold = reserveFunds(wallet, amount, reference)
+    if hold == None:
+        return None, badRequestResponse(getError(ErrorCodes.GENERIC_ERROR, "Insufficient funds"))
+
+    return hold, None
+
+
+def debitWallet(wallet, amount, reference=None, timings=None):
+    """
+    Debit the sub wallet into the main wallet.
+    """
+    reference = reference or newReference()
+    timings = {} if timings is None else timings
+
+    # requests for the same wallet run one at a time from here
+    with walletLock(wallet):
+        # set the funds aside on the local ledger so concurrent debits can't spend them twice
+        started = time.monotonic()
+        hold, errorResponse = holdWalletFunds(wallet, amount, reference)
+        timings['reserve'] = elapsedMs(started)
+        if hold == None:
+            return None, errorResponse
+
+        # debit wallet
+        started = time.monotonic()
+        debit, msg = wallets_api.debit_wallet(amount, wallet.phone_number, reference)
+        timings['debit'] = elapsedMs(started)
+        if debit == None:
+            # the outcome is unknown, the hold stays until reconcile_wallet_funds closes it
+            return None, internalServerErrorResponse(getError(ErrorCodes.GENERIC_ERROR, msg))
+        if not msg:
+            # the request failed, only a rejection frees the funds; after a gateway
+            # error the debit may have gone through, so the hold waits for reconciliation
+            if outcomeUnknown(debit):
+                logger.error(f"debitWallet@Error: debit {reference} of {amount} has an unknown outcome")
+            else:
+                releaseFunds(hold)
+            return None, debit
+
+        settleFunds(hold)
+
+    return {"amount": amount, "reference": reference}, None
+
+
+def creditWallet(wallet, amount, reference=None, timings=None):
+    """
+    Credit the sub wallet from the main wallet.
+    """
+    reference = reference or newReference()
+    timings = {} if timings is None else timings
+
+    # requests for the same wallet run one at a time from here
+    with walletLock(wallet):
+        started = time.monotonic()
+        credit, msg = wallets_api.credit_wallet(reference, amount, wallet.phone_number)
+        timings['credit'] = elapsedMs(started)
+        if credit == None:
+            return None, internalServerErrorResponse(getError(ErrorCodes.GENERIC_ERROR, msg))
+        if not msg:
+            # the request failed
+            return None, credit
+
+        creditFunds(wallet, amount)
+
+    return {"amount": amount, "reference": reference}, None
+
+
+def payBankAccount(amount, bankCode, accountNumber, accountName, description, reference=None, timings=None):
+    """
+    Pay a bank account from the main wallet.
+    """
+    reference = reference or newReference()
+    timings = {} if timings is None else timings
+
+    # exceute transfer
+    started = time.monotonic()
+    transfer, msg = wallets_api.bank_account_transfer(bankCode, accountNumber, amount, accountName, reference, description)
+    timings['transfer'] = elapsedMs(started)
+    if transfer == None:
+        return None, internalServerErrorResponse(getError(ErrorCodes.GENERIC_ERROR, msg))
+    if not msg:
+        # the request failed
+        return None, transfer
+
+    return transfer, None
+
+
+def transferToBank(wallet, amount, bankCode, accountNumber, accountName, description, timings=None):
+    """
+    Debit the sub wallet into the main wallet, then pay the bank account from the main wallet.
+    """
+    timings = {} if timings is None else timings
+
+    debit, errorResponse = debitWallet(wallet, amount, timings=timings)
+    if debit == None:
+        return None, errorResponse
+
+    return payBankAccount(amount, bankCode, accountNumber, accountName, description, timings=timings)
+
+
+def transferCredits(transfers, reference):
+    # one credit per item, each with its own reference
+    return [(wallet, amount, f"{reference}-c{position}") for position, (wallet, amount) in enumerate(transfers)]
+
+
+def creditOutcome(credit, result):
+    """
+    Outcome of one transfer credit: credited, refunded when the upstream
+    rejected it, or unknown after a timeout, a gateway or a server error.
+    """
+    (wallet, amount, creditReference), (data, errorResponse) = credit, result
+
+    outcome = {"reference": creditReference, "wallet_key": wallet.wallet_key, "amount": amount}
+    if data != None:
+        outcome["status"] = "credited"
+    elif not outcomeUnknown(errorResponse):
+        outcome.update(status="refunded", error=responseError(errorResponse))
+    else:
+        logger.error(f"transferBetweenWallets@Error: credit {creditReference} of {amount} has an unknown outcome")
+        outcome.update(status="unknown", error=responseError(errorResponse))
+    return outcome
+
+
+def creditRaised(creditReference, e):
+    """
+    Result of a credit that raised instead of answering, e.g. on a database
+    error: whether the upstream took it is unknown.
+    """
+    logger.error(f"transferBetweenWallets@Error: credit {creditReference} raised")
+    logger.error(e)
+    return None, internalServerErrorResponse(getError(ErrorCodes.GENERIC_ERROR))
+
+
+def refundAmount(outcomes):
+    # the source is paid back for every credit the upstream turned down
+    return sum(Decimal(str(outcome["amount"])) for outcome in outcomes if outcome["status"] == "refunded")
+
+
+def refundFailed(outcomes, refundReference, refund, errorResponse):
+    logger.error(f"transferBetweenWallets@Error: refund {refundReference} of {refund} failed")
+    for outcome in outcomes:
+        if outcome["status"] == "refunded":
+            outcome.update(status="unknown", refundError=responseError(errorResponse))
+
+
+def transferResult(reference, debit, total, outcomes, refund, refundReference):
+    return {
+        "reference": reference,
+        "debitReference": debit["reference"],
+        "amount": float(total),
+        "refunded": float(refund),
+        "refundReference": refundReference,
+        "transfers": outcomes,
+    }
+
+
+def transferBetweenWallets(source, transfers, reference=None, timings=None):
+    """
+    Move funds from the source sub wallet to other sub wallets through the main wallet.
+
+    `transfers` is a list of (destination, amount). The source is debited once
+    for the total and every item is credited on its own with its own
+    reference, the credits running in parallel. Credits the upstream rejected
+    are paid back to the source in one refund credit. A credit whose outcome is
+    unknown (a timeout, a gateway or server error, or a credit that raised) is
+    not refunded, so funds are never paid out twice; it is left for
+    reconciliation with its reference.
+    """
+    reference = reference or newReference()
+    timings = {} if timings is None else timings
+
+    total = sum(Decimal(str(amount)) for _, amount in transfers)
+
+    debit, errorResponse = debitWallet(source, float(total), reference=f"{reference}-d", timings=timings)
+    if debit == None:
+        return None, errorResponse
+
+    def credit(entry):
+        wallet, amount, creditReference = entry
+        try:
+            return creditWallet(wallet, amount, reference=creditReference)
+        except Exception as e:
+            # the debit went through, every credit must end up with an outcome
+            return creditRaised(creditReference, e)
+
+    started = time.monotonic()
+    credits = transferCredits(transfers, reference)
+    results = dict(bounded_map(credit, credits, settings.BATCH_CONCURRENCY))
+    outcomes = [creditOutcome(entry, results[entry]) for entry in credits]
+    timings['credit'] = elapsedMs(started)
+
+    refund = refundAmount(outcomes)
+    refundReference = None
+    if refund:
+        refundReference = f"{reference}-r"
+        try:
+            data, errorResponse = creditWallet(source, float(refund), reference=refundReference)
+        except Exception as e:
+            data, errorResponse = creditRaised(refundReference, e)
+        if data == None:
+            refundFailed(outcomes, refundReference, refund, errorResponse)
+            refundReference = None
+            refund = 0
+
+    return transferResult(reference, debit, total, outcomes, refund, refundReference), None
+
+
+# async versions for the async views: the upstream calls go through
+# AsyncWalletsAfricaAPI and only the ledger writes run through sync_to_async
+
+reserveFundsAsync = sync_to_async(reserveFunds)
+settleFundsAsync = sync_to_async(settleFunds)
+releaseFundsAsync = sync_to_async(releaseFunds)
+creditFundsAsync = sync_to_async(creditFunds)
+syncAvailableFundsAsync = sync_to_async(syncAvailableFunds)
+
+
+async def holdWalletFundsAsync(wallet, amount, reference):
+    """
+    holdWalletFunds for async code, must run under asyncWalletLock.
+    """
+    if reservableAmount(amount) == None:
+        return None, invalidAmountResponse()
+
+    hold = await reserveFundsAsync(wallet, amount, reference)
+    if hold != None:
+        return hold, None
+
+    balance, msg = await async_wallets_api.get_wallet_balance(wallet.phone_number, fresh=True)
+    if balance == None:
+        return None, internalServerErrorResponse(getError(ErrorCodes.GENERIC_ERROR, msg))
+    if not msg:
+        # the request failed
+        return None, balance
+
+    await syncAvailableFundsAsync(wallet, balance['WalletBalance'])
+    hold = await reserveFundsAsync(wallet, amount, reference)
+    if hold == None:
+        return None, badRequestResponse(getError(ErrorCodes.GENERIC_ERROR, "Insufficient funds"))
+
+    return hold, None
+
+
+async def debitWalletAsync(wallet, amount, reference=None, timings=None):
+    reference = reference or newReference()
+    timings = {} if timings is None else timings
+
+    # requests for the same wallet run one at a time from here
+    async with asyncWalletLock(wallet):
+        started = time.monotonic()
+        hold, errorResponse = await holdWalletFundsAsync(wallet, amount, reference)
+        timings['reserve'] = elapsedMs(started)
+        if hold == None:
+            return None, errorResponse
+
+        started = time.monotonic()
+        debit, msg = await async_wallets_api.debit_wallet(amount, wallet.phone_number, reference)
+        timings['debit'] = elapsedMs(started)
+        if debit == None:
+            # the outcome is unknown, the hold stays until reconcile_wallet_funds closes it
+            return None, internalServerErrorResponse(getError(ErrorCodes.GENERIC_ERROR, msg))
+        if not msg:
+            # the request failed, see debitWallet
+            if outcomeUnknown(debit):
+                logger.error(f"debitWallet@Error: debit {reference} of {amount} has an unknown outcome")
+            else:
+                await releaseFundsAsync(hold)
+            return None, debit
+
+        await settleFundsAsync(hold)
+
+    return {"amount": amount, "reference": reference}, None
+
+
+async def creditWalletAsync(wallet, amount, reference=None, timings=None):
+    reference = reference or newReference()
+    timings = {} if timings is None else timings
+
+    # requests for the same wallet run one at a time from here
+    async with asyncWalletLock(wallet):
+        started = time.monotonic()
+        credit, msg = await async_wallets_api.credit_wallet(reference, amount, wallet.phone_number)
+        timings['credit'] = elapsedMs(started)
+        if credit == None:
+            return None, internalServerErrorResponse(getError(ErrorCodes.GENERIC_ERROR, msg))
+        if not msg:
+            # the request failed
+            return None, credit
+
+        await creditFundsAsync(wallet, amount)
+
+    return {"amount": amount, "reference": reference}, None
+
+
+async def payBankAccountAsync(amount, bankCode, accountNumber, accountName, description, reference=None, timings=None):
+    reference = reference or newReference()
+    timings = {} if timings is None else timings
+
+    # exceute transfer
+    started = time.monotonic()
+    transfer, msg = await async_wallets_api.bank_account_transfer(bankCode, accountNumber, amount, accountName, reference, description)
+    timings['transfer'] = elapsedMs(started)
+    if transfer == None:
+        return None, internalServerErrorResponse(getError(ErrorCodes.GENERIC_ERROR, msg))
+    if not msg:
+        # the request failed
+        return None, transfer
+
+    return transfer, None
+
+
+async def transferToBankAsync(wallet, amount, bankCode, accountNumber, accountName, description, timings=None):
+    timings = {} if timings is None else timings
+
+    debit, errorResponse = await debitWalletAsync(wallet, amount, timings=timings)
+    if debit == None:
+        return None, errorResponse
+
+    return await payBankAccountAsync(amount, bankCode, accountNumber, accountName, description, timings=timings)
+
+
+async def transferBetweenWalletsAsync(source, transfers, reference=None, timings=None):
+    reference = reference or newReference()
+    timings = {} if timings is None else timings
+
+    total = sum(Decimal(str(amount)) for _, amount in transfers)
+
+    debit, errorResponse = await debitWalletAsync(source, float(total), reference=f"{reference}-d", timings=timings)
+    if debit == None:
+        return None, errorResponse
+
+    async def credit(entry):
+        wallet, amount, creditReference = entry
+        try:
+            return await creditWalletAsync(wallet, amount, reference=creditReference)
+        except Exception as e:
+            # the debit went through, every credit must end up with an outcome
+            return creditRaised(creditReference, e)
+
+    started = time.monotonic()
+    credits = transferCredits(transfers, reference)
+    results = dict(await async_bounded_map(credit, credits, settings.BATCH_CONCURRENCY))
+    outcomes = [creditOutcome(entry, results[entry]) for entry in credits]
+    timings['credit'] = elapsedMs(started)
+
+    refund = refundAmount(outcomes)
+    refundReference = None
+    if refund:
+        refundReference = f"{reference}-r"
+        try:
+            data, errorResponse = await creditWalletAsync(source, float(refund), reference=refundReference)
+        except Exception as e:
+            data, errorResponse = creditRaised(refundReference, e)
+        if data == None:
+            refundFailed(outcomes, refundReference, refund, errorResponse)
+            refundReference = None
+            refund = 0
+
+    return transferResult(reference, debit, total, outcomes, refund, refundReference), None
@@ -0,0 +1,136 @@
+"""
+Bulk sub wallet creation, run as a BatchJob.
+
+Rows are checked locally when the job is created: missing fields, repeats
+within the request and wallets we already store never reach the upstream.
+The workers then run the upstream existence lookups and the wallet/generate
+call of every remaining row, one row per batch item.
+
+Each wallet is stored as soon as the upstream created it rather than
+bulk_create'd with the rest of its chunk: a worker that died before the
+chunk's insert would leave wallets that exist upstream but not here, and
+the resumed job would only find them as already existing. The insert is one
+statement next to the three upstream calls of the row.
+"""
+
+from .wallets_africa import WalletsAfricaAPI
+from .utils import createUserWalletData
+from .payments import responseError
+from .models import UserWalletData
+
+# instantiate
+wallets_api = WalletsAfricaAPI()
+
+PROVISION_FIELDS = ['first_name', 'last_name', 'email', 'birthday', 'phone_number']
+
+# outcome of a row
+CREATED = "created"
+EXISTS = "exists"
+DUPLICATE = "duplicate"
+FAILED = "failed"
+
+
+def rowOutcome(position, row, status, message=None, **fields):
+    outcome = {
+        "position": position,
+        "email": row.get('email') if isinstance(row, dict) else None,
+        "phoneNumber": row.get('phone_number') if isinstance(row, dict) else None,
+        "status": status,
+    }
+    if message != None:
+        outcome["message"] = message
+    outcome.update(fields)
+    return outcome
+
+
+def normalizeRow(row):
+    row = dict(row)
+    row['email'] = str(row['email']).strip().lower()
+    row['phone_number'] = str(row['phone_number']).strip()
+    return row
+
+
+def screenRows(rows, outcomes):
+    """
+    Record an outcome for every row that needs no upstream call and return the
+    (position, row) pairs left to provision.
+    """
+    candidates = []
+    seenPhones = {}
+    seenEmails = {}
+
+    for position, row in enumerate(rows):
+        if not isinstance(row, dict):
+            outcomes[position] = rowOutcome(position, {}, FAILED, "Each entry should be an object")
+            continue
+
+        missingKeys = [key for key in PROVISION_FIELDS if not row.get(key)]
+        if missingKeys:
+            outcomes[position] = rowOutcome(position, row, FAILED, f"The following key(s) are missing: {missingKeys}")
+            continue
+
+        row = normalizeRow(row)
+        if row['phone_number'] in seenPhones or row['email'] in seenEmails:
+            first = seenPhones.get(row['phone_number'], seenEmails.get(row['email']))
+            outcomes[position] = rowOutcome(position, row, DUPLICATE, f"Same phone number or email as entry {first}")
+            continue
+
+        seenPhones[row['phone_number']] = position
+        seenEmails[row['email']] = position
+        candidates.append((position, row))
+
+    # one query for the wallets we already store
+    storedPhones = set()
+    storedEmails = set()
+    for start in range(0, len(candidates), 1000):
+        chunk = candidates[start:start + 1000]
+        stored = UserWalletData.objects.filter(
+            phone_number__in=[row['phone_number'] for _, row in chunk]
+        ).values_list('phone_number', flat=True)
+        storedPhones.update(stored)
+        stored = UserWalletData.objects.filter(
+            email_address__in=[row['email'] for _, row in chunk]
+        ).values_list('email_address', flat=True)
+        storedEmails.update(email.lower() for email in stored if email)
+
+    remaining = []
+    for position, row in candidates:
+        if row['phone_number'] in storedPhones:
+            outcomes[position] = rowOutcome(position, row, EXISTS, "Wallets Already Exist for the Phone number specified")
+        elif row['email'] in storedEmails:
+            outcomes[position] = rowOutcome(position, row, EXISTS, "Wallets Already Exist for the Email Address specified")
+        else:
+            remaining.append((position, row))
+
+    return remaining
+
+
+def provisionRow(row):
+    """
+    Create the sub wallet of a screened row unless the upstream already has one
+    for its phone number or email. Returns (result, None) or (None, error), the
+    contract of a batch item runner; both carry the row's outcome.
+    """
+    lookups = [
+        (wallets_api.get_wallet_by_phone, row['phone_number'], "Wallets Already Exist for the Phone number specified"),
+        (wallets_api.get_wallet_by_email, row['email'], "Wallets Already Exist for the Email Address specified"),
+    ]
+    for lookup, value, conflictMessage in lookups:
+        existingWallet, msg = lookup(value)
+        if existingWallet == None:
+            return None, {"outcome": FAILED, "message": msg}
+        elif msg:
+            return None, {"outcome": EXISTS, "message": conflictMessage}
+
+    createdWalletData, outcome = wallets_api.generate_wallet(row['first_name'], row['last_name'], row['email'], row['birthday'], row['phone_number'])
+    if createdWalletData == None:
+        return None, {"outcome": FAILED, "message": outcome}
+    if not outcome:
+        # the request failed
+        return None, dict(responseError(createdWalletData), outcome=FAILED)
+
+    wallet = createUserWalletData(createdWalletData)
+    if wallet == None:
+        return None, {"outcome": FAILED, "message": "The wallet was created upstream but could not be stored"}
+
+    return {"outcome": CREATED, "walletKey": wallet.wallet_key}, None
@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .models import UserWalletData
+from .wallet_keys import wallet_key_cache
+
+
+@receiver(post_save, sender=UserWalletData)
+@receiver(post_delete, sender=UserWalletData)
+def invalidateWalletKey(sender, instance, **kwargs):
+    # queryset update() and bulk operations send no signals, they never change the cached fields
+    wallet_key_cache.invalidate(instance.wallet_key)
@@ -0,0 +1,58 @@
+from django.test import SimpleTestCase
+from wallet_manager.banks import BankDirectory, nubanIsValid
+
+BANKS = [
+    {"BankCode": "044", "BankName": "Access Bank"},
+    {"BankCode": "058", "BankName": "Guaranty Trust Bank"},
+    {"BankCode": "214", "BankName": "First City Monument Bank"},
+]
+
+
+class NubanTests(SimpleTestCase):
+
+    def test_valid_deposit_money_bank_account(self):
+        self.assertTrue(nubanIsValid("058", "0123456785"))
+
+    def test_wrong_check_digit(self):
+        self.assertFalse(nubanIsValid("058", "0123456784"))
+
+    def test_valid_five_digit_institution_account(self):
+        self.assertTrue(nubanIsValid("50211", "1234567897"))
+        self.assertFalse(nubanIsValid("50211", "1234567890"))
+
+    def test_malformed_account_numbers(self):
+        for accountNumber in ["012345678", "01234567850", "01234567a5", ""]:
+            self.assertFalse(nubanIsValid("058", accountNumber), accountNumber)
+
+    def test_codes_that_cant_be_checked_are_left_to_the_upstream(self):
+        self.assertTrue(nubanIsValid("999058", "0123456784"))
+        self.assertTrue(nubanIsValid("ABC", "0123456784"))
+
+
+class BankDirectoryTests(SimpleTestCase):
+
+    def test_search_matches_any_word_of_the_name(self):
+        directory = BankDirectory(BANKS)
+
+        self.assertEqual([bank["BankCode"] for bank in directory.search("bank")], ["044", "058", "214"])
+        self.assertEqual([bank["BankCode"] for bank in directory.search("first")], ["214"])
+
+    def test_search_falls_back_to_close_matches(self):
+        self.assertEqual(BankDirectory(BANKS).search("acces bank")[0]["BankCode"], "044")
+
+    def test_wrapped_payload(self):
+        directory = BankDirectory({"data": BANKS})
+
+        self.assertEqual(directory.get("044")["BankName"], "Access Bank")
+
+    def test_known_bank_checks_the_account_number(self):
+        directory = BankDirectory(BANKS)
+
+        self.assertTrue(directory.is_valid_account("058", "0123456785"))
+        self.assertFalse(directory.is_valid_account("058", "0123456784"))
+
+    def test_unknown_bank_or_empty_directory_doesnt_reject(self):
+        with self.assertLogs('wallet_manager.banks', level='WARNING'):
+            self.assertTrue(BankDirectory(BANKS).is_valid_account("50211", "1234567897"))
+        with self.assertLogs('wallet_manager.banks', level='WARNING'):
+            self.assertTrue(BankDirectory([]).is_valid_account("058", "0123456785"))
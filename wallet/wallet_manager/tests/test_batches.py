@@ -0,0 +1,120 @@
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from unittest.mock import patch
+from api_utils.views import badRequestResponse
+from wallet_manager import batches
+from wallet_manager.batches import createBatchJob, creditBatchItems, claimNextBatchJob, runBatchJob
+from wallet_manager.models import UserWalletData, BatchJob, BatchItem
+from datetime import timedelta
+import csv
+import io
+import uuid
+
+
+def sequentialMap(fn, items, limit):
+    # bounded_map without the thread pool, so the items run inside the test transaction
+    return ((item, fn(item)) for item in items)
+
+
+def creditResult(wallet, amount, reference=None):
+    if wallet.wallet_key == "k3":
+        return None, badRequestResponse({"Message": "rejected"})
+    return {"amount": amount, "reference": reference}, None
+
+
+@patch.object(batches, 'bounded_map', sequentialMap)
+class BatchJobTests(TestCase):
+
+    def setUp(self):
+        for index in (1, 2, 3):
+            UserWalletData.objects.create(wallet_key=f"k{index}", phone_number=f"08{index}")
+
+    def creditJob(self, credits):
+        jobId = uuid.uuid4()
+        return createBatchJob(BatchJob.CREDIT, creditBatchItems(jobId, credits), 2, jobId=jobId)
+
+    def test_entries_that_cant_run_fail_up_front(self):
+        job = self.creditJob([{"wallet_key": "k1", "amount": 10}, {"wallet_key": "nope", "amount": 1}, {"wallet_key": "k2", "amount": "1.234"}, 5])
+
+        self.assertEqual((job.total_items, job.processed_items, job.failed_items), (4, 3, 3))
+        self.assertEqual(BatchItem.objects.filter(job=job, status=BatchItem.PENDING).count(), 1)
+
+    def test_job_runs_every_pending_item(self):
+        job = self.creditJob([{"wallet_key": "k1", "amount": 10}, {"wallet_key": "k2", "amount": 20}, {"wallet_key": "k3", "amount": 30}])
+
+        claimed = claimNextBatchJob("worker-1")
+        with patch.object(batches, 'creditWallet', side_effect=creditResult) as creditWallet:
+            job = runBatchJob(claimed)
+
+        self.assertEqual(creditWallet.call_count, 3)
+        self.assertEqual(job.status, BatchJob.COMPLETED)
+        self.assertEqual((job.processed_items, job.succeeded_items, job.failed_items), (3, 2, 1))
+        self.assertEqual(BatchItem.objects.get(job=job, position=2).error['statusCode'], 400)
+        self.assertIn("latencyMs", job.stats)
+
+    def test_results_csv_is_stored_on_the_job(self):
+        self.creditJob([{"wallet_key": "k1", "amount": 10, "reference": "c1"}, {"wallet_key": "k3", "amount": 30}])
+
+        with patch.object(batches, 'creditWallet', side_effect=creditResult):
+            job = runBatchJob(claimNextBatchJob("worker-1"))
+
+        rows = list(csv.DictReader(io.StringIO(bytes(BatchJob.objects.get(pk=job.pk).results).decode())))
+        self.assertEqual([(row['position'], row['status'], row['wallet_key']) for row in rows], [("0", "succeeded", "k1"), ("1", "failed", "k3")])
+        self.assertEqual(rows[0]['reference'], "c1")
+
+    def test_resumed_job_skips_credits_already_made(self):
+        job = self.creditJob([{"wallet_key": "k1", "amount": 10}, {"wallet_key": "k2", "amount": 20}])
+        first = BatchItem.objects.get(job=job, position=0)
+        first.data['credited'] = True
+        BatchItem.objects.filter(pk=first.pk).update(data=first.data)
+
+        with patch.object(batches, 'creditWallet', side_effect=creditResult) as creditWallet:
+            runBatchJob(claimNextBatchJob("worker-1"))
+
+        creditWallet.assert_called_once()
+        self.assertTrue(BatchItem.objects.get(pk=first.pk).result['alreadyCredited'])
+
+    @override_settings(BATCH_JOB_STALE_AFTER=60)
+    def test_stale_running_job_is_reclaimed_with_a_new_lease(self):
+        job = self.creditJob([{"wallet_key": "k1", "amount": 10}])
+        first = claimNextBatchJob("worker-1")
+
+        self.assertIsNone(claimNextBatchJob("worker-2"))
+
+        BatchJob.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - timedelta(minutes=5))
+        second = claimNextBatchJob("worker-2")
+
+        self.assertEqual(second.pk, job.pk)
+        self.assertEqual(second.worker, "worker-2")
+        self.assertEqual(second.attempt, first.attempt + 1)
+
+    def test_worker_that_lost_its_lease_stops_writing(self):
+        job = self.creditJob([{"wallet_key": "k1", "amount": 10}, {"wallet_key": "k2", "amount": 20}])
+        claimed = claimNextBatchJob("worker-1")
+        # another worker reclaimed the job
+        BatchJob.objects.filter(pk=job.pk).update(attempt=claimed.attempt + 1, worker="worker-2")
+
+        with patch.object(batches, 'creditWallet', side_effect=creditResult) as creditWallet:
+            with self.assertLogs('wallet_manager.batches', level='ERROR'):
+                self.assertIsNone(runBatchJob(claimed))
+
+        creditWallet.assert_not_called()
+        job.refresh_from_db()
+        self.assertEqual(job.status, BatchJob.RUNNING)
+        self.assertEqual(BatchItem.objects.filter(job=job, status=BatchItem.PENDING).count(), 2)
+
+    def test_lease_lost_mid_item_refuses_its_outcome(self):
+        job = self.creditJob([{"wallet_key": "k1", "amount": 10}])
+        claimed = claimNextBatchJob("worker-1")
+
+        def reclaimedDuringCredit(wallet, amount, reference=None):
+            BatchJob.objects.filter(pk=job.pk).update(attempt=claimed.attempt + 1)
+            return {"amount": amount, "reference": reference}, None
+
+        with patch.object(batches, 'creditWallet', side_effect=reclaimedDuringCredit):
+            with self.assertLogs('wallet_manager.batches', level='ERROR'):
+                self.assertIsNone(runBatchJob(claimed))
+
+        self.assertEqual(BatchItem.objects.get(job=job).status, BatchItem.PENDING)
+        job.refresh_from_db()
+        self.assertEqual(job.processed_items, 0)
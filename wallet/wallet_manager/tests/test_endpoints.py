@@ -0,0 +1,147 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TestCase, RequestFactory, override_settings
+from asgiref.sync import async_to_sync
+from api_utils import codec
+from api_utils.views import successResponse
+from errors.views import ErrorCodes
+from wallet_manager.endpoints import endpoint, Field, number, money, WALLET_AND_EMAIL, WALLET_KEY, ROOT_CREDENTIALS
+from wallet_manager.models import UserWalletData
+import json
+import uuid
+
+
+def echo(request, **arguments):
+    wallet = arguments.pop('wallet', None)
+    return successResponse(body={"wallet": wallet.wallet_key if wallet else None, "arguments": arguments})
+
+
+@override_settings(ROOT_SECRET="root")
+class EndpointTests(TestCase):
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        # a fresh key per test, the wallet key cache outlives the test transaction
+        self.wallet = UserWalletData.objects.create(wallet_key=uuid.uuid4().hex[:12], email_address="a@b.c", phone_number="080")
+
+    def post(self, view, body, **headers):
+        request = self.factory.post('/view', body if isinstance(body, str) else json.dumps(body), content_type='application/json', **headers)
+        response = view(request)
+        return response.status_code, codec.loads(response.content)
+
+    def test_fields_are_passed_as_arguments(self):
+        view = endpoint(fields=['name', Field('amount', number), Field('note', required=False, arg='narration')])(echo)
+
+        status, body = self.post(view, {"name": "x", "amount": "12.5"})
+
+        self.assertEqual(status, 200)
+        self.assertEqual(body['data']['arguments'], {"name": "x", "amount": 12.5, "narration": None})
+
+    def test_wrong_method(self):
+        view = endpoint(fields=['name'])(echo)
+
+        response = view(self.factory.get('/view'))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(codec.loads(response.content)['message'], "HTTP method should be POST")
+
+    def test_missing_fields(self):
+        status, body = self.post(endpoint(fields=['name', 'amount'])(echo), {"name": "x"})
+
+        self.assertEqual(status, 400)
+        self.assertEqual(body['errorCode'], ErrorCodes.MISSING_FIELDS)
+        self.assertIn("['amount']", body['message'])
+
+    def test_field_that_doesnt_parse(self):
+        view = endpoint(fields=[Field('amount', number)])(echo)
+
+        for amount in ["ten", True]:
+            status, body = self.post(view, {"amount": amount})
+
+            self.assertEqual(status, 400)
+            self.assertEqual(body['message'], "amount should be a number")
+
+    def test_money_field(self):
+        view = endpoint(fields=[Field('amount', money)])(echo)
+
+        status, body = self.post(view, {"amount": "12.5"})
+        self.assertEqual(status, 200)
+        self.assertEqual(body['data']['arguments'], {"amount": 12.5})
+
+        for amount in [-1, 0, "nan", "inf", "1e400", "0.001", True]:
+            status, body = self.post(view, {"amount": amount})
+
+            self.assertEqual(status, 400)
+            self.assertEqual(body['message'], "amount should be a positive number with at most 2 decimal places")
+
+    def test_body_that_isnt_an_object(self):
+        view = endpoint(fields=['name'])(echo)
+
+        for raw in ["not json", "[1, 2]"]:
+            status, body = self.post(view, raw)
+
+            self.assertEqual(status, 400)
+            self.assertEqual(body['message'], "The request body should be a JSON object")
+
+    def test_wallet_and_email(self):
+        view = endpoint(wallet=WALLET_AND_EMAIL)(echo)
+
+        status, body = self.post(view, {"secret_key": self.wallet.wallet_key, "email_address": "a@b.c"})
+        self.assertEqual(status, 200)
+        self.assertEqual(body['data']['wallet'], self.wallet.wallet_key)
+
+        status, body = self.post(view, {"secret_key": self.wallet.wallet_key, "email_address": "x@y.z"})
+        self.assertEqual(status, 403)
+
+        status, body = self.post(view, {"secret_key": "nope", "email_address": "a@b.c"})
+        self.assertEqual(status, 400)
+        self.assertEqual(body['errorCode'], ErrorCodes.UNAUTHORIZED_REQUEST)
+
+    def test_wallet_key_needs_no_email(self):
+        status, body = self.post(endpoint(wallet=WALLET_KEY)(echo), {"secret_key": self.wallet.wallet_key})
+
+        self.assertEqual(status, 200)
+        self.assertEqual(body['data']['arguments'], {})
+
+    def test_root_secret(self):
+        view = endpoint(root=True, fields=['name'])(echo)
+
+        self.assertEqual(self.post(view, {"name": "x"}, HTTP_SECRET="root")[0], 200)
+        self.assertEqual(self.post(view, {"name": "x"}, HTTP_SECRET="wrong")[0], 403)
+
+    def test_root_credentials_answer_invalid_credentials(self):
+        view = endpoint(root=ROOT_CREDENTIALS, fields=['name'])(echo)
+
+        status, body = self.post(view, {"name": "x"})
+
+        self.assertEqual(status, 400)
+        self.assertEqual(body['errorCode'], ErrorCodes.INVALID_CREDENTIALS)
+
+    def test_root_is_checked_before_the_body(self):
+        status, body = self.post(endpoint(root=True, fields=['name'])(echo), "not json")
+
+        self.assertEqual(status, 403)
+
+    def test_get_endpoint(self):
+        view = endpoint("GET", root=True)(echo)
+
+        response = view(self.factory.get('/view', HTTP_SECRET="root"))
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_get_endpoint_cant_declare_a_body(self):
+        with self.assertRaises(ImproperlyConfigured):
+            endpoint("GET", fields=['name'])(echo)
+        with self.assertRaises(ImproperlyConfigured):
+            endpoint("GET", wallet=WALLET_KEY)(echo)
+
+    def test_async_view(self):
+        @endpoint(fields=[Field('amount', number)], wallet=WALLET_AND_EMAIL)
+        async def view(request, wallet, amount):
+            return successResponse(body={"wallet": wallet.wallet_key, "amount": amount})
+
+        status, body = self.post(async_to_sync(view), {"secret_key": self.wallet.wallet_key, "email_address": "a@b.c", "amount": 3})
+        self.assertEqual(status, 200)
+        self.assertEqual(body['data'], {"wallet": self.wallet.wallet_key, "amount": 3.0})
+
+        status, body = self.post(async_to_sync(view), {"secret_key": self.wallet.wallet_key, "email_address": "a@b.c"})
+        self.assertEqual(status, 400)
@@ -0,0 +1,147 @@
+from django.test import TestCase, RequestFactory, override_settings
+from django.utils import timezone
+from asgiref.sync import async_to_sync
+from api_utils import codec
+from api_utils.views import successResponse
+from unittest.mock import patch
+from wallet_manager.idempotency import idempotent, requestFingerprint, storeResponse
+from wallet_manager.models import IdempotencyKey
+from datetime import timedelta
+import json
+
+
+class IdempotentTests(TestCase):
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.calls = 0
+
+        @idempotent
+        def view(request):
+            self.calls += 1
+            return successResponse(message="Debit", body={"call": self.calls})
+
+        self.view = view
+
+    def request(self, body, key="key-1"):
+        headers = {"HTTP_IDEMPOTENCY_KEY": key} if key else {}
+        return self.factory.post('/debit', json.dumps(body), content_type='application/json', **headers)
+
+    def test_retry_replays_the_stored_response(self):
+        first = self.view(self.request({"amount": 10}))
+        retry = self.view(self.request({"amount": 10}))
+
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(retry.status_code, first.status_code)
+        self.assertEqual(retry.content, first.content)
+        self.assertEqual(retry['Idempotent-Replayed'], "true")
+
+    def test_key_reused_for_a_different_request_conflicts(self):
+        self.view(self.request({"amount": 10}))
+        response = self.view(self.request({"amount": 20}))
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(self.calls, 1)
+
+    def pendingClaim(self, request, expiresIn):
+        # the pending record of a first request that hasn't answered yet
+        return IdempotencyKey.objects.create(
+            endpoint='/debit', key="key-1", fingerprint=requestFingerprint(request), expires_at=timezone.now() + expiresIn
+        )
+
+    def test_retry_while_the_first_request_runs_replays_its_response(self):
+        request = self.request({"amount": 10})
+        record = self.pendingClaim(request, timedelta(minutes=1))
+
+        def firstRequestAnswers(seconds):
+            storeResponse(record, successResponse(message="Debit", body={"call": "first"}))
+
+        with patch('wallet_manager.idempotency.time.sleep', side_effect=firstRequestAnswers) as sleep:
+            response = self.view(request)
+
+        sleep.assert_called_once()
+        self.assertEqual(self.calls, 0)
+        self.assertEqual(response['Idempotent-Replayed'], "true")
+        self.assertEqual(codec.loads(response.content)['data'], {"call": "first"})
+
+    @override_settings(IDEMPOTENCY_WAIT=0)
+    def test_retry_conflicts_when_the_first_request_doesnt_answer_in_time(self):
+        request = self.request({"amount": 10})
+        self.pendingClaim(request, timedelta(minutes=1))
+
+        response = self.view(request)
+
+        self.assertEqual(response.status_code, 409)
+        self.assertIn("in progress", codec.loads(response.content)['message'])
+        self.assertEqual(self.calls, 0)
+
+    def test_claim_left_behind_is_taken_over_once_its_lease_lapses(self):
+        request = self.request({"amount": 10})
+        abandoned = self.pendingClaim(request, -timedelta(seconds=1))
+
+        response = self.view(request)
+
+        self.assertEqual(self.calls, 1)
+        self.assertFalse(response.has_header('Idempotent-Replayed'))
+        record = IdempotencyKey.objects.get(key="key-1")
+        self.assertNotEqual(record.pk, abandoned.pk)
+        self.assertEqual(record.status_code, 200)
+
+        with self.assertLogs('wallet_manager.idempotency', level='ERROR'):
+            # the request that left the claim behind answers after all
+            storeResponse(abandoned, successResponse(message="Debit"))
+        self.assertEqual(bytes(IdempotencyKey.objects.get(key="key-1").body), response.content)
+
+    def test_claims_hold_the_key_for_the_lease_only(self):
+        with override_settings(IDEMPOTENCY_CLAIM_LEASE=60):
+            @idempotent
+            def view(request):
+                record = IdempotencyKey.objects.get(key="key-1")
+                self.assertLess(record.expires_at, timezone.now() + timedelta(seconds=61))
+                return successResponse(message="Debit")
+
+            view(self.request({"amount": 10}))
+
+        self.assertGreater(IdempotencyKey.objects.get(key="key-1").expires_at, timezone.now() + timedelta(hours=1))
+
+    def test_expired_key_runs_the_view_again(self):
+        self.view(self.request({"amount": 10}))
+        IdempotencyKey.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+
+        response = self.view(self.request({"amount": 10}))
+
+        self.assertEqual(self.calls, 2)
+        self.assertFalse(response.has_header('Idempotent-Replayed'))
+
+    def test_requests_without_a_key_always_run(self):
+        self.view(self.request({"amount": 10}, key=None))
+        self.view(self.request({"amount": 10}, key=None))
+
+        self.assertEqual(self.calls, 2)
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+    def test_a_failing_view_stores_a_server_error(self):
+        @idempotent
+        def failing(request):
+            self.calls += 1
+            raise RuntimeError("upstream went away")
+
+        first = failing(self.request({"amount": 10}))
+        retry = failing(self.request({"amount": 10}))
+
+        self.assertEqual(first.status_code, 500)
+        self.assertEqual(retry.status_code, 500)
+        self.assertEqual(self.calls, 1)
+
+    def test_async_views_are_replayed_too(self):
+        @idempotent
+        async def view(request):
+            self.calls += 1
+            return successResponse(message="Debit", body={"call": self.calls})
+
+        first = async_to_sync(view)(self.request({"amount": 10}))
+        retry = async_to_sync(view)(self.request({"amount": 10}))
+
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(retry.content, first.content)
+        self.assertEqual(retry['Idempotent-Replayed'], "true")
@@ -0,0 +1,166 @@
+from django.test import TestCase
+from unittest.mock import patch
+from api_utils.views import badRequestResponse
+from wallet_manager import payments
+from wallet_manager.ledger import reserveFunds, settleFunds, releaseFunds, creditFunds, syncAvailableFunds, reconcileFunds
+from wallet_manager.models import UserWalletData, FundsHold
+from datetime import timedelta
+from decimal import Decimal
+
+
+def upstreamError(statusCode):
+    response = badRequestResponse({"Message": "upstream error"})
+    response.upstream_status_code = statusCode
+    return response
+
+
+class LedgerTests(TestCase):
+
+    def setUp(self):
+        self.wallet = UserWalletData.objects.create(wallet_key="k1", phone_number="080", available_amount=Decimal("100.00"))
+
+    def assertLedger(self, available, held):
+        self.wallet.refresh_from_db()
+        self.assertEqual(self.wallet.available_amount, Decimal(available))
+        self.assertEqual(self.wallet.held_amount, Decimal(held))
+
+    def test_reserve_moves_funds_to_held(self):
+        hold = reserveFunds(self.wallet, 30, "r1")
+
+        self.assertEqual(hold.status, FundsHold.HELD)
+        self.assertEqual(hold.amount, Decimal("30.00"))
+        self.assertLedger("70.00", "30.00")
+
+    def test_reserve_refuses_more_than_available(self):
+        self.assertIsNone(reserveFunds(self.wallet, "100.01", "r1"))
+        self.assertLedger("100.00", "0.00")
+        self.assertFalse(FundsHold.objects.exists())
+
+    def test_reserve_refuses_an_unsynced_wallet(self):
+        wallet = UserWalletData.objects.create(wallet_key="k2", phone_number="081")
+
+        self.assertIsNone(reserveFunds(wallet, 1, "r1"))
+
+    def test_reserve_refuses_amounts_that_arent_above_zero_and_finite(self):
+        for amount in [-50, 0, "0.001", "nan", "inf", "1e400", None]:
+            with self.assertRaises(ValueError):
+                reserveFunds(self.wallet, amount, "r1")
+
+        self.assertLedger("100.00", "0.00")
+        self.assertFalse(FundsHold.objects.exists())
+
+    def test_settle_spends_the_held_funds(self):
+        hold = reserveFunds(self.wallet, 30, "r1")
+
+        self.assertTrue(settleFunds(hold))
+        self.assertEqual(FundsHold.objects.get(pk=hold.pk).status, FundsHold.SETTLED)
+        self.assertLedger("70.00", "0.00")
+
+    def test_release_gives_the_held_funds_back(self):
+        hold = reserveFunds(self.wallet, 30, "r1")
+
+        self.assertTrue(releaseFunds(hold))
+        self.assertEqual(FundsHold.objects.get(pk=hold.pk).status, FundsHold.RELEASED)
+        self.assertLedger("100.00", "0.00")
+
+    def test_a_hold_is_closed_once(self):
+        hold = reserveFunds(self.wallet, 30, "r1")
+        settleFunds(hold)
+
+        self.assertFalse(releaseFunds(hold))
+        self.assertLedger("70.00", "0.00")
+
+    def test_credit_adds_to_available(self):
+        creditFunds(self.wallet, "12.50")
+
+        self.assertLedger("112.50", "0.00")
+
+    def test_sync_keeps_the_held_funds_aside(self):
+        reserveFunds(self.wallet, 30, "r1")
+
+        syncAvailableFunds(self.wallet, 200)
+
+        self.assertLedger("170.00", "30.00")
+
+    def test_reconcile_closes_expired_holds(self):
+        expired = reserveFunds(self.wallet, 30, "r1")
+        FundsHold.objects.filter(pk=expired.pk).update(created_at=expired.created_at - timedelta(hours=1))
+        reserveFunds(self.wallet, 20, "r2")
+
+        closed = reconcileFunds(self.wallet, 80, timedelta(minutes=10))
+
+        self.assertEqual(closed, 1)
+        self.assertEqual(FundsHold.objects.get(pk=expired.pk).status, FundsHold.RELEASED)
+        self.assertLedger("60.00", "20.00")
+
+
+class DebitWalletTests(TestCase):
+
+    def setUp(self):
+        self.wallet = UserWalletData.objects.create(wallet_key="k1", phone_number="080", available_amount=Decimal("100.00"))
+
+    def debit(self, result, amount=40):
+        with patch.object(payments.wallets_api, 'debit_wallet', return_value=result):
+            return payments.debitWallet(self.wallet, amount, reference="d1")
+
+    def test_accepted_debit_settles_the_hold(self):
+        data, errorResponse = self.debit(({"Message": "ok"}, True))
+
+        self.assertEqual(data, {"amount": 40, "reference": "d1"})
+        self.assertEqual(FundsHold.objects.get(reference="d1").status, FundsHold.SETTLED)
+        self.wallet.refresh_from_db()
+        self.assertEqual(self.wallet.available_amount, Decimal("60.00"))
+
+    def test_rejected_debit_releases_the_hold(self):
+        data, errorResponse = self.debit((upstreamError(400), False))
+
+        self.assertIsNone(data)
+        self.assertEqual(errorResponse.status_code, 400)
+        self.assertEqual(FundsHold.objects.get(reference="d1").status, FundsHold.RELEASED)
+        self.wallet.refresh_from_db()
+        self.assertEqual(self.wallet.available_amount, Decimal("100.00"))
+
+    def test_debit_with_an_unknown_outcome_keeps_the_hold(self):
+        for result in [(upstreamError(502), False), (None, "timed out")]:
+            FundsHold.objects.all().delete()
+            UserWalletData.objects.filter(pk=self.wallet.pk).update(available_amount=100, held_amount=0)
+
+            data, errorResponse = self.debit(result)
+
+            self.assertIsNone(data)
+            self.assertEqual(FundsHold.objects.get(reference="d1").status, FundsHold.HELD)
+            self.wallet.refresh_from_db()
+            self.assertEqual(self.wallet.held_amount, Decimal("40.00"))
+
+    def test_short_ledger_is_synced_from_the_upstream_balance(self):
+        balance = ({"WalletBalance": 500}, True)
+        with patch.object(payments.wallets_api, 'get_wallet_balance', return_value=balance) as getBalance:
+            data, errorResponse = self.debit(({"Message": "ok"}, True), amount=150)
+
+        getBalance.assert_called_once_with("080", fresh=True)
+        self.assertEqual(data["amount"], 150)
+        self.wallet.refresh_from_db()
+        self.assertEqual(self.wallet.available_amount, Decimal("350.00"))
+
+    def test_insufficient_funds(self):
+        balance = ({"WalletBalance": 100}, True)
+        with patch.object(payments.wallets_api, 'get_wallet_balance', return_value=balance):
+            with patch.object(payments.wallets_api, 'debit_wallet') as debitWallet:
+                data, errorResponse = payments.debitWallet(self.wallet, 150)
+
+        self.assertIsNone(data)
+        self.assertEqual(errorResponse.status_code, 400)
+        debitWallet.assert_not_called()
+
+    def test_invalid_amount_is_refused_before_anything_is_held(self):
+        with patch.object(payments.wallets_api, 'get_wallet_balance') as getBalance:
+            for amount in [-50, 0, float("nan"), float("inf")]:
+                data, errorResponse = self.debit(({"Message": "ok"}, True), amount=amount)
+
+                self.assertIsNone(data)
+                self.assertEqual(errorResponse.status_code, 400)
+
+        getBalance.assert_not_called()
+        self.assertFalse(FundsHold.objects.exists())
+        self.wallet.refresh_from_db()
+        self.assertEqual(self.wallet.available_amount, Decimal("100.00"))
@@ -0,0 +1,98 @@
+from django.test import SimpleTestCase, TestCase, RequestFactory, override_settings
+from wallet_manager.models import UserWalletData
+from wallet_manager.transactions import storeWalletTransactions, localTransactions
+from wallet_manager.views import paginateTransactions, paginateUpstreamTransactions, transactionsQuery
+
+
+def transactionRows(count):
+    return [
+        {"Type": "Credit" if index % 2 else "Debit", "Amount": index + 1, "Reference": f"r{index}", "DateTransacted": f"2021-06-{index + 1:02d}T10:00:00"}
+        for index in range(count)
+    ]
+
+
+class MirrorPaginationTests(TestCase):
+
+    def setUp(self):
+        self.wallet = UserWalletData.objects.create(wallet_key="k1", phone_number="080", created_at="2021-01-01")
+        storeWalletTransactions(self.wallet, transactionRows(5), "2021-06-05")
+
+    def test_pages_are_newest_first(self):
+        page, pagination = paginateTransactions(localTransactions(self.wallet), 1, 2)
+
+        self.assertEqual([row["Reference"] for row in page], ["r4", "r3"])
+        self.assertEqual(pagination, {"totalPages": 3, "limit": 2, "count": 5, "currentPage": 1, "hasNextPage": True})
+
+    def test_last_page(self):
+        page, pagination = paginateTransactions(localTransactions(self.wallet), 3, 2)
+
+        self.assertEqual([row["Reference"] for row in page], ["r0"])
+        self.assertFalse(pagination["hasNextPage"])
+
+    def test_page_past_the_end_is_empty(self):
+        page, pagination = paginateTransactions(localTransactions(self.wallet), 4, 2)
+
+        self.assertEqual(page, [])
+        self.assertFalse(pagination["hasNextPage"])
+
+    def test_transaction_type_filter(self):
+        page, pagination = paginateTransactions(localTransactions(self.wallet, transactionType=1), 1, 10)
+
+        self.assertEqual([row["Reference"] for row in page], ["r3", "r1"])
+        self.assertEqual(pagination["count"], 2)
+
+
+class UpstreamPaginationTests(SimpleTestCase):
+
+    def test_extra_row_means_there_is_a_next_page(self):
+        page, pagination = paginateUpstreamTransactions({"transactions": transactionRows(3)}, 1, 2)
+
+        self.assertEqual(len(page), 2)
+        self.assertTrue(pagination["hasNextPage"])
+        self.assertIsNone(pagination["count"])
+        self.assertIsNone(pagination["totalPages"])
+
+    def test_count_is_known_on_the_last_page(self):
+        page, pagination = paginateUpstreamTransactions({"transactions": transactionRows(1)}, 3, 2)
+
+        self.assertEqual(pagination, {"totalPages": 3, "limit": 2, "count": 5, "currentPage": 3, "hasNextPage": False})
+
+    def test_upstream_total_is_used_when_sent(self):
+        page, pagination = paginateUpstreamTransactions({"transactions": transactionRows(3), "total": 9}, 1, 2)
+
+        self.assertEqual(pagination["count"], 9)
+        self.assertEqual(pagination["totalPages"], 5)
+
+
+class TransactionsQueryTests(TestCase):
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.wallet = UserWalletData.objects.create(wallet_key="k1", phone_number="080", created_at="2021-01-01")
+
+    def query(self, **params):
+        return transactionsQuery(self.factory.get('/transactions', params), self.wallet)
+
+    def test_defaults(self):
+        query, errorResponse = self.query()
+
+        self.assertEqual(query, ("2021-01-01", 0, 1, 10))
+
+    @override_settings(TRANSACTIONS_MAX_PAGE_SIZE=100)
+    def test_page_size_is_capped(self):
+        query, errorResponse = self.query(pageBy=1000000, page=2)
+
+        self.assertEqual(query[2:], (2, 100))
+
+    def test_invalid_page_params(self):
+        for params in [{"pageBy": 0}, {"page": -1}, {"pageBy": "ten"}]:
+            query, errorResponse = self.query(**params)
+
+            self.assertIsNone(query)
+            self.assertEqual(errorResponse.status_code, 400, params)
+
+    def test_invalid_transaction_type(self):
+        query, errorResponse = self.query(transaction_type=5)
+
+        self.assertIsNone(query)
+        self.assertEqual(errorResponse.status_code, 400)
@@ -0,0 +1,93 @@
+from django.test import TestCase, override_settings
+from unittest.mock import Mock
+from wallet_manager.models import UserWalletData, WalletTransaction, WalletAggregate
+from wallet_manager.transactions import (
+    fetchWalletTransactions, storeWalletTransactions, syncWalletTransactions, transactionSyncWindow
+)
+from datetime import date
+from decimal import Decimal
+
+CREDIT = {"Type": "Credit", "Amount": 100, "Reference": "r1", "DateTransacted": "2021-06-01T10:00:00"}
+DEBIT = {"Type": "Debit", "Amount": 30, "Reference": "r2", "DateTransacted": "2021-06-02T10:00:00"}
+NO_REFERENCE = {"Type": "Credit", "Amount": 5, "DateTransacted": "2021-06-03T10:00:00"}
+
+
+def upstreamPages(*pages):
+    api = Mock()
+    api.get_wallet_transactions.side_effect = [({"data": {"transactions": page}}, True) for page in pages]
+    return api
+
+
+class TransactionSyncTests(TestCase):
+
+    def setUp(self):
+        self.wallet = UserWalletData.objects.create(wallet_key="k1", phone_number="080", created_at="2021-01-01")
+
+    def assertAggregate(self, received, spent, count):
+        aggregate = WalletAggregate.objects.get(wallet=self.wallet)
+        self.assertEqual(aggregate.total_received, Decimal(received))
+        self.assertEqual(aggregate.total_spent, Decimal(spent))
+        self.assertEqual(aggregate.transaction_count, count)
+
+    def test_rows_synced_twice_are_stored_once(self):
+        storeWalletTransactions(self.wallet, [CREDIT, DEBIT], "2021-06-02")
+        newTransactions = storeWalletTransactions(self.wallet, [DEBIT, CREDIT], "2021-06-03")
+
+        self.assertEqual(newTransactions, [])
+        self.assertEqual(WalletTransaction.objects.filter(wallet=self.wallet).count(), 2)
+        self.assertAggregate("100.00", "30.00", 2)
+
+    def test_repeated_row_in_one_batch_is_stored_once(self):
+        storeWalletTransactions(self.wallet, [CREDIT, CREDIT], "2021-06-02")
+
+        self.assertEqual(WalletTransaction.objects.filter(wallet=self.wallet).count(), 1)
+        self.assertAggregate("100.00", "0.00", 1)
+
+    def test_rows_without_a_reference_are_deduplicated_by_content(self):
+        storeWalletTransactions(self.wallet, [NO_REFERENCE], "2021-06-03")
+        storeWalletTransactions(self.wallet, [dict(NO_REFERENCE)], "2021-06-04")
+
+        self.assertEqual(WalletTransaction.objects.filter(wallet=self.wallet).count(), 1)
+        self.assertAggregate("5.00", "0.00", 1)
+
+    def test_same_reference_on_two_wallets_is_kept_for_both(self):
+        other = UserWalletData.objects.create(wallet_key="k2", phone_number="081", created_at="2021-01-01")
+
+        storeWalletTransactions(self.wallet, [CREDIT], "2021-06-02")
+        storeWalletTransactions(other, [CREDIT], "2021-06-02")
+
+        self.assertEqual(WalletTransaction.objects.filter(reference="r1").count(), 2)
+
+    def test_sync_window_restarts_on_the_high_water_mark_day(self):
+        self.assertEqual(transactionSyncWindow(self.wallet), ("2021-01-01", str(date.today())))
+
+        storeWalletTransactions(self.wallet, [CREDIT], date(2021, 6, 1))
+
+        self.assertEqual(transactionSyncWindow(self.wallet), ("2021-06-01", str(date.today())))
+
+    def test_sync_skips_the_rows_of_the_overlapping_day(self):
+        syncWalletTransactions(upstreamPages([CREDIT]), self.wallet, "1234")
+        newTransactions = syncWalletTransactions(upstreamPages([CREDIT, DEBIT]), self.wallet, "1234")
+
+        self.assertEqual([row.reference for row in newTransactions], ["r2"])
+        self.assertEqual(self.wallet.transactions_synced_to, str(date.today()))
+        self.assertAggregate("100.00", "30.00", 2)
+
+    def test_failed_sync_leaves_the_mirror_alone(self):
+        api = Mock()
+        api.get_wallet_transactions.return_value = (None, "timed out")
+
+        with self.assertLogs('wallet_manager.transactions', level='ERROR'):
+            self.assertIsNone(syncWalletTransactions(api, self.wallet, "1234"))
+        self.wallet.refresh_from_db()
+        self.assertIsNone(self.wallet.transactions_synced_to)
+
+    @override_settings(TRANSACTIONS_SYNC_BATCH=2)
+    def test_fetch_pages_through_the_upstream(self):
+        api = upstreamPages([CREDIT, DEBIT], [NO_REFERENCE])
+
+        rows, msg = fetchWalletTransactions(api, "1234", "080", "2021-01-01", "2021-06-30")
+
+        self.assertTrue(msg)
+        self.assertEqual(rows, [CREDIT, DEBIT, NO_REFERENCE])
+        self.assertEqual([call.kwargs['skip'] for call in api.get_wallet_transactions.call_args_list], [0, 2])
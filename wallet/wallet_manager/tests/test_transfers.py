@@ -0,0 +1,129 @@
+from django.db import DatabaseError
+from django.test import TestCase
+from unittest.mock import patch, AsyncMock
+from asgiref.sync import async_to_sync
+from api_utils.views import badRequestResponse, internalServerErrorResponse
+from wallet_manager import payments
+from wallet_manager.models import UserWalletData
+
+
+def sequentialMap(fn, items, limit):
+    # bounded_map without the thread pool, so the credits run inside the test transaction
+    return ((item, fn(item)) for item in items)
+
+
+def upstreamError(statusCode):
+    response = badRequestResponse({"Message": "upstream error"})
+    response.upstream_status_code = statusCode
+    return response
+
+
+def rejected(statusCode):
+    return None, upstreamError(statusCode)
+
+
+# what creditWallet answers when the upstream call timed out
+TIMED_OUT = (None, internalServerErrorResponse({"message": "timed out"}))
+
+
+def debitResult(wallet, amount, reference=None, timings=None):
+    return {"amount": amount, "reference": reference}, None
+
+
+@patch.object(payments, 'bounded_map', sequentialMap)
+@patch.object(payments, 'debitWallet', side_effect=debitResult)
+class TransferBetweenWalletsTests(TestCase):
+
+    def setUp(self):
+        self.source = UserWalletData.objects.create(wallet_key="k0", phone_number="080")
+        self.destinations = [UserWalletData.objects.create(wallet_key=f"k{index}", phone_number=f"08{index}") for index in (1, 2, 3)]
+
+    def transfer(self, creditResults):
+        """
+        Transfer 10, 20 and 30 to the destinations, creditWallet answering with
+        `creditResults` by wallet_key, or raising it; other credits are accepted.
+        """
+        def creditResult(wallet, amount, reference=None):
+            result = creditResults.get(wallet.wallet_key, ({"reference": reference}, None))
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        with patch.object(payments, 'creditWallet', side_effect=creditResult) as creditWallet:
+            data, errorResponse = payments.transferBetweenWallets(
+                self.source, list(zip(self.destinations, [10, 20, 30])), reference="t1"
+            )
+        return data, creditWallet
+
+    def statuses(self, data):
+        return [outcome["status"] for outcome in data["transfers"]]
+
+    def refundCalls(self, creditWallet):
+        return [call for call in creditWallet.call_args_list if call.args[0].pk == self.source.pk]
+
+    def test_every_credit_accepted(self, debitWallet):
+        data, creditWallet = self.transfer({})
+
+        self.assertEqual(self.statuses(data), ["credited", "credited", "credited"])
+        self.assertEqual(data["amount"], 60.0)
+        self.assertEqual(data["refunded"], 0)
+        self.assertEqual(self.refundCalls(creditWallet), [])
+        debitWallet.assert_called_once()
+
+    def test_rejected_credits_are_refunded_in_one_credit(self, debitWallet):
+        data, creditWallet = self.transfer({"k1": rejected(400), "k3": rejected(404)})
+
+        self.assertEqual(self.statuses(data), ["refunded", "credited", "refunded"])
+        self.assertEqual(data["refunded"], 40.0)
+        self.assertEqual(data["refundReference"], "t1-r")
+        refund, = self.refundCalls(creditWallet)
+        self.assertEqual(refund.args[1], 40.0)
+
+    def test_credit_that_timed_out_is_not_refunded(self, debitWallet):
+        with self.assertLogs('wallet_manager.payments', level='ERROR'):
+            data, creditWallet = self.transfer({"k1": TIMED_OUT, "k2": rejected(504), "k3": rejected(400)})
+
+        self.assertEqual(self.statuses(data), ["unknown", "unknown", "refunded"])
+        self.assertEqual(data["refunded"], 30.0)
+
+    def test_credit_that_raises_has_an_unknown_outcome(self, debitWallet):
+        with self.assertLogs('wallet_manager.payments', level='ERROR'):
+            data, creditWallet = self.transfer({"k2": DatabaseError("connection lost")})
+
+        self.assertEqual(self.statuses(data), ["credited", "unknown", "credited"])
+        self.assertEqual(data["transfers"][1]["reference"], "t1-c1")
+        self.assertEqual(data["transfers"][1]["error"]["statusCode"], 500)
+        self.assertEqual(data["refunded"], 0)
+        self.assertEqual(self.refundCalls(creditWallet), [])
+
+    def test_refund_that_raises_leaves_the_rejected_credits_unknown(self, debitWallet):
+        with self.assertLogs('wallet_manager.payments', level='ERROR'):
+            data, creditWallet = self.transfer({"k1": rejected(400), "k0": DatabaseError("connection lost")})
+
+        self.assertEqual(self.statuses(data), ["unknown", "credited", "credited"])
+        self.assertIn("refundError", data["transfers"][0])
+        self.assertEqual(data["refunded"], 0)
+        self.assertIsNone(data["refundReference"])
+
+
+class TransferBetweenWalletsAsyncTests(TestCase):
+
+    def setUp(self):
+        self.source = UserWalletData.objects.create(wallet_key="k0", phone_number="080")
+        self.destinations = [UserWalletData.objects.create(wallet_key=f"k{index}", phone_number=f"08{index}") for index in (1, 2)]
+
+    def test_credit_that_raises_has_an_unknown_outcome(self):
+        async def creditResult(wallet, amount, reference=None):
+            if wallet.wallet_key == "k1":
+                raise DatabaseError("connection lost")
+            return {"reference": reference}, None
+
+        with patch.object(payments, 'debitWalletAsync', AsyncMock(side_effect=debitResult)), \
+                patch.object(payments, 'creditWalletAsync', side_effect=creditResult):
+            with self.assertLogs('wallet_manager.payments', level='ERROR'):
+                data, errorResponse = async_to_sync(payments.transferBetweenWalletsAsync)(
+                    self.source, list(zip(self.destinations, [10, 20])), reference="t1"
+                )
+
+        self.assertEqual([outcome["status"] for outcome in data["transfers"]], ["unknown", "credited"])
+        self.assertEqual(data["refunded"], 0)
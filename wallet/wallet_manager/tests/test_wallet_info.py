@@ -0,0 +1,60 @@
+from django.test import TestCase, RequestFactory
+from unittest.mock import patch, AsyncMock
+from asgiref.sync import async_to_sync
+from api_utils import codec
+from api_utils.views import badRequestResponse
+from wallet_manager import views, async_views
+from wallet_manager.models import UserWalletData
+import json
+import uuid
+
+WALLET_BY_EMAIL = {"data": {"firstName": "Ada", "accountNumber": "0123456789", "availableBalance": 100}}
+WRONG_PIN = (badRequestResponse({"Message": "Invalid transaction pin"}), False)
+ONE_ROW = ({"data": {"transactions": []}}, True)
+
+
+class WalletInfoTests(TestCase):
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        # a fresh key per test, the wallet key cache outlives the test transaction
+        self.wallet = UserWalletData.objects.create(
+            wallet_key=uuid.uuid4().hex[:12], email_address="a@b.c", phone_number="080", created_at="2021-01-01"
+        )
+
+    def post(self, view, pin):
+        body = {"secret_key": self.wallet.wallet_key, "email_address": "a@b.c", "pin": pin}
+        response = view(self.factory.post('/view', json.dumps(body), content_type='application/json'))
+        return response.status_code, codec.loads(response.content)
+
+    def test_wrong_pin_of_a_wallet_never_synced_is_refused(self):
+        with patch.object(views.wallets_api, 'get_wallet_by_email', return_value=(WALLET_BY_EMAIL, True)), \
+                patch.object(views.wallets_api, 'get_wallet_transactions', return_value=WRONG_PIN), \
+                patch.object(views, 'backfillWalletTransactions') as backfill:
+            status, body = self.post(views.getWalletInfo, "0000")
+
+        self.assertEqual(status, 400)
+        self.assertNotIn('walletInfo', body.get('data') or {})
+        backfill.assert_not_called()
+
+    def test_right_pin_of_a_wallet_never_synced_starts_the_backfill(self):
+        with patch.object(views.wallets_api, 'get_wallet_by_email', return_value=(WALLET_BY_EMAIL, True)), \
+                patch.object(views.wallets_api, 'get_wallet_transactions', return_value=ONE_ROW) as transactions, \
+                patch.object(views, 'backfillWalletTransactions') as backfill:
+            status, body = self.post(views.getWalletInfo, "1234")
+
+        self.assertEqual(status, 200)
+        self.assertEqual(body['data']['walletInfo']['walletAccountNumber'], "0123456789")
+        self.assertIsNone(body['data']['totalMoneyReceived'])
+        self.assertEqual(transactions.call_args.kwargs['take'], 1)
+        backfill.assert_called_once()
+
+    def test_wrong_pin_of_a_wallet_never_synced_is_refused_by_the_async_view(self):
+        api = async_views.async_wallets_api
+        with patch.object(api, 'get_wallet_by_email', AsyncMock(return_value=(WALLET_BY_EMAIL, True))), \
+                patch.object(api, 'get_wallet_transactions', AsyncMock(return_value=WRONG_PIN)), \
+                patch.object(views, 'backfillWalletTransactions') as backfill:
+            status, body = self.post(async_to_sync(async_views.getWalletInfo), "0000")
+
+        self.assertEqual(status, 400)
+        backfill.assert_not_called()
@@ -0,0 +1,235 @@
+from .models import UserWalletData, WalletTransaction, WalletAggregate
+from .utils import walletSignupDate
+from api_utils.concurrency import run_with_connections
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from dateutil.parser import parse
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from decimal import Decimal
+import hashlib
+import json
+import logging
+import threading
+# Get an instance of a logger
+logger = logging.getLogger(__name__)
+
+# transaction type code --- Credit = 1, Debit = 2, All = 0 or 3
+TRANSACTION_TYPES = {
+    1: "Credit",
+    2: "Debit",
+}
+
+# first syncs pull a wallet's whole history, they run here rather than in a request
+_backfill_executor = ThreadPoolExecutor(max_workers=settings.TRANSACTIONS_BACKFILL_WORKERS, thread_name_prefix="backfill")
+# wallets this process is backfilling
+_backfills = set()
+_backfills_lock = threading.Lock()
+
+
+def transactionSyncWindow(wallet):
+    """
+    Return the (date_from, date_to) range still to be mirrored for a wallet.
+
+    The upstream filters by day, so the window starts on the high-water mark day
+    itself; rows already stored for that day are skipped on insert.
+    """
+    if wallet.transactions_synced_to:
+        date_from = wallet.transactions_synced_to
+    else:
+        date_from = walletSignupDate(wallet)
+
+    return str(date_from), str(date.today())
+
+
+def fetchWalletTransactions(api, pin, phoneNumber, dateFrom, dateTo):
+    """
+    Fetch every transaction in the date range, TRANSACTIONS_SYNC_BATCH rows per upstream call.
+    Returns (rows, True) or the failed (data, msg) result of the upstream call.
+    """
+    batch = settings.TRANSACTIONS_SYNC_BATCH
+    rows = []
+    skip = 0
+
+    while True:
+        transactions, msg = api.get_wallet_transactions(pin, phoneNumber, dateFrom, dateTo, take=batch, skip=skip)
+        if transactions == None or not msg:
+            return transactions, msg
+
+        page = transactions['data']['transactions']
+        rows.extend(page)
+        if len(page) < batch:
+            return rows, True
+
+        skip += batch
+
+
+async def afetchWalletTransactions(api, pin, phoneNumber, dateFrom, dateTo):
+    """
+    fetchWalletTransactions for AsyncWalletsAfricaAPI.
+    """
+    batch = settings.TRANSACTIONS_SYNC_BATCH
+    rows = []
+    skip = 0
+
+    while True:
+        transactions, msg = await api.get_wallet_transactions(pin, phoneNumber, dateFrom, dateTo, take=batch, skip=skip)
+        if transactions == None or not msg:
+            return transactions, msg
+
+        page = transactions['data']['transactions']
+        rows.extend(page)
+        if len(page) < batch:
+            return rows, True
+
+        skip += batch
+
+
+def transactionReference(row):
+    # rows only ever come from the upstream, so a row has the same reference
+    # (or digest) on every sync and is never stored twice
+    reference = row.get('TransactionReference') or row.get('Reference') or row.get('reference')
+    if reference:
+        return str(reference)
+
+    # no reference on the row, fall back to a digest of its content so re-syncs stay idempotent
+    return hashlib.sha1(json.dumps(row, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def transactionDate(row):
+    value = row.get('DateTransacted') or row.get('TransactionDate') or row.get('Date')
+    if not value:
+        return timezone.now()
+
+    transacted = parse(value)
+    if timezone.is_naive(transacted):
+        transacted = timezone.make_aware(transacted, timezone.utc)
+    return transacted
+
+
+def lockWalletAggregate(wallet):
+    """
+    Fetch the wallet's aggregate row locked for update, creating it if needed.
+    Must be called inside transaction.atomic().
+    """
+    WalletAggregate.objects.get_or_create(wallet=wallet)
+    return WalletAggregate.objects.select_for_update().get(wallet=wallet)
+
+
+def applyToAggregate(aggregate, newTransactions):
+    for walletTransaction in newTransactions:
+        if walletTransaction.transaction_type == "Credit":
+            aggregate.total_received += walletTransaction.amount
+        elif walletTransaction.transaction_type == "Debit":
+            aggregate.total_spent += walletTransaction.amount
+
+        if not aggregate.last_transaction_at or walletTransaction.transaction_date > aggregate.last_transaction_at:
+            aggregate.last_transaction_at = walletTransaction.transaction_date
+
+    aggregate.transaction_count += len(newTransactions)
+    aggregate.save()
+
+
+def recordWalletTransactions(wallet, rows):
+    """
+    Insert upstream rows not yet mirrored for the wallet and add them to its aggregate.
+    Returns the rows that were new.
+
+    The aggregate row lock serialises writers per wallet, so a transaction is
+    never counted twice even when two syncs of the wallet overlap.
+    """
+    incoming = {}
+    for row in rows:
+        incoming[transactionReference(row)] = row
+
+    with transaction.atomic():
+        aggregate = lockWalletAggregate(wallet)
+
+        existing = set(
+            WalletTransaction.objects.filter(wallet=wallet, reference__in=list(incoming)).values_list('reference', flat=True)
+        )
+        newTransactions = [
+            WalletTransaction(
+                wallet=wallet,
+                reference=reference,
+                transaction_type=row.get('Type'),
+                amount=Decimal(str(row.get('Amount') or 0)),
+                transaction_date=transactionDate(row),
+                data=row
+            )
+            for reference, row in incoming.items() if reference not in existing
+        ]
+
+        WalletTransaction.objects.bulk_create(newTransactions, batch_size=settings.TRANSACTIONS_SYNC_BATCH)
+        if newTransactions:
+            applyToAggregate(aggregate, newTransactions)
+
+    return newTransactions
+
+
+def storeWalletTransactions(wallet, rows, syncedTo):
+    """
+    Mirror a synced batch of upstream rows and move the wallet's high-water mark.
+    """
+    newTransactions = recordWalletTransactions(wallet, rows)
+    UserWalletData.objects.filter(pk=wallet.pk).update(transactions_synced_to=syncedTo)
+    wallet.transactions_synced_to = syncedTo
+
+    return newTransactions
+
+
+def syncWalletTransactions(api, wallet, pin):
+    """
+    Mirror everything in the wallet's sync window. Returns the new rows, or None
+    when the upstream call failed.
+    """
+    sync_from, sync_to = transactionSyncWindow(wallet)
+    rows, msg = fetchWalletTransactions(api, pin, wallet.phone_number, sync_from, sync_to)
+    if rows == None or not msg:
+        logger.error(f"syncWalletTransactions@Error: the transactions of wallet {wallet.pk} could not be fetched")
+        logger.error(msg)
+        return None
+
+    return storeWalletTransactions(wallet, rows, sync_to)
+
+
+def backfillWalletTransactions(api, wallet, pin):
+    """
+    Mirror the history of a wallet that was never synced in the background, the
+    views serve upstream pages until it is done. Returns False when the wallet
+    is already synced or this process is backfilling it.
+    """
+    if wallet.transactions_synced_to != None:
+        return False
+
+    with _backfills_lock:
+        if wallet.pk in _backfills:
+            return False
+        _backfills.add(wallet.pk)
+
+    def backfill():
+        try:
+            syncWalletTransactions(api, wallet, pin)
+        except Exception as e:
+            logger.error("backfillWalletTransactions@Error")
+            logger.error(e)
+        finally:
+            with _backfills_lock:
+                _backfills.discard(wallet.pk)
+
+    _backfill_executor.submit(run_with_connections, backfill)
+    return True
+
+
+def localTransactions(wallet, dateFrom=None, transactionType=0):
+    """
+    Mirrored transactions for a wallet, newest first.
+    """
+    queryset = WalletTransaction.objects.filter(wallet=wallet)
+    if dateFrom:
+        queryset = queryset.filter(transaction_date__date__gte=dateFrom)
+    if transactionType in TRANSACTION_TYPES:
+        queryset = queryset.filter(transaction_type=TRANSACTION_TYPES[transactionType])
+
+    return queryset.order_by('-transaction_date', '-id')
@@ -1,18 +1,31 @@
+from django.conf import settings
 from django.urls import path
-from .views import (
-    createSubWalletForUser, retrieveSubWalletTransactions, getWalletInfo, setWalletPin,
-    subWalletTransferToBankAcct, getAllBanks, bankAccountEnquiry, debitSubWallet,
-    creditSubWallet
-    )
+
+if settings.WALLETS_ASYNC_VIEWS:
+    from . import async_views as views
+else:
+    from . import views
 
 urlpatterns = [
-    path('create', createSubWalletForUser),
-    path('set-pin', setWalletPin),
-    path('account/info', getWalletInfo),
-    path('transactions', retrieveSubWalletTransactions),
-    path('transfer/bank', subWalletTransferToBankAcct),
-    path('transfer/bank/all', getAllBanks),
-    path('transfer/account/validate', bankAccountEnquiry),
-    path('debit', debitSubWallet),
-    path('credit', creditSubWallet),
+    path('create', views.createSubWalletForUser),
+    path('create/bulk', views.bulkCreateSubWallets),
+    path('set-pin', views.setWalletPin),
+    path('account/info', views.getWalletInfo),
+    path('balance', views.getSubWalletBalance),
+    path('balance/batch', views.getSubWalletBalances),
+    path('transactions', views.retrieveSubWalletTransactions),
+    path('transfer/bank', views.subWalletTransferToBankAcct),
+    path('transfer/bank/all', views.getAllBanks),
+    path('transfer/job', views.getTransferJob),
+    path('transfer/jobs', views.getTransferJobs),
+    path('transfer/bank/search', views.searchBanks),
+    path('transfer/account/validate', views.bankAccountEnquiry),
+    path('debit', views.debitSubWallet),
+    path('credit', views.creditSubWallet),
+    path('credit/bulk', views.bulkCreditSubWallets),
+    path('transfer/bank/batch', views.uploadPayoutBatch),
+    path('transfer/wallet', views.subWalletTransferToSubWallet),
+    path('batch/job', views.getBatchJob),
+    path('batch/job/results', views.downloadBatchResults),
+    path('metrics', views.getMetrics),
 ]
\ No newline at end of file
@@ -1,4 +1,6 @@
 from .models import UserWalletData
+from django.utils import timezone
+from dateutil.parser import parse
 import logging
 # Get an instance of a logger
 logger = logging.getLogger(__name__)
@@ -6,23 +8,55 @@ import uuid
 
 
 
+def parseDateTime(value):
+    """
+    Timezone aware datetime for an upstream date string, or None.
+    """
+    try:
+        parsed = parse(value)
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed, timezone.utc)
+    return parsed
+
+
+def walletSignupDate(wallet):
+    """
+    Day the wallet was created, from the typed column once it is backfilled.
+    """
+    if wallet.signed_up_at:
+        return wallet.signed_up_at.date()
+    return parse(wallet.created_at).date()
+
+
+def buildUserWalletData(data):
+    """
+    Unsaved UserWalletData for a wallet/generate response.
+    """
+    return UserWalletData(
+        first_name=data.get('FirstName'),
+        last_name=data.get('LastName'),
+        email_address=data.get('Email'),
+        phone_number=data.get('PhoneNumber'),
+        bvn=data.get('BVN'),
+        birthday=data.get('DateOfBirth'),
+        created_at=data.get('DateSignedup'),
+        password=data.get('Password'),
+        account_no=data.get('AccountNo'),
+        bank_name=data.get('Bank'),
+        account_name=data.get('AccountName'),
+        available_balance=data.get('AvailableBalance'),
+        signed_up_at=parseDateTime(data.get('DateSignedup')),
+        wallet_key=str(uuid.uuid4())[:14].replace("-", '')
+    )
+
+
 def createUserWalletData(data):
     try:
-        object = UserWalletData.objects.create(
-            first_name=data.get('FirstName'),
-            last_name=data.get('LastName'),
-            email_address=data.get('Email'),
-            phone_number=data.get('PhoneNumber'),
-            bvn=data.get('BVN'),
-            birthday=data.get('DateOfBirth'),
-            created_at=data.get('DateSignedup'),
-            password=data.get('Password'),
-            account_no=data.get('AccountNo'),
-            bank_name=data.get('Bank'),
-            account_name=data.get('AccountName'),
-            available_balance=data.get('AvailableBalance'),
-            wallet_key=str(uuid.uuid4())[:14].replace("-", '')
-        )
+        object = buildUserWalletData(data)
+        object.save()
         return object
 
     except Exception as err:
@@ -1,30 +1,93 @@
-import json
 from api_utils.views import (
     badRequestResponse, resourceConflictResponse, internalServerErrorResponse, unAuthenticatedResponse,
-    unAuthorizedResponse, successResponse, resourceNotFoundResponse, paginatedResponse
+    unAuthorizedResponse, successResponse, resourceNotFoundResponse, paginatedResponse, acceptedResponse
 )
 from errors.views import getError, ErrorCodes
 from django.conf import settings
-from api_utils.validators import validateKeys
+from django.core.exceptions import ValidationError
+from django.http import HttpResponse
+from api_utils import metrics
+from api_utils.concurrency import fan_out, bounded_map
 from .wallets_africa import WalletsAfricaAPI
-from .utils import createUserWalletData
-from .models import UserWalletData
+from .utils import createUserWalletData, walletSignupDate
+from .banks import bankDirectory, nubanIsValid
+from .transactions import (
+    transactionSyncWindow, fetchWalletTransactions, storeWalletTransactions, backfillWalletTransactions, localTransactions
+)
+from .locks import walletLock
+from .wallet_keys import loadWalletFields
+from .endpoints import endpoint, Field, number, money, WALLET_AND_EMAIL, WALLET_KEY, ROOT_CREDENTIALS
+from .idempotency import idempotent
+from .payments import debitWallet, creditWallet, transferToBank, transferBetweenWallets, responseError
+from .jobs import serializeTransferJob
+from .batches import (
+    PAYOUT_COLUMNS, BatchTooLarge, parseAmount, creditBatchItems, payoutBatchItems, provisionBatchItems, limitRows,
+    createBatchJob, serializeBatchJob, serializeBatchItem
+)
+from .models import UserWalletData, WalletAggregate, TransferJob, BatchJob, BatchItem
 from datetime import date, timedelta
-from django.core.paginator import Paginator
-from dateutil.parser import parse
+from functools import partial
+import csv
+import hashlib
+import io
+import math
 import uuid
 
 # instantiate
 wallets_api = WalletsAfricaAPI()
 
 
-def getWalletUsingKey(secretKey):
-    try:
-        wallet = UserWalletData.objects.get(wallet_key=secretKey)
-        return wallet
-    
-    except UserWalletData.DoesNotExist:
-        return None
+def upstreamFailed(result):
+    data, msg = result
+    return data == None or not msg
+
+
+def walletLookupSettled(result):
+    # a wallet lookup settles the request if it errored or found an existing wallet
+    data, msg = result
+    return data == None or bool(msg)
+
+
+def paginateTransactions(transactions, pageNum, pageBy):
+    """
+    Slice one page of upstream rows out of a WalletTransaction queryset.
+    """
+    count = transactions.count()
+    skip = (pageNum - 1) * pageBy
+    page = list(transactions[skip:skip + pageBy].values_list('data', flat=True))
+
+    paginationDetails = {
+        "totalPages": math.ceil(count / pageBy),
+        "limit": pageBy,
+        "count": count,
+        "currentPage": pageNum,
+        "hasNextPage": skip + len(page) < count
+    }
+    return page, paginationDetails
+
+
+def paginateUpstreamTransactions(transactionsData, pageNum, pageBy):
+    """
+    Build a page and its pagination details from a wallet/transactions response
+    fetched with skip=(pageNum - 1) * pageBy and take=pageBy + 1.
+    """
+    transactions = transactionsData['transactions']
+    hasNextPage = len(transactions) > pageBy
+    transactions = transactions[:pageBy]
+
+    # use the upstream total when it sends one, otherwise the count is only known on the last page
+    count = next((transactionsData[key] for key in ('total', 'totalCount', 'count') if key in transactionsData), None)
+    if count == None and not hasNextPage:
+        count = (pageNum - 1) * pageBy + len(transactions)
+
+    paginationDetails = {
+        "totalPages": math.ceil(count / pageBy) if count != None else None,
+        "limit": pageBy,
+        "count": count,
+        "currentPage": pageNum,
+        "hasNextPage": hasNextPage
+    }
+    return transactions, paginationDetails
 
 
 def serializeTransactions(transactions):
@@ -35,40 +98,28 @@ def serializeTransactions(transactions):
         return []
 
 
-def createSubWalletForUser(request):
-    if request.method != "POST":
-        return badRequestResponse(getError(ErrorCodes.GENERIC_ERROR, "HTTP method should be POST"))
-
-    body = json.loads(request.body)
-    # verify that the calling user has a valid secret
-    secret = request.headers.get('Secret')
-    if secret != settings.ROOT_SECRET:
-        return badRequestResponse(getError(ErrorCodes.INVALID_CREDENTIALS, "Invalid Secret specified in the request headers"))
-
-    # check if required fields are present in request payload
-    missingKeys = validateKeys(payload=body, requiredKeys=['first_name', 'last_name', 'email', 'birthday', 'phone_number'])
-    if missingKeys:
-        return badRequestResponse(getError(ErrorCodes.MISSING_FIELDS, f"The following key(s) are missing in the request payload: {missingKeys}"))
-    
-    first_name = body['first_name']
-    last_name = body['last_name']
-    email = body['email']
-    birthday = body['birthday']
-    phone_number = body['phone_number']
-
-    # check if sub wallet exists for phone number passed
-    existingWalletByPhone, msg = wallets_api.get_wallet_by_phone(phone_number)
-    if existingWalletByPhone == None:
-        return internalServerErrorResponse(getError(ErrorCodes.GENERIC_ERROR, msg))
-    elif msg:
-        return resourceConflictResponse(getError(ErrorCodes.GENERIC_ERROR, "Wallets Already Exist for the Phone number specified"))
-
-    # check if sub wallet exists for email passed
-    existingWalletByEmail, msg = wallets_api.get_wallet_by_email(email)
-    if existingWalletByEmail == None:
-        return internalServerErrorResponse(getError(ErrorCodes.GENERIC_ERROR, msg))
-    elif msg:
-        return resourceConflictResponse(getError(ErrorCodes.GENERIC_ERROR, "Wallets Already Exist for the Email Address specified"))
+@endpoint(root=ROOT_CREDENTIALS, fields=['first_name', 'last_name', 'email', 'birthday', 'phone_number'])
+def createSubWalletForUser(request, first_name, last_name, email, birthday, phone_number):
+    # check if sub wallet exists for phone number or email passed, both lookups run at once
+    lookups = fan_out(
+        partial(wallets_api.get_wallet_by_phone, phone_number),
+        partial(wallets_api.get_wallet_by_email, email),
+        stop_when=walletLookupSettled
+    )
+    conflictMessages = [
+        "Wallets Already Exist for the Phone number specified",
+        "Wallets Already Exist for the Email Address specified"
+    ]
+    for lookup, conflictMessage in zip(lookups, conflictMessages):
+        if lookup == None:
+            # cancelled, the other lookup already settled the request
+            continue
+
+        existingWallet, msg = lookup
+        if existingWallet == None:
+            return internalServerErrorResponse(getError(ErrorCodes.GENERIC_ERROR, msg))
+        elif msg:
+            return resourceConflictResponse(getError(ErrorCodes.GENERIC_ERROR, conflictMessage))
 
     # generate sub-wallet
     createdWalletData, outcome = wallets_api.generate_wallet(first_name, last_name, email, birthday, phone_number)
@@ -85,66 +136,47 @@ def createSubWalletForUser(request):
     return successResponse(message="Wallet created", body={"wallet_key": wallet_key})
 
 
-def setWalletPin(request):
-    if request.method != "POST":
-        return badRequestResponse(getError(ErrorCodes.GENERIC_ERROR, "HTTP method should be POST"))
+@idempotent
+@endpoint(root=ROOT_CREDENTIALS, fields=[
+    Field('wallets', arg='rows'), Field('concurrency', int, required=False, message="Concurrency should be a number"),
+])
+def bulkCreateSubWallets(request, rows, concurrency):
+    if not isinstance(rows, list) or not rows or len(rows) > settings.WALLET_PROVISION_MAX_ITEMS:
+        return badRequestResponse(getError(ErrorCodes.GENERIC_ERROR, f"wallets should be a list of 1 to {settings.WALLET_PROVISION_MAX_ITEMS} entries"))
 
-    body = json.loads(request.body)
-
-    # check if required fields are present in request payload
-    missingKeys = validateKeys(payload=body, requiredKeys=['secret_key', 'pin', 'email_address'])
-    if missingKeys:
-        return badRequestResponse(getError(ErrorCodes.MISSING_FIELDS, f"The following key(s) are missing in the request payload: {missingKeys}"))
-    
-    secretKey = body['secret_key']
-    pin = body['pin']
-    email_address = body['email_address']
-
-    # validate secret key
-    existingWallet = getWalletUsingKey(secretKey)
-    if not existingWallet:
-        return badRequestResponse(getError(ErrorCodes.UNAUTHORIZED_REQUEST, "No wallet exists for the specified secret key"))
-    elif existingWallet.email_address != email_address:
-        return unAuthorizedResponse(getError(ErrorCodes.UNAUTHORIZED_REQUEST, "The email specified isn't associated with the wallet for secret key"))
-    
-    phone_number = existingWallet.phone_number
-
-    # change wallet pin
-    pinChange, msg = wallets_api.set_wallet_pin(pin, phone_number)
-
-    if pinChange == None:
-        return internalServerErrorResponse(getError(ErrorCodes.GENERIC_ERROR, msg))
-    if not msg:
-        # the request failed
-        return pinChange
+    return queueWalletProvisioning(rows, concurrency)
 
-    return successResponse(message="Wallet pin changed successfully", body={})
 
+def queueWalletProvisioning(rows, concurrency):
+    # the wallets are created on run_batch_jobs workers, the client polls batch/job for the outcome
+    job = createBatchJob(BatchJob.PROVISION, provisionBatchItems(rows), concurrency or settings.BATCH_CONCURRENCY)
 
-def getSubWalletBalance(request):
-    if request.method != "POST":
-        return badRequestResponse(getError(ErrorCodes.GENERIC_ERROR, "HTTP method should be POST"))
+    return acceptedResponse(message="Bulk Wallet Creation queued", body=serializeBatchJob(job))
+
+
+@endpoint(fields=['pin'], wallet=WALLET_AND_EMAIL)
+def setWalletPin(request, wallet, pin):
+    phone_number = wallet.phone_number
+
+    # requests for the same wallet run one at a time from here
+    with walletLock(wallet):
+        # change wallet pin
+        pinChange, msg = wallets_api.set_wallet_pin(pin, phone_number)
+
+        if pinChange == None:
+            return internalServerErrorResponse(getError(ErrorCodes.GENERIC_ERROR, msg))
+        if not msg:
+            # the request failed
+            return pinChange
 
-    body = json.loads(request.body)
-
-    # check if required fields are present in request payload
-    missingKeys = validateKeys(payload=body, requiredKeys=['secret_key', 'email_address'])
-    if missingKeys:
-        return badRequestResponse(getError(ErrorCodes.MISSING_FIELDS, f"The following key(s) are missing in the request payload: {missingKeys}"))
-    
-    secretKey = body['secret_key']
-    email_address = body['email_address']
-
-    # validate secret key
-    existingWallet = getWalletUsingKey(secretKey)
-    if not existingWallet:
-        return badRequestResponse(getError(ErrorCodes.UNAUTHORIZED_REQUEST, "No wallet exists for the specified secret key"))
-    elif existingWallet.email_address != email_address:
-        return unAuthorizedResponse(getError(ErrorCodes.UNAUTHORIZED_REQUEST, "The email specified isn't associated with the wallet for secret key"))
-
-    phone_number = existingWallet.phone_number
-    # get wallet balance
-    balance, msg = wallets_api.get_wallet_balance(phone_number)
+    return successResponse(message="Wallet pin changed successfully", body={})
+
+
+@endpoint(wallet=WALLET_AND_EMAIL)
+def getSubWalletBalance(request, wallet):
+    phone_number = wallet.phone_number
+    # get wallet balance, served from the balance cache while it is fresh
+    balance, msg = wallets_api.cached_wallet_balance(phone_number) or wallets_api.get_wallet_balance(phone_number)
     if balance == None:
         return internalServerErrorResponse(getError(ErrorCodes.GENERIC_ERROR, msg))
     if not msg:
@@ -154,153 +186,145 @@ def getSubWalletBalance(request):
     return successResponse(message="Wallet balance", body=balance)
 
 
-def debitSubWallet(request):
-    if request.method != "POST":
-        return badRequestResponse(getError(ErrorCodes.GENERIC_ERROR, "HTTP method should be POST"))
+def balanceOutcome(walletKey, result, cached=False):
+    balance, msg = result
+    if balance == None:
+        return {"wallet_key": walletKey, "error": {"message": msg}}
+    if not msg:
+        # the request failed
+        return {"wallet_key": walletKey, "error": responseError(balance)}
 
-    body = json.loads(request.body)
+    return {"wallet_key": walletKey, "balance": balance, "cached": cached}
 
-    # check if required fields are present in request payload
-    missingKeys = validateKeys(payload=body, requiredKeys=['secret_key', 'email_address', 'amount'])
-    if missingKeys:
-        return badRequestResponse(getError(ErrorCodes.MISSING_FIELDS, f"The following key(s) are missing in the request payload: {missingKeys}"))
 
-    secretKey = body['secret_key']
-    amount = float(body['amount'])
-    email_address = body['email_address']
+@endpoint(root=True, fields=[
+    Field('wallet_keys', arg='walletKeys'),
+    Field('max_age', number, required=False, arg='maxAge', message="max_age should be a number of seconds"),
+])
+def getSubWalletBalances(request, walletKeys, maxAge):
+    balanceRequest, errorResponse = balanceRequests(walletKeys, maxAge)
+    if balanceRequest == None:
+        return errorResponse
+    walletKeys, outcomes, stale = balanceRequest
 
-    # validate secret key
-    existingWallet = getWalletUsingKey(secretKey)
-    if not existingWallet:
-        return badRequestResponse(getError(ErrorCodes.UNAUTHORIZED_REQUEST, "No wallet exists for the specified secret key"))
-    elif existingWallet.email_address != email_address:
-        return unAuthorizedResponse(getError(ErrorCodes.UNAUTHORIZED_REQUEST, "The email specified isn't associated with the wallet for secret key"))
+    def fetchBalance(wallet):
+        return wallets_api.get_wallet_balance(wallet.phone_number)
 
-    phone_number = existingWallet.phone_number
-    # get wallet balance
-    balance, msg = wallets_api.get_wallet_balance(phone_number)
+    for wallet, result in bounded_map(fetchBalance, stale, settings.BATCH_CONCURRENCY):
+        outcomes[wallet.wallet_key] = balanceOutcome(wallet.wallet_key, result)
 
-    if balance == None:
-        return internalServerErrorResponse(getError(ErrorCodes.GENERIC_ERROR, msg))
-    if not msg:
-        # the request failed
-        return balance
-    
-    if balance['WalletBalance'] >= amount:
-        # debit wallet
-        debit_reference = str(uuid.uuid4())[:12]
-        debit, msg = wallets_api.debit_wallet(amount, phone_number, debit_reference)
-        if debit == None:
-            return internalServerErrorResponse(getError(ErrorCodes.GENERIC_ERROR, msg))
-        if not msg:
-            # the request failed
-            return debit
-    else:
-        return badRequestResponse("Insufficient funds", body={})
+    return balancesResponse(walletKeys, outcomes)
 
-    data = {
-        "amount": amount,
-        "reference": debit_reference
-    }
 
-    return successResponse(message="Wallet Debit to Main Wallet Transfer", body=data)
+def balanceRequests(walletKeys, maxAge):
+    """
+    Resolve the wallets of a balance batch and serve what the balance cache can.
+    Returns ((walletKeys, outcomes, stale wallets), None) or (None, error response).
+    """
+    if not isinstance(walletKeys, list) or not walletKeys or len(walletKeys) > settings.BALANCE_BATCH_MAX_ITEMS:
+        return None, badRequestResponse(getError(ErrorCodes.GENERIC_ERROR, f"wallet_keys should be a list of 1 to {settings.BALANCE_BATCH_MAX_ITEMS} entries"))
 
+    # every wallet resolved in one query, repeated keys answered once
+    walletKeys = list(dict.fromkeys(str(walletKey) for walletKey in walletKeys))
+    wallets = {wallet.wallet_key: wallet for wallet in UserWalletData.objects.filter(wallet_key__in=walletKeys)}
 
-def creditSubWallet(request):
-    if request.method != "POST":
-        return badRequestResponse(getError(ErrorCodes.GENERIC_ERROR, "HTTP method should be POST"))
+    outcomes = {}
+    stale = []
+    for walletKey in walletKeys:
+        wallet = wallets.get(walletKey)
+        if wallet == None:
+            outcomes[walletKey] = {"wallet_key": walletKey, "error": {"message": "No wallet exists for the specified wallet_key"}}
+            continue
 
-    root_secret = request.headers.get('Secret')
-    if root_secret != settings.ROOT_SECRET:
-        return unAuthorizedResponse(getError(ErrorCodes.GENERIC_ERROR, "Permission Denied"))
+        # fresh cached balances are served as they are, the rest are fetched below
+        cached = wallets_api.cached_wallet_balance(wallet.phone_number, max_age=maxAge)
+        if cached != None:
+            outcomes[walletKey] = balanceOutcome(walletKey, cached, cached=True)
+        else:
+            stale.append(wallet)
 
-    body = json.loads(request.body)
+    return (walletKeys, outcomes, stale), None
 
-    # check if required fields are present in request payload
-    missingKeys = validateKeys(payload=body, requiredKeys=['secret_key', 'amount'])
-    if missingKeys:
-        return badRequestResponse(getError(ErrorCodes.MISSING_FIELDS, f"The following key(s) are missing in the request payload: {missingKeys}"))
 
-    secretKey = body['secret_key']
-    amount = float(body['amount'])
+def balancesResponse(walletKeys, outcomes):
+    balances = [outcomes[walletKey] for walletKey in walletKeys]
+    failed = sum(1 for outcome in balances if 'error' in outcome)
 
-    # validate secret key
-    existingWallet = getWalletUsingKey(secretKey)
-    if not existingWallet:
-        return badRequestResponse(getError(ErrorCodes.UNAUTHORIZED_REQUEST, "No wallet exists for the specified secret key"))
-    
-    phone_number = existingWallet.phone_number
+    return successResponse(message="Wallet balances", body={
+        "succeeded": len(balances) - failed, "failed": failed, "balances": balances
+    })
 
-    # credit wallet
-    credit_reference = str(uuid.uuid4())[:12]
-    credit, msg = wallets_api.credit_wallet(credit_reference, amount, phone_number)
-    if credit == None:
-        return internalServerErrorResponse(getError(ErrorCodes.GENERIC_ERROR, msg))
-    if not msg:
-        # the request failed
-        return credit
 
-    data = {
-        "amount": amount,
-        "reference": credit_reference
-    }
+@idempotent
+@endpoint(fields=[Field('amount', money)], wallet=WALLET_AND_EMAIL)
+def debitSubWallet(request, wallet, amount):
+    data, errorResponse = debitWallet(wallet, amount)
+    if data == None:
+        return errorResponse
+
+    return successResponse(message="Wallet Debit to Main Wallet Transfer", body=data)
+
+
+@idempotent
+@endpoint(root=True, fields=[Field('amount', money)], wallet=WALLET_KEY)
+def creditSubWallet(request, wallet, amount):
+    data, errorResponse = creditWallet(wallet, amount)
+    if data == None:
+        return errorResponse
 
     return successResponse(message="Main Wallet Credit to Sub Wallet", body=data)
 
 
-def getWalletInfo(request):
-    if request.method != "POST":
-        return badRequestResponse(getError(ErrorCodes.GENERIC_ERROR, "HTTP method should be POST"))
+@endpoint(fields=['pin'], wallet=WALLET_AND_EMAIL)
+def getWalletInfo(request, wallet, pin):
+    phone_number = wallet.phone_number
+    loadWalletFields(wallet, 'created_at', 'signed_up_at', 'transactions_synced_to')
+    synced = wallet.transactions_synced_to != None
 
-    body = json.loads(request.body)
-
-    # check if required fields are present in request payload
-    missingKeys = validateKeys(payload=body, requiredKeys=['secret_key', 'email_address', 'pin'])
-    if missingKeys:
-        return badRequestResponse(getError(ErrorCodes.MISSING_FIELDS, f"The following key(s) are missing in the request payload: {missingKeys}"))
-    
-    secretKey = body['secret_key']
-    email_address = body['email_address']
-    pin = body['pin']
-
-    # validate secret key
-    existingWallet = getWalletUsingKey(secretKey)
-    if not existingWallet:
-        return badRequestResponse(getError(ErrorCodes.UNAUTHORIZED_REQUEST, "No wallet exists for the specified secret key"))
-    elif existingWallet.email_address != email_address:
-        return unAuthorizedResponse(getError(ErrorCodes.UNAUTHORIZED_REQUEST, "The email specified isn't associated with the wallet for secret key"))
-    
-    phone_number = existingWallet.phone_number
-
-    # get wallet transactions
-    date_to = str(date.today())  
-    date_from = str(parse(existingWallet.created_at).date())
-    transaction_type=0
-    
-    transactions, msg = wallets_api.get_wallet_transactions(pin, phone_number, date_from, date_to, transaction_type)
-    if transactions == None:
-        return internalServerErrorResponse(getError(ErrorCodes.GENERIC_ERROR, msg))
-    if not msg:
-        # the request failed
-        return transactions
-
-    transactions = transactions['data']['transactions']
-    totalDebitAmount = 0
-    totalCreditAmount = 0
-    for data in transactions:
-        if data['Type'] == "Credit":
-            totalDebitAmount += data['Amount']
-        if data['Type'] == "Debit":
-            totalCreditAmount = data['Amount']
-
-    # get user data
-    walletByEmail, msg = wallets_api.get_wallet_by_email(email_address)
-    if walletByEmail == None:
-        return internalServerErrorResponse(getError(ErrorCodes.GENERIC_ERROR, msg))
-    elif not msg:
-        # the request failed
-        return walletByEmail
-    
+    # get user data and, for a mirrored wallet, its new transactions at the same time
+    sync_from, sync_to = transactionSyncWindow(wallet)
+    calls = [partial(wallets_api.get_wallet_by_email, wallet.email_address)]
+    if synced:
+        calls.append(partial(fetchWalletTransactions, wallets_api, pin, phone_number, sync_from, sync_to))
+    else:
+        # the PIN only goes to the background backfill otherwise, have the upstream check it first
+        calls.append(partial(wallets_api.get_wallet_transactions, pin, phone_number, sync_to, sync_to, take=1))
+    results = fan_out(*calls, stop_when=upstreamFailed)
+    for result in results:
+        if result == None:
+            # cancelled, the other call already failed
+            continue
+
+        data, msg = result
+        if data == None:
+            return internalServerErrorResponse(getError(ErrorCodes.GENERIC_ERROR, msg))
+        if not msg:
+            # the request failed
+            return data
+
+    walletByEmail, _ = results[0]
+    aggregate = walletTotals(wallet, pin, results[1][0] if synced else None, sync_to)
+
+    return walletInfoResponse(walletByEmail, aggregate)
+
+
+def walletTotals(wallet, pin, delta, sync_to):
+    """
+    Mirror the delta fetched for a synced wallet and return its WalletAggregate.
+    A wallet never synced (delta None), whose PIN the upstream already accepted,
+    has its history backfilled instead and no totals, they are unknown until the
+    backfill is done.
+    """
+    if delta == None:
+        backfillWalletTransactions(wallets_api, wallet, pin)
+        return None
+
+    storeWalletTransactions(wallet, delta, sync_to)
+    # totals are kept up to date as transactions are mirrored
+    return WalletAggregate.objects.get(wallet=wallet)
+
+
+def walletInfoResponse(walletByEmail, aggregate):
     walletData = walletByEmail['data']
     currentBalance = walletData.get("availableBalance")
     walletData = {
@@ -317,57 +341,75 @@ def getWalletInfo(request):
         
     response_data = {
         "currentBalance": currentBalance,
-        "totalMoneyReceived": totalCreditAmount,
-        "totalMoneySpent": totalDebitAmount,
+        "totalMoneyReceived": float(aggregate.total_received) if aggregate else None,
+        "totalMoneySpent": float(aggregate.total_spent) if aggregate else None,
+        "transactionCount": aggregate.transaction_count if aggregate else None,
+        "lastTransactionDate": aggregate.last_transaction_at if aggregate else None,
         "walletInfo": walletData
     }
         
     return successResponse(message="Wallet Information", body=response_data)
 
 
-def retrieveSubWalletTransactions(request):
-    if request.method != "POST":
-        return badRequestResponse(getError(ErrorCodes.GENERIC_ERROR, "HTTP method should be POST"))
+@endpoint(fields=['pin'], wallet=WALLET_AND_EMAIL)
+def retrieveSubWalletTransactions(request, wallet, pin):
+    phone_number = wallet.phone_number
+    loadWalletFields(wallet, 'created_at', 'signed_up_at', 'transactions_synced_to')
+
+    query, errorResponse = transactionsQuery(request, wallet)
+    if query == None:
+        return errorResponse
+    date_from, transaction_type, pageNum, pageBy = query
 
-    body = json.loads(request.body)
-
-    # check if required fields are present in request payload
-    missingKeys = validateKeys(payload=body, requiredKeys=['secret_key', 'email_address', 'pin'])
-    if missingKeys:
-        return badRequestResponse(getError(ErrorCodes.MISSING_FIELDS, f"The following key(s) are missing in the request payload: {missingKeys}"))
-    
-    secretKey = body['secret_key']
-    email_address = body['email_address']
-    pin = body['pin']
-
-    # validate secret key
-    existingWallet = getWalletUsingKey(secretKey)
-    if not existingWallet:
-        return badRequestResponse(getError(ErrorCodes.UNAUTHORIZED_REQUEST, "No wallet exists for the specified secret key"))
-    elif existingWallet.email_address != email_address:
-        return unAuthorizedResponse(getError(ErrorCodes.UNAUTHORIZED_REQUEST, "The email specified isn't associated with the wallet for secret key"))
-    
-    phone_number = existingWallet.phone_number
+    if wallet.transactions_synced_to == None:
+        # never mirrored, serve the page from the upstream while the history is backfilled
+        skip = (pageNum - 1) * pageBy
+        transactions, msg = wallets_api.get_wallet_transactions(pin, phone_number, date_from, str(date.today()), transaction_type, take=pageBy + 1, skip=skip)
+        if transactions == None:
+            return internalServerErrorResponse(getError(ErrorCodes.GENERIC_ERROR, msg))
+        if not msg:
+            # the request failed
+            return transactions
 
+        backfillWalletTransactions(wallets_api, wallet, pin)
+        paginated_transactions, paginationDetails = paginateUpstreamTransactions(transactions['data'], pageNum, pageBy)
+        return paginatedResponse(message="Wallet transactions", body=serializeTransactions(paginated_transactions), pagination=paginationDetails)
+
+    # bring the local mirror up to date, only the delta since the last sync goes upstream
+    sync_from, sync_to = transactionSyncWindow(wallet)
+    delta, msg = fetchWalletTransactions(wallets_api, pin, phone_number, sync_from, sync_to)
+    if delta == None:
+        return internalServerErrorResponse(getError(ErrorCodes.GENERIC_ERROR, msg))
+    if not msg:
+        # the request failed
+        return delta
+
+    return mirroredTransactionsPage(wallet, delta, sync_to, date_from, transaction_type, pageNum, pageBy)
+
+
+def transactionsQuery(request, wallet):
+    """
+    Read the filters and the page asked of the transactions view from the query string.
+    Returns ((date_from, transaction_type, pageNum, pageBy), None) or (None, error response).
+    """
     queryDict = request.GET
-    date_from = date_from = str(parse(existingWallet.created_at).date())
-    date_to = str(date.today())  
+    date_from = str(walletSignupDate(wallet))
     transaction_type = 0
     # transaction type code --- Credit = 1, Debit = 2, All = 0 or 3
     if 'transaction_type' in queryDict:
         try:
             transaction_type = int(queryDict.get('transaction_type'))
             if transaction_type not in (0, 1, 2, 3):
-                return badRequestResponse(ErrorCodes.GENERIC_INVALID_PARAMETERS, message="TransactionType param must be any of <<0, 1, 2, 3>>")
-            
+                return None, badRequestResponse(getError(ErrorCodes.GENERIC_ERROR, "TransactionType param must be any of <<0, 1, 2, 3>>"))
+
         except Exception as e:
-            return badRequestResponse(ErrorCodes.GENERIC_INVALID_PARAMETERS, message="TransactionType param shuld be a number")
+            return None, badRequestResponse(getError(ErrorCodes.GENERIC_ERROR, "TransactionType param shuld be a number"))
 
     if 'day' in queryDict:
         try:
             day = queryDict.get('day')
             if day == 'all':
-                date_from = str(parse(existingWallet.created_at).date())
+                date_from = str(walletSignupDate(wallet))
             elif day == 'month':
                 day = date.today().day - 1
                 date_from = date.today() - timedelta(days=day)
@@ -375,114 +417,276 @@ def retrieveSubWalletTransactions(request):
                 day = int(day)
                 date_from = str(date.today() - timedelta(days=day))
         except Exception as e:
-            return badRequestResponse(ErrorCodes.GENERIC_INVALID_PARAMETERS, message="Day param shuld be any of <<0, 1, 7, 30, month or all>>")
+            return None, badRequestResponse(getError(ErrorCodes.GENERIC_ERROR, "Day param shuld be any of <<0, 1, 7, 30, month or all>>"))
 
-    # retrieve wallet transactions
-    transactions, msg = wallets_api.get_wallet_transactions(pin, phone_number, date_from, date_to, transaction_type)
-    if transactions == None:
-        return internalServerErrorResponse(getError(ErrorCodes.GENERIC_ERROR, msg))
-    if not msg:
-        # the request failed
-        return transactions
-    
-    transactions = transactions['data']['transactions']
+    try:
+        pageBy = int(queryDict.get('pageBy') or 10)
+        pageNum = int(queryDict.get('page') or 1)
+        if pageBy < 1 or pageNum < 1:
+            raise ValueError(pageBy, pageNum)
 
-    # Paginate the retrieved transaction
-    if queryDict.get('pageBy'):
-        pageBy = request.GET.get('pageBy')
-    else:
-        pageBy = 10
+    except ValueError as e:
+        return None, badRequestResponse(getError(ErrorCodes.GENERIC_ERROR, "Page and pageBy params should be positive numbers"))
 
-    paginator = Paginator(transactions, pageBy)
+    # a page never holds more than TRANSACTIONS_MAX_PAGE_SIZE rows, however many are asked for
+    pageBy = min(pageBy, settings.TRANSACTIONS_MAX_PAGE_SIZE)
 
-    if queryDict.get('page'):
-        pageNum = request.GET.get('page')
-    else:
-        pageNum = 1
+    return (date_from, transaction_type, pageNum, pageBy), None
 
-    # try if the page requested exists or is empty
-    try:
-        paginated_transactions = paginator.page(pageNum)
-
-        paginationDetails = {
-            "totalPages": paginator.num_pages,
-            "limit": pageBy,
-            "count": paginator.count,
-            "currentPage": pageNum
-        }
-    except Exception as e:
-        print(e)
-        paginated_transactions = []
-        paginationDetails = {}
+
+def mirroredTransactionsPage(wallet, delta, sync_to, date_from, transaction_type, pageNum, pageBy):
+    storeWalletTransactions(wallet, delta, sync_to)
+
+    # serve the page from the mirror
+    transactions = localTransactions(wallet, date_from, transaction_type)
+    paginated_transactions, paginationDetails = paginateTransactions(transactions, pageNum, pageBy)
 
     return paginatedResponse(message="Wallet transactions", body=serializeTransactions(paginated_transactions), pagination=paginationDetails)
 
 
-def subWalletTransferToBankAcct(request):
+@idempotent
+@endpoint(fields=[
+    'bank_code', 'account_number', Field('amount', money), 'account_name', 'description',
+    Field('async', required=False, arg='runAsync'),
+], wallet=WALLET_AND_EMAIL)
+def subWalletTransferToBankAcct(request, wallet, bank_code, account_number, amount, account_name, description, runAsync):
+    if runAsync:
+        return queueBankTransfer(wallet, bank_code, account_number, amount, account_name, description)
+
+    transfer, errorResponse = transferToBank(wallet, amount, bank_code, account_number, account_name, description)
+    if transfer == None:
+        return errorResponse
+
+    return successResponse(message="Wallet to Bank Account Transfer", body=transfer)
+
+
+def queueBankTransfer(wallet, bank_code, account_number, amount, account_name, description):
+    # nothing reaches the upstream until a worker picks the job up, so catch bad input now
+    if amount <= 0:
+        return badRequestResponse(getError(ErrorCodes.GENERIC_ERROR, "Amount should be greater than zero"))
+    if not nubanIsValid(bank_code, account_number):
+        return badRequestResponse(getError(ErrorCodes.GENERIC_ERROR, "The account number is not valid for the bank specified"))
+
+    # record the transfer and let run_transfer_jobs carry it out, the client polls the job
+    job = TransferJob.objects.create(
+        wallet=wallet,
+        amount=amount,
+        bank_code=bank_code,
+        account_number=account_number,
+        account_name=account_name,
+        description=description
+    )
+    return acceptedResponse(message="Wallet to Bank Account Transfer queued", body=serializeTransferJob(job))
+
+
+@endpoint(fields=['job_id'], wallet=WALLET_KEY)
+def getTransferJob(request, wallet, job_id):
+    try:
+        job = TransferJob.objects.get(pk=job_id, wallet=wallet)
+    except (TransferJob.DoesNotExist, ValidationError):
+        return resourceNotFoundResponse(getError(ErrorCodes.GENERIC_ERROR, "No transfer job exists for the specified id"))
+
+    return successResponse(message="Transfer Job", body=serializeTransferJob(job))
+
+
+@endpoint(fields=[Field('job_ids', arg='jobIds')], wallet=WALLET_KEY)
+def getTransferJobs(request, wallet, jobIds):
+    if not isinstance(jobIds, list) or len(jobIds) > 100:
+        return badRequestResponse(getError(ErrorCodes.GENERIC_ERROR, "job_ids should be a list of at most 100 ids"))
+
+    try:
+        jobs = {str(job.id): job for job in TransferJob.objects.filter(pk__in=jobIds, wallet=wallet)}
+    except ValidationError:
+        return badRequestResponse(getError(ErrorCodes.GENERIC_ERROR, "job_ids should only contain transfer job ids"))
+
+    # one entry per requested id, in the order asked, unknown ids come back as null
+    data = {str(jobId): serializeTransferJob(jobs[str(jobId)]) if str(jobId) in jobs else None for jobId in jobIds}
+    return successResponse(message="Transfer Jobs", body=data)
+
+
+@idempotent
+@endpoint(root=True, fields=['credits', Field('concurrency', int, required=False, message="Concurrency should be a number")])
+def bulkCreditSubWallets(request, credits, concurrency):
+    if not isinstance(credits, list) or not credits or len(credits) > settings.BATCH_MAX_ITEMS:
+        return badRequestResponse(getError(ErrorCodes.GENERIC_ERROR, f"credits should be a list of 1 to {settings.BATCH_MAX_ITEMS} entries"))
+
+    # the credits run on run_batch_jobs workers, the client polls batch/job for the outcome
+    jobId = uuid.uuid4()
+    job = createBatchJob(BatchJob.CREDIT, creditBatchItems(jobId, credits), concurrency or settings.BATCH_CONCURRENCY, jobId=jobId)
+
+    return acceptedResponse(message="Bulk Sub Wallet Credit queued", body=serializeBatchJob(job))
+
+
+def uploadPayoutBatch(request):
     if request.method != "POST":
         return badRequestResponse(getError(ErrorCodes.GENERIC_ERROR, "HTTP method should be POST"))
 
-    body = json.loads(request.body)
-
-    # check if required fields are present in request payload
-    missingKeys = validateKeys(payload=body, requiredKeys=['secret_key', 'email_address', 'bank_code', 'account_number', 'amount', 'account_name', 'description'])
-    if missingKeys:
-        return badRequestResponse(getError(ErrorCodes.MISSING_FIELDS, f"The following key(s) are missing in the request payload: {missingKeys}"))
-    
-    secretKey = body['secret_key']
-    email_address = body['email_address']
-    bank_code = body['bank_code']
-    account_number = body['account_number']
-    amount = float(body['amount'])
-    account_name = body['account_name']
-    description = body['description']
-
-    # validate secret key
-    existingWallet = getWalletUsingKey(secretKey)
-    if not existingWallet:
-        return badRequestResponse(getError(ErrorCodes.UNAUTHORIZED_REQUEST, "No wallet exists for the specified secret key"))
-    elif existingWallet.email_address != email_address:
-        return unAuthorizedResponse(getError(ErrorCodes.UNAUTHORIZED_REQUEST, "The email specified isn't associated with the wallet for secret key"))
-
-    phone_number = existingWallet.phone_number
-    # get wallet balance
-    balance, msg = wallets_api.get_wallet_balance(phone_number)
+    root_secret = request.headers.get('Secret')
+    if root_secret != settings.ROOT_SECRET:
+        return unAuthorizedResponse(getError(ErrorCodes.GENERIC_ERROR, "Permission Denied"))
 
-    if balance == None:
-        return internalServerErrorResponse(getError(ErrorCodes.GENERIC_ERROR, msg))
-    if not msg:
-        # the request failed
-        return balance
+    upload = request.FILES.get('file')
+    if upload == None:
+        return badRequestResponse(getError(ErrorCodes.MISSING_FIELDS, "A CSV file should be uploaded in the file field"))
 
-    if balance['WalletBalance'] >= amount:
-        # debit wallet
-        debit_reference = str(uuid.uuid4())[:12]
-        debit, msg = wallets_api.debit_wallet(amount, phone_number, debit_reference)
-        if debit == None:
-            return internalServerErrorResponse(getError(ErrorCodes.GENERIC_ERROR, msg))
-        if not msg:
-            # the request failed
-            return debit
+    try:
+        concurrency = int(request.POST.get('concurrency') or settings.BATCH_CONCURRENCY)
+    except (TypeError, ValueError):
+        return badRequestResponse(getError(ErrorCodes.GENERIC_ERROR, "Concurrency should be a number"))
+
+    # the same file uploaded twice would pay everyone twice
+    digest = hashlib.sha256()
+    for chunk in upload.chunks():
+        digest.update(chunk)
+    sourceDigest = digest.hexdigest()
+    upload.seek(0)
+
+    if request.POST.get('allow_duplicate') != "true":
+        previousJob = BatchJob.objects.filter(kind=BatchJob.PAYOUT, source_digest=sourceDigest).first()
+        if previousJob != None:
+            return resourceConflictResponse(getError(ErrorCodes.GENERIC_ERROR, f"This file was already uploaded as batch job {previousJob.id}"))
+
+    # the rows are parsed as they are stored, the file is never read into memory
+    reader = csv.DictReader(io.TextIOWrapper(upload, encoding='utf-8-sig', newline=''))
+    jobId = uuid.uuid4()
+    try:
+        missingColumns = [column for column in PAYOUT_COLUMNS if column != 'narration' and column not in (reader.fieldnames or [])]
+        if missingColumns:
+            return badRequestResponse(getError(ErrorCodes.MISSING_FIELDS, f"The following column(s) are missing in the CSV file: {missingColumns}"))
+
+        job = createBatchJob(
+            BatchJob.PAYOUT, payoutBatchItems(jobId, limitRows(reader, settings.PAYOUT_BATCH_MAX_ROWS)), concurrency,
+            jobId=jobId, source_name=upload.name[:255], source_digest=sourceDigest
+        )
+    except BatchTooLarge as e:
+        return badRequestResponse(getError(ErrorCodes.GENERIC_ERROR, str(e)))
+    except UnicodeDecodeError:
+        return badRequestResponse(getError(ErrorCodes.GENERIC_ERROR, "The CSV file should be UTF-8 encoded"))
+    except csv.Error as e:
+        return badRequestResponse(getError(ErrorCodes.GENERIC_ERROR, f"The CSV file could not be read: {e}"))
+
+    return acceptedResponse(message="Payout Batch queued", body=serializeBatchJob(job))
+
+
+@endpoint("GET", root=True)
+def downloadBatchResults(request):
+    try:
+        job = BatchJob.objects.get(pk=request.GET.get('job_id'))
+    except (BatchJob.DoesNotExist, ValidationError):
+        return resourceNotFoundResponse(getError(ErrorCodes.GENERIC_ERROR, "No batch job exists for the specified id"))
 
-    # exceute transfer
-    transfer_reference = str(uuid.uuid4())[:12]
-    transfer, msg = wallets_api.bank_account_transfer(bank_code, account_number, amount, account_name, transfer_reference, description)
-    if transfer == None:
-        return internalServerErrorResponse(getError(ErrorCodes.GENERIC_ERROR, msg))
-    if not msg:
-        # the request failed
-        return transfer
+    if job.status != BatchJob.COMPLETED or job.results == None:
+        return resourceConflictResponse(getError(ErrorCodes.GENERIC_ERROR, "The batch job has no result file yet"))
 
-    return successResponse(message="Wallet to Bank Account Transfer", body=transfer)
+    response = HttpResponse(bytes(job.results), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="batch-{job.id}-results.csv"'
+    return response
+
+
+@endpoint(root=True, fields=[
+    'job_id',
+    Field('page', int, required=False, arg='pageNum', message="page and page_by should be numbers"),
+    Field('page_by', int, required=False, arg='pageBy', message="page and page_by should be numbers"),
+    Field('status', required=False),
+])
+def getBatchJob(request, job_id, pageNum, pageBy, status):
+    try:
+        # the result CSV is only read by batch/job/results
+        job = BatchJob.objects.defer('results').get(pk=job_id)
+    except (BatchJob.DoesNotExist, ValidationError):
+        return resourceNotFoundResponse(getError(ErrorCodes.GENERIC_ERROR, "No batch job exists for the specified id"))
+
+    pageNum = pageNum or 1
+    pageBy = min(pageBy or 100, 1000)
+    if pageNum < 1 or pageBy < 1:
+        return badRequestResponse(getError(ErrorCodes.GENERIC_ERROR, "page and page_by should be greater than zero"))
+
+    # item outcomes, optionally only the ones with a given status
+    items = BatchItem.objects.filter(job=job).order_by('position')
+    if status:
+        items = items.filter(status=status)
+
+    data = serializeBatchJob(job)
+    data['items'] = [serializeBatchItem(item) for item in items[(pageNum - 1) * pageBy:pageNum * pageBy]]
+
+    return successResponse(message="Batch Job", body=data)
+
+
+@idempotent
+@endpoint(fields=[
+    Field('transfers', required=False), Field('wallet_key', required=False, arg='walletKey'), Field('amount', money, required=False),
+], wallet=WALLET_AND_EMAIL)
+def subWalletTransferToSubWallet(request, wallet, transfers, walletKey, amount):
+    transferRequest, errorResponse = transferDestinations(wallet, transfers, walletKey, amount)
+    if transferRequest == None:
+        return errorResponse
+    destinations, batch = transferRequest
+
+    data, errorResponse = transferBetweenWallets(wallet, destinations)
+    if data == None:
+        return errorResponse
+
+    return walletTransferResponse(data, batch)
+
+
+def transferDestinations(wallet, transfers, walletKey, amount):
+    """
+    Validate a wallet to wallet transfer request and resolve its destinations.
+    Returns (([(destination, amount)], batch), None) or (None, error response).
+    """
+    # a single transfer (wallet_key, amount) or a batch of them (transfers)
+    batch = transfers is not None
+    if batch:
+        if not isinstance(transfers, list) or not transfers or len(transfers) > settings.WALLET_TRANSFER_MAX_ITEMS:
+            return None, badRequestResponse(getError(ErrorCodes.GENERIC_ERROR, f"transfers should be a list of 1 to {settings.WALLET_TRANSFER_MAX_ITEMS} entries"))
+    else:
+        missingKeys = [key for key, value in (('wallet_key', walletKey), ('amount', amount)) if value is None]
+        if missingKeys:
+            return None, badRequestResponse(getError(ErrorCodes.MISSING_FIELDS, f"The following key(s) are missing in the request payload: {missingKeys}"))
+        transfers = [{"wallet_key": walletKey, "amount": amount}]
 
+    # every destination resolved in one query
+    walletKeys = {entry.get('wallet_key') for entry in transfers if isinstance(entry, dict)}
+    wallets = {destination.wallet_key: destination for destination in UserWalletData.objects.filter(wallet_key__in=walletKeys)}
 
-def subWalletTransferToSubWallet(request):
-    pass
+    destinations = []
+    for position, entry in enumerate(transfers):
+        if not isinstance(entry, dict):
+            return None, badRequestResponse(getError(ErrorCodes.GENERIC_ERROR, f"Transfer {position} should be an object with wallet_key and amount"))
 
+        destination = wallets.get(entry.get('wallet_key'))
+        amount = parseAmount(entry.get('amount'))
+        if destination == None:
+            return None, resourceNotFoundResponse(getError(ErrorCodes.GENERIC_ERROR, f"No wallet exists for the wallet_key of transfer {position}"))
+        if destination.pk == wallet.pk:
+            return None, badRequestResponse(getError(ErrorCodes.GENERIC_ERROR, f"Transfer {position} is to the sending wallet"))
+        if amount == None:
+            return None, badRequestResponse(getError(ErrorCodes.GENERIC_ERROR, f"The amount of transfer {position} should be a positive number with at most 2 decimal places"))
+        destinations.append((destination, amount))
 
+    return (destinations, batch), None
+
+
+def walletTransferResponse(data, batch):
+    if not batch:
+        transfer = data.pop('transfers')[0]
+        data.update(status=transfer['status'], creditReference=transfer['reference'], error=transfer.get('error'))
+        if transfer['status'] != "credited":
+            # the credit failed, the funds were paid back to the sender unless the outcome is unknown
+            return internalServerErrorResponse(dict(getError(ErrorCodes.GENERIC_ERROR, "The sub wallet could not be credited"), data=data))
+
+    return successResponse(message="Sub Wallet to Sub Wallet Transfer", body=data)
+
+
+# operational data about the service, only for callers holding the root Secret
+@endpoint("GET", root=True)
+def getMetrics(request):
+
+    return successResponse(message="Metrics", body=metrics.snapshot())
+
+
+@endpoint("GET")
 def getAllBanks(request):
-    if request.method != "GET":
-        return badRequestResponse(getError(ErrorCodes.GENERIC_ERROR, "HTTP method should be GET"))
 
     all_banks, msg = wallets_api.get_all_banks()
     if all_banks == None:
@@ -494,19 +698,35 @@ def getAllBanks(request):
     return successResponse(message="All Banks", body=all_banks)
 
 
-def bankAccountEnquiry(request):
-    if request.method != "POST":
-        return badRequestResponse(getError(ErrorCodes.GENERIC_ERROR, "HTTP method should be POST"))
+@endpoint("GET")
+def searchBanks(request):
 
-    body = json.loads(request.body)
+    query = request.GET.get('q', '')
+    try:
+        limit = min(int(request.GET.get('limit') or 10), 50)
+    except ValueError:
+        return badRequestResponse(getError(ErrorCodes.GENERIC_ERROR, "Limit param should be a number"))
 
-    # check if required fields are present in request payload
-    missingKeys = validateKeys(payload=body, requiredKeys=['bank_code', 'account_number'])
-    if missingKeys:
-        return badRequestResponse(getError(ErrorCodes.MISSING_FIELDS, f"The following key(s) are missing in the request payload: {missingKeys}"))
-    
-    bank_code = body['bank_code']
-    account_number = body['account_number']
+    all_banks, msg = wallets_api.get_all_banks()
+    if all_banks == None:
+        return internalServerErrorResponse(getError(ErrorCodes.GENERIC_ERROR, msg))
+    if not msg:
+        # the request failed
+        return all_banks
+
+    banks = bankDirectory(all_banks).search(query, limit)
+    return successResponse(message="Bank Search", body=banks)
+
+
+@endpoint(fields=['bank_code', 'account_number'])
+def bankAccountEnquiry(request, bank_code, account_number):
+    # reject malformed account numbers locally before spending an upstream call
+    all_banks, msg = wallets_api.get_all_banks()
+    if all_banks != None and msg is True:
+        if not bankDirectory(all_banks).is_valid_account(bank_code, account_number):
+            return badRequestResponse(getError(ErrorCodes.GENERIC_ERROR, "The account number is not valid for the bank specified"))
+    elif not nubanIsValid(bank_code, account_number):
+        return badRequestResponse(getError(ErrorCodes.GENERIC_ERROR, "The account number is not valid for the bank specified"))
 
     bank_account, msg = wallets_api.bank_account_enquiry(bank_code, account_number)
     if bank_account == None:
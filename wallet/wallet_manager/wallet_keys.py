@@ -0,0 +1,126 @@
+"""
+Cache of wallet_key -> (id, phone_number, email_address) used to authenticate
+wallet requests without a database query.
+
+Entries live in a bounded in-process LRU, or in the Django cache named by
+WALLET_KEY_CACHE_BACKEND when several workers must agree. signals.py drops a
+wallet's entry whenever the wallet is saved or deleted. Wallets returned from
+the cache only have the cached fields loaded; Django loads any other field
+from the database on first access.
+"""
+
+from .models import UserWalletData
+from api_utils import metrics
+from api_utils.cache import LRUCache
+from django.conf import settings
+from django.core.cache import caches
+from django.db import router
+import hashlib
+import threading
+
+class WalletKeyCache:
+
+    def __init__(self, maxsize, ttl, backend=None):
+        self.ttl = ttl
+        self.backend = backend or None
+        self.local = LRUCache(maxsize, ttl, name="walletKeys")
+
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    def _shared_key(self, walletKey):
+        # wallet keys come from request payloads, hash them into a key every backend accepts
+        return "walletkey:" + hashlib.blake2b(str(walletKey).encode(), digest_size=16).hexdigest()
+
+    def _count(self, stat):
+        with self._lock:
+            self._stats[stat] += 1
+
+    def get(self, walletKey):
+        if self.backend:
+            entry = caches[self.backend].get(self._shared_key(walletKey))
+        else:
+            entry = self.local.get(walletKey)
+
+        self._count("hits" if entry is not None else "misses")
+        return entry
+
+    def store(self, wallet):
+        if not wallet.wallet_key:
+            return
+
+        entry = (wallet.pk, wallet.phone_number, wallet.email_address)
+        if self.backend:
+            caches[self.backend].set(self._shared_key(wallet.wallet_key), entry, self.ttl)
+        else:
+            self.local.set(wallet.wallet_key, entry)
+
+    def invalidate(self, walletKey):
+        if not walletKey:
+            return
+
+        self._count("invalidations")
+        if self.backend:
+            caches[self.backend].delete(self._shared_key(walletKey))
+        else:
+            self.local.delete(walletKey)
+
+    def wallet(self, walletKey):
+        """
+        The cached wallet as a UserWalletData with the other fields deferred, or None.
+        """
+        entry = self.get(walletKey)
+        if entry is None:
+            return None
+
+        walletId, phoneNumber, emailAddress = entry
+        known = {'id': walletId, 'phone_number': phoneNumber, 'email_address': emailAddress, 'wallet_key': walletKey}
+        # from_db takes the loaded values in model field order
+        fieldNames = [field.attname for field in UserWalletData._meta.concrete_fields if field.attname in known]
+        return UserWalletData.from_db(
+            router.db_for_read(UserWalletData), fieldNames, [known[name] for name in fieldNames]
+        )
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hitRatio"] = round(stats["hits"] / lookups, 4) if lookups else None
+        stats["backend"] = self.backend or "local"
+        if not self.backend:
+            stats["size"] = self.local.stats()["size"]
+        return stats
+
+
+def getWalletUsingKey(secretKey):
+    # served from the wallet key cache when possible, other fields load on first access
+    wallet = wallet_key_cache.wallet(secretKey)
+    if wallet != None:
+        return wallet
+
+    try:
+        wallet = UserWalletData.objects.get(wallet_key=secretKey)
+        wallet_key_cache.store(wallet)
+        return wallet
+
+    except UserWalletData.DoesNotExist:
+        return None
+
+
+def loadWalletFields(wallet, *fields):
+    """
+    Load the given fields of a wallet from the cache in one query, skipping the ones already loaded.
+    Async views must call this before reading fields the cache doesn't hold.
+    """
+    deferred = [field for field in fields if field in wallet.get_deferred_fields()]
+    if deferred:
+        wallet.refresh_from_db(fields=deferred)
+    return wallet
+
+
+wallet_key_cache = WalletKeyCache(
+    maxsize=settings.WALLET_KEY_CACHE_SIZE,
+    ttl=settings.WALLET_KEY_CACHE_TTL,
+    backend=settings.WALLET_KEY_CACHE_BACKEND
+)
+metrics.register("walletKeyCache", wallet_key_cache.stats)
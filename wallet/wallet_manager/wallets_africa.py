@@ -1,6 +1,16 @@
 import requests
+from requests.adapters import HTTPAdapter
+import httpx
+import asyncio
 import logging
-import json
+import os
+import threading
+import time
+import weakref
+from functools import partial
+from api_utils.cache import StaleWhileRevalidateCache, LRUCache
+from api_utils.concurrency import SingleFlight, AsyncSingleFlight
+from api_utils import metrics, codec
 from api_utils.views import (
     badRequestResponse, resourceConflictResponse, internalServerErrorResponse, unAuthenticatedResponse,
     unAuthorizedResponse, resourceNotFoundResponse
@@ -10,59 +20,186 @@ from django.conf import settings
 # Get an instance of a logger
 logger = logging.getLogger(__name__)
 
+_http_session = None
+_http_session_pid = None
+_http_session_lock = threading.Lock()
+
+
+def get_http_session():
+    """
+    Return the pooled HTTP session shared by every WalletsAfricaAPI in this process.
+
+    The session is created lazily and re-created after a fork so worker processes
+    never share sockets. urllib3's connection pool is thread-safe, so daphne's
+    thread pool can use the same session concurrently; pool_block caps the number
+    of open connections per upstream host at WALLETS_HTTP_POOL_MAXSIZE.
+    """
+    global _http_session, _http_session_pid
+
+    pid = os.getpid()
+    if _http_session is not None and _http_session_pid == pid:
+        return _http_session
+
+    with _http_session_lock:
+        if _http_session is None or _http_session_pid != pid:
+            adapter = HTTPAdapter(
+                pool_connections=settings.WALLETS_HTTP_POOL_CONNECTIONS,
+                pool_maxsize=settings.WALLETS_HTTP_POOL_MAXSIZE,
+                pool_block=settings.WALLETS_HTTP_POOL_BLOCK,
+            )
+            session = requests.Session()
+            session.headers.update({"Connection": "keep-alive"})
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _http_session = session
+            _http_session_pid = pid
+
+    return _http_session
+
+
+_async_http_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_http_client():
+    """
+    Return the pooled httpx.AsyncClient for the running event loop.
+
+    An AsyncClient's connections belong to the loop that opened them, so one
+    client is kept per loop; under daphne that is a single client per process.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_http_clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.WALLETS_ASYNC_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.WALLETS_ASYNC_HTTP_MAX_KEEPALIVE,
+            ),
+            timeout=httpx.Timeout(settings.WALLETS_HTTP_READ_TIMEOUT, connect=settings.WALLETS_HTTP_CONNECT_TIMEOUT),
+        )
+        _async_http_clients[loop] = client
+
+    return client
+
 
 class WalletsAfricaAPI:
+    """
+    Client for the Wallets Africa API.
+
+    Every method returns whatever `_wallet_api_request` returns, a `(data, msg)`
+    tuple, and reports local failures through `_failure`. AsyncWalletsAfricaAPI
+    makes both of those coroutines, so it inherits the whole method surface.
+    """
     
     def __init__(self):
         self.base_url = settings.WALLETS_BASE_URL
         self.sandbox_url = settings.WALLETS_SANDBOX_URL
         self.secret_key = settings.WALLETS_SECRET_KEY
         self.public_key = settings.WALLETS_PUBLIC_KEY
+        self.timeout = (settings.WALLETS_HTTP_CONNECT_TIMEOUT, settings.WALLETS_HTTP_READ_TIMEOUT)
+
+    @property
+    def session(self):
+        return get_http_session()
 
     def _error_response(self, code, data):
+        """
+        Map an upstream error to our own response. The upstream status is kept on
+        it as `upstream_status_code`, a 502 or 504 is answered as a 400 but
+        can't be taken for a rejection.
+        """
         status_code = str(code)
 
         if status_code == "400":
-            return badRequestResponse(data)
-        if status_code == "401":
-            return unAuthenticatedResponse(data)
-        if status_code == "403":
-            return unAuthorizedResponse(data)
-        if status_code == "404":
-            return resourceNotFoundResponse(data)
-        if status_code == "409":
-            return resourceConflictResponse(data)
-        if status_code == "500":
-            return internalServerErrorResponse(data)
-
-        return badRequestResponse(data)
-
-    def _wallet_api_request(self, endpoint, http_method, payload={}):
-        try:
-            method = http_method.upper()
-            url = f"{self.base_url}/{endpoint}"
-            header = {
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {self.public_key}"
-            }
-            api_request = requests.request(method, url, headers=header, data=payload)
-            response = api_request.json()
-
-            response_status_code = api_request.status_code
-            if int(response_status_code) not in range(200, 299):
-                if isinstance(response, dict):
-                    if 'Response' in response:
-                        data = response['Response']
-                    else:
-                        data = response
-                    return self._error_response(response_status_code, data), False
-            else:
-                if isinstance(response, dict) and 'Data' in response:
-                    data = response['Data']
+            response = badRequestResponse(data)
+        elif status_code == "401":
+            response = unAuthenticatedResponse(data)
+        elif status_code == "403":
+            response = unAuthorizedResponse(data)
+        elif status_code == "404":
+            response = resourceNotFoundResponse(data)
+        elif status_code == "409":
+            response = resourceConflictResponse(data)
+        elif status_code == "500":
+            response = internalServerErrorResponse(data)
+        else:
+            response = badRequestResponse(data)
+
+        response.upstream_status_code = int(code)
+        return response
+
+    def _request_headers(self):
+        return {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {self.public_key}"
+        }
+
+    def _parse_response(self, response_status_code, response):
+        if int(response_status_code) not in range(200, 299):
+            if isinstance(response, dict):
+                if 'Response' in response:
+                    data = response['Response']
                 else:
                     data = response
+                return self._error_response(response_status_code, data), False
+        else:
+            if isinstance(response, dict) and 'Data' in response:
+                data = response['Data']
+            else:
+                data = response
+
+        return data, True
+
+    def _failure(self, msg):
+        return None, msg
+
+    def _send(self, endpoint, http_method, payload={}):
+        method = http_method.upper()
+        url = f"{self.base_url}/{endpoint}"
+        api_request = self.session.request(method, url, headers=self._request_headers(), data=payload, timeout=self.timeout)
+        return api_request.status_code, codec.loads(api_request.content)
 
-            return data, True
+    def _exchange(self, endpoint, http_method, payload={}):
+        """
+        Send the request and let the local caches see the answer, or the failure.
+        """
+        started_at = time.monotonic()
+        try:
+            status_code, response = self._send(endpoint, http_method, payload)
+        except Exception:
+            observe_response(endpoint, payload, started_at)
+            raise
+
+        observe_response(endpoint, payload, started_at, status_code, response)
+        return status_code, response
+
+    def cached_wallet_balance(self, phoneNumber, currency="NGN", max_age=None):
+        """
+        Return the cached wallet balance as a (data, True) result, or None when
+        there is no cached balance younger than `max_age` seconds (the cache TTL
+        by default). Never calls the upstream.
+        """
+        balance = balance_cache.fresh(phoneNumber, currency, max_age)
+        if balance == None:
+            return None
+
+        return balance, True
+
+    def _wallet_api_request(self, endpoint, http_method, payload={}, coalesce=True):
+        try:
+            cache = response_caches.get(endpoint)
+            if cache is not None:
+                cached = cache.get(payload)
+                if cached is not None:
+                    return self._parse_response(*cached)
+
+            if coalesce and endpoint in coalesced_endpoints:
+                status_code, response = single_flight.do(
+                    (endpoint, payload), partial(self._exchange, endpoint, http_method, payload)
+                )
+            else:
+                status_code, response = self._exchange(endpoint, http_method, payload)
+            return self._parse_response(status_code, response)
 
         except Exception as e:
             logger.error("_wallet_api_request@Error")
@@ -75,25 +212,24 @@ class WalletsAfricaAPI:
         developer wallet in different currencies
         """
         try:
-            payload = json.dumps({
+            payload = codec.dumps({
                 "currency": currency,
                 "secretKey": self.secret_key
             })
             
-            response, msg = self._wallet_api_request("self/balance", "POST", payload)
-            return response, msg
+            return self._wallet_api_request("self/balance", "POST", payload)
             
         except Exception as e:
             logger.error("check_balance@Error")
             logger.error(e)
-            return None, str(e)
+            return self._failure(str(e))
 
     def generate_wallet(self, first_name, last_name, email, birthday, phone_number, currency="NGN"):
         """
         Generate a wallet
         """
         try:
-            payload = json.dumps({
+            payload = codec.dumps({
                 "firstName": first_name,
                 "lastName": last_name,
                 "email": email,
@@ -103,98 +239,93 @@ class WalletsAfricaAPI:
                 "secretKey": self.secret_key
             })
 
-            response, msg = self._wallet_api_request("wallet/generate", "POST", payload)
-            return response, msg
+            return self._wallet_api_request("wallet/generate", "POST", payload)
             
         except Exception as e:
             logger.error("generate_wallet@Error")
             logger.error(e)
-            return None, str(e)
+            return self._failure(str(e))
 
     def debit_wallet(self, amount, phoneNumber, reference):
         """
         Perform a debit on a sub wallet and credit the main wallet
         """
         try:
-            payload = json.dumps({
+            payload = codec.dumps({
                 "transactionReference": reference,
                 "amount": float(amount),
                 "phoneNumber": phoneNumber,
                 "secretKey": self.secret_key
             })
 
-            response, msg = self._wallet_api_request("wallet/debit", "POST", payload)
-            return response, msg
+            return self._wallet_api_request("wallet/debit", "POST", payload)
             
         except Exception as e:
             logger.error("debit_wallet@Error")
             logger.error(e)
-            return None, str(e)
+            return self._failure(str(e))
     
     def credit_wallet(self, reference, amount, phoneNumber):
         """
         Perform a credit from main wallet to sub wallet
         """
         try:
-            payload = json.dumps({
+            payload = codec.dumps({
                 "transactionReference": reference,
                 "amount": float(amount),
                 "phoneNumber": phoneNumber,
                 "secretKey": self.secret_key
             })
 
-            response, msg = self._wallet_api_request("wallet/credit", "POST", payload)
-            return response, msg
+            return self._wallet_api_request("wallet/credit", "POST", payload)
             
         except Exception as e:
             logger.error("credit_wallet@Error")
             logger.error(e)
-            return None, str(e)
+            return self._failure(str(e))
 
     def set_wallet_password(self, password, phoneNumber):
         """
         Set Password for a subwallet
         """
         try:
-            payload = json.dumps({
+            payload = codec.dumps({
                 "password": password,
                 "phoneNumber": phoneNumber,
                 "secretKey": self.secret_key
             })
 
-            response, msg = self._wallet_api_request("wallet/password", "POST", payload)
-            return response, msg
+            return self._wallet_api_request("wallet/password", "POST", payload)
             
         except Exception as e:
             logger.error("set_wallet_password@Error")
             logger.error(e)
-            return None, str(e)
+            return self._failure(str(e))
 
     def set_wallet_pin(self, pin, phoneNumber):
         """
         Set Pin for a subwallet
         """
         try:
-            payload = json.dumps({
+            payload = codec.dumps({
                 "transactionPin": pin,
                 "phoneNumber": phoneNumber,
                 "secretKey": self.secret_key
             })
 
-            response, msg = self._wallet_api_request("wallet/pin", "POST", payload)
-            return response, msg
+            return self._wallet_api_request("wallet/pin", "POST", payload)
             
         except Exception as e:
             logger.error("set_wallet_pin@Error")
             logger.error(e)
-            return None, str(e)
+            return self._failure(str(e))
 
     def get_wallet_transactions(self, pin, phoneNumber, dateFrom, dateTo, transactionType=0, take=1000000, skip=0, currency="NGN"):
         """
         Get list of transactions for a wallet
         """
         try:
-            payload = json.dumps({
+            payload = codec.dumps({
                 "skip": skip,
                 "take": take,
                 "dateFrom": dateFrom,
@@ -206,143 +337,142 @@ class WalletsAfricaAPI:
                 "secretKey": self.secret_key
             })
 
-            response, msg = self._wallet_api_request("wallet/transactions", "POST", payload)
-            return response, msg
+            return self._wallet_api_request("wallet/transactions", "POST", payload)
             
         except Exception as e:
             logger.error("get_wallet_transactions@Error")
             logger.error(e)
-            return None, str(e)
+            return self._failure(str(e))
 
     def get_wallet_by_phone(self, phoneNumber):
         """
         Get a particular wallet using phone number
         """
         try:
-            payload = json.dumps({
+            payload = codec.dumps({
                 "phoneNumber": phoneNumber,
                 "secretKey": self.secret_key
             })
 
-            response, msg = self._wallet_api_request("wallet/getuser", "POST", payload)
-            return response, msg
+            return self._wallet_api_request("wallet/getuser", "POST", payload)
             
         except Exception as e:
             logger.error("get_wallet_by_phone@Error")
             logger.error(e)
-            return None, str(e)
+            return self._failure(str(e))
 
     def get_wallet_by_email(self, email):
         """
         Get a particular wallet using email
         """
         try:
-            payload = json.dumps({
+            payload = codec.dumps({
                 "email": email,
                 "secretKey": self.secret_key
             })
 
-            response, msg = self._wallet_api_request("wallet/getuser", "POST", payload)
-            return response, msg
+            return self._wallet_api_request("wallet/getuser", "POST", payload)
             
         except Exception as e:
             logger.error("get_wallet_by_phone@Error")
             logger.error(e)
-            return None, str(e)
+            return self._failure(str(e))
 
-    def get_wallet_balance(self, phoneNumber, currency="NGN"):
+    def get_wallet_balance(self, phoneNumber, currency="NGN", fresh=False):
         """
-        Get wallet balance
+        Get wallet balance. With `fresh` the request is never shared with a
+        concurrent identical one, which may have been sent before a debit landed.
         """
         try:
-            payload = json.dumps({
+            payload = codec.dumps({
                 "phoneNumber": phoneNumber,
                 "currency": currency,
                 "secretKey": self.secret_key
             })
 
-            response, msg = self._wallet_api_request("wallet/balance", "POST", payload)
-            return response, msg
+            return self._wallet_api_request("wallet/balance", "POST", payload, coalesce=not fresh)
             
         except Exception as e:
             logger.error("get_wallet_balance@Error")
             logger.error(e)
-            return None, str(e)
+            return self._failure(str(e))
 
     def get_wallet_acct_number(self, phoneNumber):
         """
         Retrieve account number tied to a wallet
         """
         try:
-            payload = json.dumps({
+            payload = codec.dumps({
                 "phoneNumber": phoneNumber,
                 "secretKey": self.secret_key
             })
 
-            response, msg = self._wallet_api_request("wallet/nuban", "POST", payload)
-            return response, msg
+            return self._wallet_api_request("wallet/nuban", "POST", payload)
             
         except Exception as e:
             logger.error("get_wallet_acct_number@Error")
             logger.error(e)
-            return None, str(e)
+            return self._failure(str(e))
 
-    def get_all_banks(self):
+    def fetch_all_banks(self):
         """
-        Get transaction details about wallet to bank transfer
+        Get all banks available for transfers from the upstream
         """
         try:
-            response, msg = self._wallet_api_request("transfer/banks/all", "POST")
-            return response, msg
+            return self._wallet_api_request("transfer/banks/all", "POST")
             
         except Exception as e:
-            logger.error("get_bank_transfer_info@Error")
+            logger.error("fetch_all_banks@Error")
             logger.error(e)
-            return None, str(e)
+            return self._failure(str(e))
+
+    def get_all_banks(self):
+        """
+        Get all banks available for transfers, served from banks_cache
+        """
+        return banks_cache.get()
 
     def get_bank_transfer_info(self, reference):
         """
         Get transaction details about wallet to bank transfer
         """
         try:
-            payload = json.dumps({
+            payload = codec.dumps({
                 "transactionReference": reference,
                 "secretKey": self.secret_key
             })
 
-            response, msg = self._wallet_api_request("transfer/bank/details", "POST", payload)
-            return response, msg
+            return self._wallet_api_request("transfer/bank/details", "POST", payload)
             
         except Exception as e:
             logger.error("get_bank_transfer_info@Error")
             logger.error(e)
-            return None, str(e)
+            return self._failure(str(e))
 
     def bank_account_enquiry(self, bankCode, accountNumber):
         """
         Get Bank Account Information
         """
         try:
-            payload = json.dumps({
+            payload = codec.dumps({
                 "SecretKey": self.secret_key,
                 "BankCode": bankCode,
                 "AccountNumber": accountNumber
             })
 
-            response, msg = self._wallet_api_request("transfer/bank/account/enquire", "POST", payload)
-            return response, msg
+            return self._wallet_api_request("transfer/bank/account/enquire", "POST", payload)
             
         except Exception as e:
             logger.error("bank_account_enquiry@Error")
             logger.error(e)
-            return None, str(e)
+            return self._failure(str(e))
 
     def bank_account_transfer(self, bankCode, accountNumber, amount, accountName, reference, description):
         """
         Transfer funds from a wallet to a bank account
         """
         try:
-            payload = json.dumps({
+            payload = codec.dumps({
                 "SecretKey": self.secret_key,
                 "BankCode": bankCode,
                 "AccountNumber": accountNumber,
@@ -352,10 +482,227 @@ class WalletsAfricaAPI:
                 "Narration": description
             })
 
-            response, msg = self._wallet_api_request("transfer/bank/account", "POST", payload)
-            return response, msg
+            return self._wallet_api_request("transfer/bank/account", "POST", payload)
             
         except Exception as e:
             logger.error("bank_account_transfer@Error")
             logger.error(e)
+            return self._failure(str(e))
+
+
+class AsyncWalletsAfricaAPI(WalletsAfricaAPI):
+    """
+    asyncio version of WalletsAfricaAPI for async views.
+
+    Same methods and return values, but every method must be awaited:
+
+        balance, msg = await async_wallets_api.get_wallet_balance(phone_number)
+    """
+
+    @property
+    def session(self):
+        return get_async_http_client()
+
+    async def get_all_banks(self):
+        cached = banks_cache.peek()
+        if cached is not None:
+            return cached
+
+        result = await self.fetch_all_banks()
+        banks_cache.set(result)
+        return result
+
+    async def _failure(self, msg):
+        return None, msg
+
+    async def _send(self, endpoint, http_method, payload={}):
+        method = http_method.upper()
+        url = f"{self.base_url}/{endpoint}"
+        api_request = await self.session.request(method, url, headers=self._request_headers(), content=payload or None)
+        return api_request.status_code, codec.loads(api_request.content)
+
+    async def _exchange(self, endpoint, http_method, payload={}):
+        started_at = time.monotonic()
+        try:
+            status_code, response = await self._send(endpoint, http_method, payload)
+        except Exception:
+            observe_response(endpoint, payload, started_at)
+            raise
+
+        observe_response(endpoint, payload, started_at, status_code, response)
+        return status_code, response
+
+    async def _wallet_api_request(self, endpoint, http_method, payload={}, coalesce=True):
+        try:
+            cache = response_caches.get(endpoint)
+            if cache is not None:
+                cached = cache.get(payload)
+                if cached is not None:
+                    return self._parse_response(*cached)
+
+            if coalesce and endpoint in coalesced_endpoints:
+                status_code, response = await async_single_flight.do(
+                    (endpoint, payload), partial(self._exchange, endpoint, http_method, payload)
+                )
+            else:
+                status_code, response = await self._exchange(endpoint, http_method, payload)
+            return self._parse_response(status_code, response)
+
+        except Exception as e:
+            logger.error("_wallet_api_request@Error")
+            logger.error(e)
             return None, str(e)
+
+
+def upstream_succeeded(result):
+    data, msg = result
+    return data is not None and msg is True
+
+
+# the bank list changes a few times a year, keep it in memory and refresh it in the background
+banks_cache = StaleWhileRevalidateCache(
+    lambda: WalletsAfricaAPI().fetch_all_banks(),
+    ttl=settings.BANKS_CACHE_TTL,
+    should_cache=upstream_succeeded,
+    name="banks"
+)
+
+
+class UpstreamResponseCache(LRUCache):
+    """
+    LRUCache of raw (status_code, body) upstream answers keyed by request payload.
+
+    Successful answers live for `ttl`; 400/404 answers ("not found") are kept
+    for the shorter `negative_ttl`. Server errors and timeouts are never cached.
+    """
+
+    def __init__(self, maxsize, ttl, negative_ttl, name="cache"):
+        super().__init__(maxsize, ttl, name=name)
+        self.negative_ttl = negative_ttl
+
+    def store(self, key, status_code, response):
+        status_code = int(status_code)
+        if 200 <= status_code < 300:
+            self.set(key, (status_code, response))
+        elif status_code in (400, 404):
+            self.set(key, (status_code, response), ttl=self.negative_ttl)
+
+
+# resolved account names for (bank code, account number) pairs
+enquiry_cache = UpstreamResponseCache(
+    maxsize=settings.ENQUIRY_CACHE_SIZE,
+    ttl=settings.ENQUIRY_CACHE_TTL,
+    negative_ttl=settings.ENQUIRY_NEGATIVE_CACHE_TTL,
+    name="enquiry"
+)
+
+class BalanceCache(LRUCache):
+    """
+    Last known balance per (phone number, currency), kept current from the
+    upstream answers that pass through the transport.
+
+    wallet/balance answers are stored as they are. A successful debit or credit
+    moves the cached balance by its amount; a failed or unanswered one leaves
+    the balance unknown, so the next read goes upstream. A balance read that
+    started before the wallet's last debit or credit is not stored, it may not
+    include it.
+    """
+
+    def __init__(self, maxsize, ttl, name="balance"):
+        super().__init__(maxsize, ttl, name=name)
+        self._update_lock = threading.Lock()
+
+    def fresh(self, phoneNumber, currency="NGN", max_age=None):
+        entry = self.get((phoneNumber, currency))
+        if entry is None:
+            return None
+
+        fetched_at, _, balance = entry
+        if balance is None:
+            return None
+        if max_age is not None and time.monotonic() - fetched_at > max_age:
+            return None
+        return balance
+
+    def store(self, phoneNumber, currency, balance, started_at):
+        key = (phoneNumber, currency)
+        with self._update_lock:
+            entry = self.get(key)
+            mutated_at = entry[1] if entry else None
+            if mutated_at is not None and mutated_at >= started_at:
+                return
+            self.set(key, (started_at, mutated_at, balance))
+
+    def apply(self, phoneNumber, amount, succeeded, currency="NGN"):
+        """
+        Move the cached balance by `amount` after a debit (negative) or credit.
+        """
+        key = (phoneNumber, currency)
+        with self._update_lock:
+            entry = self.get(key)
+            fetched_at, balance = (entry[0], entry[2]) if entry else (0, None)
+            if succeeded and balance is not None:
+                balance = dict(balance, WalletBalance=balance['WalletBalance'] + amount)
+            else:
+                balance = None
+            self.set(key, (fetched_at, time.monotonic(), balance))
+
+    def observe(self, endpoint, payload, started_at, status_code=None, response=None):
+        if endpoint not in ("wallet/balance", "wallet/debit", "wallet/credit"):
+            return
+
+        request = codec.loads(payload)
+        succeeded = status_code is not None and 200 <= int(status_code) < 300
+
+        if endpoint == "wallet/balance":
+            if succeeded and isinstance(response, dict) and isinstance(response.get('Data'), dict):
+                self.store(request['phoneNumber'], request['currency'], response['Data'], started_at)
+        elif endpoint == "wallet/debit":
+            self.apply(request['phoneNumber'], -request['amount'], succeeded)
+        else:
+            self.apply(request['phoneNumber'], request['amount'], succeeded)
+
+
+# balances of recently used wallets, bank transfers go out of the main wallet
+# after a wallet/debit so they are covered by the debit
+balance_cache = BalanceCache(maxsize=settings.BALANCE_CACHE_SIZE, ttl=settings.BALANCE_CACHE_TTL)
+
+
+def observe_response(endpoint, payload, started_at, status_code=None, response=None):
+    """
+    Feed an upstream answer to the caches built from it. status_code is None when the request failed.
+    """
+    cache = response_caches.get(endpoint)
+    if cache is not None and status_code is not None:
+        cache.store(payload, status_code, response)
+
+    balance_cache.observe(endpoint, payload, started_at, status_code, response)
+
+
+# endpoints whose answers _wallet_api_request serves from a cache
+response_caches = {
+    "transfer/bank/account/enquire": enquiry_cache,
+}
+
+# read-only endpoints where concurrent identical calls share one upstream request,
+# mutating endpoints (debit, credit, transfers) must never be listed here
+coalesced_endpoints = {
+    "wallet/balance",
+    "wallet/getuser",
+}
+single_flight = SingleFlight(name="upstream")
+async_single_flight = AsyncSingleFlight(name="upstreamAsync")
+
+metrics.register("banksCache", banks_cache.stats)
+metrics.register("enquiryCache", enquiry_cache.stats)
+metrics.register("balanceCache", balance_cache.stats)
+metrics.register("singleFlight", single_flight.stats)
+metrics.register("asyncSingleFlight", async_single_flight.stats)
+
+
+def warm_caches():
+    """
+    Load slow-changing upstream data in the background at process start.
+    """
+    if settings.BANKS_CACHE_WARM_ON_START:
+        banks_cache.warm()